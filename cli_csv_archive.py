@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+
+"""
+CLI Application for processing archives of CSV files
+written by cli_de5000.py
+
+The files are processed in parallel by a pool of worker processes.
+Each worker streams its file row by row.
+
+by TS, Mai 2022
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import datetime
+import fnmatch
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_csv_reader import \
+		De5000CsvReader, get_column_type, parse_cell, parse_timestamp_ns, \
+		COL_TIMESTAMP_UTC, COL_FREQ, COL_MAIN_QUANTITY, COL_SEC_QUANTITY, \
+		COLS_MAIN_VALUE, COLS_SEC_VALUE
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# plain files and rotated segments (see --csv-compress of cli_de5000.py)
+OPT_PATTERN_DEF = "*.csv,*.csv.gz,*.csv.zst"
+
+CONVERT_FORMAT_CSV = "csv"
+CONVERT_FORMAT_JSONL = "jsonl"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _ValueStats(object):
+	""" Mergeable statistics of one value column
+
+	Mean and sum of squared deviations are updated with Welford's
+	algorithm and merged with Chan's parallel formula, which stay accurate
+	for large values with small spread.
+	"""
+
+	def __init__(self):
+		self.count = 0
+		self.mean = math.nan
+		self.m2 = 0.0
+		self.min = None
+		self.max = None
+
+	def add(self, val: float):
+		self.count += 1
+		if self.count == 1:
+			self.mean = val
+		else:
+			delta = val - self.mean
+			self.mean += delta / self.count
+			self.m2 += delta * (val - self.mean)
+		if self.min is None or val < self.min:
+			self.min = val
+		if self.max is None or val > self.max:
+			self.max = val
+
+	def merge(self, other):
+		if other.count == 0:
+			return
+		if self.count == 0:
+			self.count = other.count
+			self.mean = other.mean
+			self.m2 = other.m2
+		else:
+			tmpCount = self.count + other.count
+			delta = other.mean - self.mean
+			self.mean += delta * other.count / tmpCount
+			self.m2 += other.m2 + delta * delta * self.count * other.count / tmpCount
+			self.count = tmpCount
+		if self.min is None or other.min < self.min:
+			self.min = other.min
+		if self.max is None or other.max > self.max:
+			self.max = other.max
+
+	@property
+	def std(self) -> float:
+		""" Population standard deviation """
+		if self.count == 0:
+			return math.nan
+		return math.sqrt(self.m2 / self.count)
+
+# ------------------------------------------------------------------------------
+
+class _GroupStats(object):
+	""" Statistics of all rows with the same quantities and test frequency """
+
+	def __init__(self):
+		self.rows = 0
+		self.firstTsNs = None
+		self.lastTsNs = None
+		self.main = _ValueStats()
+		self.sec = _ValueStats()
+
+	def merge(self, other):
+		self.rows += other.rows
+		if other.firstTsNs is not None and (self.firstTsNs is None or other.firstTsNs < self.firstTsNs):
+			self.firstTsNs = other.firstTsNs
+		if other.lastTsNs is not None and (self.lastTsNs is None or other.lastTsNs > self.lastTsNs):
+			self.lastTsNs = other.lastTsNs
+		self.main.merge(other.main)
+		self.sec.merge(other.sec)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def process_csv_file(csvFn: str, opts: dict) -> dict:
+	""" Filter, aggregate and convert one CSV file.
+	This runs in a worker process.
+
+	Parameters:
+		csvFn (str)
+		opts (dict): see CliCsvArchive._get_worker_opts()
+	Returns:
+		dict
+	"""
+	res = {
+			"csvFn": csvFn,
+			"rowsTotal": 0,
+			"rowsMatched": 0,
+			"groups": {},
+			"partFn": None,
+			"header": None,
+			"error": None
+		}
+	partFHnd = None
+	try:
+		with De5000CsvReader(csvFn) as readerObj:
+			header = readerObj.header
+			res["header"] = header
+			colTypes = [get_column_type(x) for x in header]
+			colIxs = {name: ix for ix, name in enumerate(header)}
+			ixTs = colIxs.get(COL_TIMESTAMP_UTC)
+			ixFreq = colIxs.get(COL_FREQ)
+			ixMainQuant = colIxs.get(COL_MAIN_QUANTITY)
+			ixSecQuant = colIxs.get(COL_SEC_QUANTITY)
+			ixsMainVal = [colIxs[x] for x in COLS_MAIN_VALUE if x in colIxs]
+			ixsSecVal = [colIxs[x] for x in COLS_SEC_VALUE if x in colIxs]
+			#
+			filterQuants = opts["quantities"]
+			filterFreqs = opts["freqs"]
+			tsFromNs = opts["tsFromNs"]
+			tsToNs = opts["tsToNs"]
+			#
+			partWr = None
+			if opts["convertFormat"] is not None:
+				tmpFd, res["partFn"] = tempfile.mkstemp(suffix=".part", dir=opts["tmpDir"])
+				partFHnd = os.fdopen(tmpFd, mode="w", newline="")
+				if opts["convertFormat"] == CONVERT_FORMAT_CSV:
+					partWr = csv.writer(partFHnd, lineterminator=os.linesep)
+			#
+			for row in readerObj.iter_raw_rows():
+				res["rowsTotal"] += 1
+				mainQuant = row[ixMainQuant] if ixMainQuant is not None else ""
+				if filterQuants and mainQuant not in filterQuants:
+					continue
+				freqStr = row[ixFreq] if ixFreq is not None else ""
+				if filterFreqs and freqStr not in filterFreqs:
+					continue
+				tsNs = parse_timestamp_ns(row[ixTs]) if ixTs is not None else None
+				if tsFromNs is not None and (tsNs is None or tsNs < tsFromNs):
+					continue
+				if tsToNs is not None and (tsNs is None or tsNs >= tsToNs):
+					continue
+				res["rowsMatched"] += 1
+				#
+				if opts["aggregate"]:
+					secQuant = row[ixSecQuant] if ixSecQuant is not None else ""
+					groupKey = (mainQuant, secQuant, freqStr)
+					group = res["groups"].get(groupKey)
+					if group is None:
+						group = _GroupStats()
+						res["groups"][groupKey] = group
+					group.rows += 1
+					if tsNs is not None:
+						if group.firstTsNs is None or tsNs < group.firstTsNs:
+							group.firstTsNs = tsNs
+						if group.lastTsNs is None or tsNs > group.lastTsNs:
+							group.lastTsNs = tsNs
+					for ix in ixsMainVal:
+						if row[ix] != "":
+							group.main.add(float(row[ix]))
+							break
+					for ix in ixsSecVal:
+						if row[ix] != "":
+							group.sec.add(float(row[ix]))
+							break
+				#
+				if partWr is not None:
+					partWr.writerow(row)
+				elif partFHnd is not None:
+					tmpDict = {header[ix]: parse_cell(colTypes[ix], row[ix]) for ix in range(len(row))}
+					tmpDict["Source File"] = csvFn
+					partFHnd.write(json.dumps(tmpDict) + "\n")
+	except Exception as err:
+		# e.g. truncated .gz (EOFError), .zst without zstandard (ImportError), bad values -
+		# the file is reported as failed instead of aborting the whole run
+		res["error"] = f"{type(err).__name__}: {str(err)}"
+	finally:
+		if partFHnd is not None:
+			partFHnd.close()
+	return res
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class CliCsvArchive(object):
+	def __init__(self):
+		self._cmdArgs = self._get_parsed_args()
+
+	def run(self):
+		csvFns = self._find_csv_files()
+		if not csvFns:
+			self._error_msg_cb("! No CSV files found")
+			sys.exit(1)
+		self._status_msg_cb(f"Processing {len(csvFns)} files with {self._cmdArgs['jobs']} workers...")
+		#
+		opts = self._get_worker_opts()
+		groups = {}
+		rowsTotal = 0
+		rowsMatched = 0
+		filesFailed = 0
+		outFHnd = None
+		outHeader = None
+		try:
+			if opts["convertFormat"] is not None:
+				outFHnd = open(self._cmdArgs["output"], mode="w", newline="")
+			with concurrent.futures.ProcessPoolExecutor(max_workers=self._cmdArgs["jobs"]) as executor:
+				futures = [executor.submit(process_csv_file, csvFn, opts) for csvFn in csvFns]
+				# results are merged in the order of the input files
+				for future in futures:
+					res = future.result()
+					if res["error"] is not None:
+						# the rows read before the error are left out of the totals as well
+						filesFailed += 1
+						self._error_msg_cb(f"! {res['csvFn']}: {res['error']} (file skipped)")
+					else:
+						rowsTotal += res["rowsTotal"]
+						rowsMatched += res["rowsMatched"]
+						for groupKey, group in res["groups"].items():
+							if groupKey not in groups:
+								groups[groupKey] = _GroupStats()
+							groups[groupKey].merge(group)
+					if res["partFn"] is not None:
+						if outFHnd is not None and res["error"] is None:
+							if opts["convertFormat"] == CONVERT_FORMAT_CSV:
+								if outHeader is None:
+									outHeader = res["header"]
+									csv.writer(outFHnd, lineterminator=os.linesep).writerow(outHeader)
+								elif res["header"] != outHeader:
+									self._error_msg_cb(f"! {res['csvFn']}: different columns, not converted")
+									os.remove(res["partFn"])
+									continue
+							with open(res["partFn"], mode="r", newline="") as partFHnd:
+								shutil.copyfileobj(partFHnd, outFHnd)
+						os.remove(res["partFn"])
+		finally:
+			if outFHnd is not None:
+				outFHnd.close()
+		#
+		self._status_msg_cb(f"Rows: {rowsMatched} of {rowsTotal} matched, {filesFailed} files failed (not included)")
+		if opts["convertFormat"] is not None:
+			self._status_msg_cb(f"Converted rows written to '{self._cmdArgs['output']}'")
+		if self._cmdArgs["aggregate"]:
+			self._output_aggregates(groups)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _find_csv_files(self) -> list:
+		resA = []
+		patternsA = [x.strip() for x in self._cmdArgs["pattern"].split(",") if x.strip()]
+		for dirPath, dirNames, fileNames in os.walk(self._cmdArgs["DIRECTORY"]):
+			dirNames.sort()
+			for fileName in sorted(fileNames):
+				if any(fnmatch.fnmatch(fileName, x) for x in patternsA):
+					resA.append(os.path.join(dirPath, fileName))
+			if not self._cmdArgs["recursive"]:
+				break
+		return resA
+
+	def _get_worker_opts(self) -> dict:
+		outFn = self._cmdArgs["output"]
+		return {
+				"quantities": set(self._cmdArgs["quantity"]) if self._cmdArgs["quantity"] else None,
+				"freqs": set(self._cmdArgs["freq"]) if self._cmdArgs["freq"] else None,
+				"tsFromNs": self._cmdArgs["time_from"],
+				"tsToNs": self._cmdArgs["time_to"],
+				"aggregate": self._cmdArgs["aggregate"],
+				"convertFormat": self._cmdArgs["convert"],
+				"tmpDir": os.path.dirname(os.path.abspath(outFn)) if outFn else None
+			}
+
+	def _output_aggregates(self, groups: dict):
+		header = [
+				"Main Quantity", "Sec Quantity", COL_FREQ, "Rows",
+				"First DateTime UTC", "Last DateTime UTC",
+				"Main Count", "Main Mean", "Main Std", "Main Min", "Main Max",
+				"Sec Count", "Sec Mean", "Sec Std", "Sec Min", "Sec Max"
+			]
+		rowsA = []
+		for groupKey in sorted(groups.keys()):
+			group = groups[groupKey]
+			row = [groupKey[0], groupKey[1], groupKey[2], str(group.rows),
+					self._get_dt_str(group.firstTsNs), self._get_dt_str(group.lastTsNs)]
+			for valStats in [group.main, group.sec]:
+				if valStats.count == 0:
+					row += ["0", "", "", "", ""]
+				else:
+					row += [str(valStats.count), f"{valStats.mean:.09g}", f"{valStats.std:.09g}",
+							f"{valStats.min:.09g}", f"{valStats.max:.09g}"]
+			rowsA.append(row)
+		#
+		if self._cmdArgs["aggregate_csv"] is not None:
+			with open(self._cmdArgs["aggregate_csv"], mode="w", newline="") as fHnd:
+				csvWr = csv.writer(fHnd, lineterminator=os.linesep)
+				csvWr.writerow(header)
+				csvWr.writerows(rowsA)
+			self._status_msg_cb(f"Aggregates written to '{self._cmdArgs['aggregate_csv']}'")
+		else:
+			csvWr = csv.writer(sys.stdout, lineterminator=os.linesep)
+			csvWr.writerow(header)
+			csvWr.writerows(rowsA)
+
+	def _get_dt_str(self, tsNs) -> str:
+		if tsNs is None:
+			return ""
+		return str(datetime.datetime.fromtimestamp(tsNs // 1000000000, tz=datetime.timezone.utc).replace(tzinfo=None))
+
+	def _parse_time_arg(self, value: str) -> int:
+		""" Parse epoch seconds or ISO date/time (UTC) into nanoseconds """
+		try:
+			return parse_timestamp_ns(value)
+		except ValueError:
+			pass
+		try:
+			tmpDt = datetime.datetime.fromisoformat(value)
+		except ValueError:
+			raise argparse.ArgumentTypeError(f"invalid time '{value}'")
+		if tmpDt.tzinfo is None:
+			tmpDt = tmpDt.replace(tzinfo=datetime.timezone.utc)
+		return int(tmpDt.timestamp()) * 1000000000 + tmpDt.microsecond * 1000
+
+	def _get_parsed_args(self):
+		parser = argparse.ArgumentParser(
+				formatter_class=argparse.RawDescriptionHelpFormatter,
+				description="Filter, aggregate and convert a directory of CSV files in parallel",
+				epilog=""
+			)
+		parser.add_argument(
+				"--jobs",
+				type=int,
+				default=os.cpu_count(),
+				help="Amount of worker processes (default=%d)" % os.cpu_count()
+			)
+		parser.add_argument(
+				"--pattern",
+				default=OPT_PATTERN_DEF,
+				help="File name patterns, separated by commas (default='%s')" % OPT_PATTERN_DEF
+			)
+		parser.add_argument(
+				"--recursive",
+				action='store_true',
+				help="Include subdirectories"
+			)
+		parser.add_argument(
+				"--quantity",
+				action='append',
+				help="Only rows with this main quantity, e.g. 'Cs' (may be given multiple times)"
+			)
+		parser.add_argument(
+				"--freq",
+				action='append',
+				help="Only rows with this test frequency in Hz, e.g. '1000' (may be given multiple times)"
+			)
+		parser.add_argument(
+				"--time-from",
+				type=self._parse_time_arg,
+				help="Only rows at or after this time (epoch seconds or ISO date/time in UTC)"
+			)
+		parser.add_argument(
+				"--time-to",
+				type=self._parse_time_arg,
+				help="Only rows before this time (epoch seconds or ISO date/time in UTC)"
+			)
+		parser.add_argument(
+				"--aggregate",
+				action='store_true',
+				help="Compute statistics per main quantity, secondary quantity and test frequency"
+			)
+		parser.add_argument(
+				"--aggregate-csv",
+				help="Output the statistics to CSV file instead of the console"
+			)
+		parser.add_argument(
+				"--convert",
+				choices=[CONVERT_FORMAT_CSV, CONVERT_FORMAT_JSONL],
+				help="Merge all matching rows into OUTPUT in this format"
+			)
+		parser.add_argument(
+				"--output",
+				help="Output file for --convert"
+			)
+		parser.add_argument(
+				"DIRECTORY",
+				help="Directory containing the CSV files"
+			)
+		#
+		args = parser.parse_args()
+		args = vars(args)  # convert into dict
+		#
+		if args["jobs"] < 1:
+			self._error_msg_cb("! Invalid value for --jobs (min=1)")
+			sys.exit(1)
+		if args["convert"] is not None and not args["output"]:
+			self._error_msg_cb("! --convert requires --output")
+			sys.exit(1)
+		if args["aggregate_csv"] is not None:
+			args["aggregate"] = True
+		if args["convert"] is None and not args["aggregate"]:
+			self._error_msg_cb("! Nothing to do, need --aggregate and/or --convert")
+			sys.exit(1)
+		return args
+
+	def _status_msg_cb(self, msg):
+		# stdout is reserved for the aggregates
+		print(msg, file=sys.stderr)
+
+	def _error_msg_cb(self, msg):
+		print(msg, file=sys.stderr)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+	cliObj = CliCsvArchive()
+	cliObj.run()
@@ -0,0 +1,220 @@
+#
+# by TS, Apr 2022
+#
+
+from collections import deque
+import math
+import sys
+import threading
+import time
+from typing import Callable
+
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import \
+		STATUS_NORMAL
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_stc_packet import \
+		De5000StcPacket
+
+from cli_output import OutputCommon
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _DashboardPanel(object):
+	def __init__(self, meterName: str, statsWindow: int):
+		self.meterName = meterName
+		self.lastPacket = None
+		self.lastValidPacket = None
+		self.lastDbgMsg = ""
+		self.lastAlarmMsg = ""
+		self.packetsSinceDraw = 0
+		self.statsKey = None
+		self.statsVals = deque(maxlen=statsWindow)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class DashboardOutput(OutputCommon):
+	""" In-place terminal dashboard with one fixed panel per meter.
+
+	Packets are only stored when they arrive, the screen is redrawn
+	using ANSI cursor control at most refreshRate times per second.
+	Packets that arrive in between are coalesced.
+	"""
+
+	_ANSI_HOME = "\x1b[H"
+	_ANSI_CLEAR_SCREEN = "\x1b[2J"
+	_ANSI_CLEAR_EOL = "\x1b[K"
+	_ANSI_CLEAR_EOS = "\x1b[J"
+	_ANSI_HIDE_CURSOR = "\x1b[?25l"
+	_ANSI_SHOW_CURSOR = "\x1b[?25h"
+	_ANSI_ALARM = "\x1b[1;37;41m"
+	_ANSI_RESET = "\x1b[0m"
+	#
+	_PANEL_WIDTH = 64
+
+	def __init__(self, debugMsgCb: Callable[[str], None], refreshRate: float = 4.0, statsWindow: int = 100, outStream = None):
+		""" Initialize object
+
+		Parameters:
+			debugMsgCb (Callable[[str], None])
+			refreshRate (float): maximum amount of redraws per second
+			statsWindow (int): amount of readings used for the rolling statistics
+			outStream (TextIO): defaults to sys.stdout
+		"""
+		assert refreshRate > 0.0, "refreshRate needs to be > 0"
+		assert statsWindow > 0, "statsWindow needs to be > 0"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._minRedrawInterval = 1.0 / refreshRate
+		self._statsWindow = statsWindow
+		self._outStream = outStream if outStream is not None else sys.stdout
+		self._panels = {}
+		self._lock = threading.Lock()
+		self._lastRedraw = 0.0
+		self._isStarted = False
+		self._isDirty = False
+
+	def update_packet(self, meterName: str, packet: De5000StcPacket):
+		""" Store a received packet (valid or not) and redraw the screen if due
+
+		Parameters:
+			meterName (str): e.g. the serial port of the meter
+			packet (De5000StcPacket)
+		"""
+		with self._lock:
+			panel = self._get_panel(meterName)
+			panel.lastPacket = packet
+			panel.packetsSinceDraw += 1
+			if packet.dataValid:
+				panel.lastValidPacket = packet
+				self._update_stats(panel, packet)
+			else:
+				panel.lastDbgMsg = packet.dbgMsg
+			self._isDirty = True
+			#
+			if time.monotonic() - self._lastRedraw >= self._minRedrawInterval:
+				self._redraw()
+
+	def update_alarm(self, meterName: str, msg: str):
+		""" Show an alarm message in the panel of a meter (highlighted)
+
+		Parameters:
+			meterName (str)
+			msg (str)
+		"""
+		with self._lock:
+			panel = self._get_panel(meterName)
+			panel.lastAlarmMsg = msg
+			self._isDirty = True
+
+	def redraw(self):
+		""" Redraw the screen now if anything has changed since the last redraw """
+		with self._lock:
+			if self._isDirty:
+				self._redraw()
+
+	def close(self):
+		""" Draw the final state and restore the cursor """
+		with self._lock:
+			if not self._isStarted:
+				return
+			if self._isDirty:
+				self._redraw()
+			self._outStream.write(self._ANSI_SHOW_CURSOR)
+			self._outStream.flush()
+			self._isStarted = False
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_panel(self, meterName: str) -> _DashboardPanel:
+		panel = self._panels.get(meterName)
+		if panel is None:
+			panel = _DashboardPanel(meterName, self._statsWindow)
+			self._panels[meterName] = panel
+		return panel
+
+	def _update_stats(self, panel: _DashboardPanel, packet: De5000StcPacket):
+		if packet.calMode or packet.dispMain.status != STATUS_NORMAL:
+			return
+		# a new quantity, unit or test frequency restarts the statistics
+		statsKey = (packet.dispMain.quantity, packet.dispMain.normUnits, packet.freq)
+		if statsKey != panel.statsKey:
+			panel.statsKey = statsKey
+			panel.statsVals.clear()
+		panel.statsVals.append(packet.dispMain.normVal)
+
+	def _redraw(self):
+		lines = []
+		for panel in self._panels.values():
+			lines.extend(self._get_panel_lines(panel))
+			lines.append("")
+			panel.packetsSinceDraw = 0
+		#
+		outA = []
+		if not self._isStarted:
+			outA.append(self._ANSI_HIDE_CURSOR + self._ANSI_CLEAR_SCREEN)
+			self._isStarted = True
+		outA.append(self._ANSI_HOME)
+		for line in lines:
+			outA.append(line + self._ANSI_CLEAR_EOL + "\n")
+		outA.append(self._ANSI_CLEAR_EOS)
+		self._outStream.write("".join(outA))
+		self._outStream.flush()
+		#
+		self._lastRedraw = time.monotonic()
+		self._isDirty = False
+
+	def _get_panel_lines(self, panel: _DashboardPanel) -> list:
+		title = f"== {panel.meterName} "
+		resA = [title + "=" * (self._PANEL_WIDTH - len(title))]
+		packet = panel.lastValidPacket
+		if packet is None:
+			resA.append("(waiting for data)")
+		else:
+			resA.append(f"Time     : {packet.timestamp}")
+			if packet.calMode:
+				resA.append("Calibration")
+			else:
+				for desc, packetDisp in [("Primary", packet.dispMain), ("Secondary", packet.dispSec)]:
+					msg = self._format_display(desc, packetDisp)
+					resA.append(msg if msg is not None else f"{desc:9s}: -")
+			resA.append(f"Frequency: {packet.freq}")
+			resA.append(f"Modes    : {self._get_modes_str(packet)}")
+			resA.append(self._get_stats_str(panel))
+		#
+		if panel.lastPacket is not None:
+			tmpOk = panel.lastPacket.packetCountOk
+			tmpErr = panel.lastPacket.packetCountErr
+			tmpTotal = tmpOk + tmpErr
+			tmpErrPerc = (tmpErr / tmpTotal) * 100.0 if tmpTotal > 0 else 0.0
+			resA.append(f"Packets  : {tmpOk} OK, {tmpErr} invalid, ErrRate={tmpErrPerc:.01f}% " +
+					f"(+{panel.packetsSinceDraw} since last redraw)")
+			if not panel.lastPacket.dataValid:
+				resA.append(f"Last Err : {panel.lastDbgMsg if panel.lastDbgMsg else 'no data'}")
+		if panel.lastAlarmMsg:
+			resA.append(f"Alarm    : {self._ANSI_ALARM}{panel.lastAlarmMsg}{self._ANSI_RESET}")
+		return resA
+
+	def _get_modes_str(self, packet: De5000StcPacket) -> str:
+		modesA = ["PAR" if packet.parallel else "SER"]
+		if packet.sortingMode:
+			modesA.append(f"SORTING Tol {packet.tolerance}")
+		if packet.deltaMode:
+			modesA.append("DELTA (showing reference)" if packet.refShown else "DELTA")
+		if packet.lcrAuto:
+			modesA.append("LCR AUTO")
+		if packet.autoRange:
+			modesA.append("AUTO RNG")
+		return ", ".join(modesA)
+
+	def _get_stats_str(self, panel: _DashboardPanel) -> str:
+		tmpCnt = len(panel.statsVals)
+		if tmpCnt == 0:
+			return "Stats    : n/a"
+		tmpMean = math.fsum(panel.statsVals) / tmpCnt
+		tmpVar = math.fsum((x - tmpMean) ** 2 for x in panel.statsVals) / tmpCnt
+		tmpUnits = panel.statsKey[1]
+		return (f"Stats    : n={tmpCnt} mean={tmpMean:.06g} min={min(panel.statsVals):.06g} " +
+				f"max={max(panel.statsVals):.06g} std={math.sqrt(tmpVar):.03g} {tmpUnits}")
@@ -11,74 +11,392 @@ based on https://github.com/4x1md/de5000_lcr_py by '4x1md'
 """
 
 import argparse
+import os
+import re
+import socket
 import sys
-import time
+import threading
 import datetime
+from typing import Optional
 from serial import SerialException
 
+import cli_dashboard
 import cli_output
+import cli_rules
+import cli_sorting_stats
 from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import De5000Uart
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_transport import De5000StreamTransport
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_discovery import \
+		list_candidate_ports, discover_ports, PROBE_TIMEOUT_DEF
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_ref_tracker import De5000RefTracker
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_filter import De5000OutlierFilter
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_eseries import ESERIES_NAMES
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_shm_feed import De5000ShmPublisher
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_socket_server import De5000SocketServer, parse_address
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
 OPT_MAX_PACKETS_DEF = 0  # 0 means infinite
+OPT_REFRESH_RATE_DEF = 4.0
+OPT_SORTING_STATS_INTERVAL_DEF = 60.0
+OPT_SESSION_MIN_READINGS_DEF = 2
+OPT_SWEEP_SETTLE_DEF = 1
+OPT_FILTER_SIGMA_DEF = 3.0
+OPT_DRIFT_WARMUP_DEF = 300
+OPT_LINK_STATS_INTERVAL_DEF = 60.0
+
+SERVE_MODE_DECODED = "decoded"
+SERVE_MODE_RAW = "raw"
+SERVE_MODE_BOTH = "both"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _MeterContext(object):
+	""" State and file outputs of one meter """
+
+	def __init__(self, port: str):
+		self.port = port
+		self.lcr = None
+		self.refTracker = De5000RefTracker()
+		self.filterObj = None
+		self.csvOutpObj = None
+		self.sessionsCsvOutpObj = None
+		self.sweepCsvOutpObj = None
+		self.driftLogOutpObj = None
+		self.linkStatsOutpObj = None
+		self.sortingStatsObj = None
+		self.shmPublisherObj = None
+		self.socketServerObj = None
+		self.wasConnected = True
+		self.stopMsg = None
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
 class CliDe5000(object):
 	_SLEEP_TIME = 1.0
+	# maximum time to wait for the meter threads after a stop request
+	_THREAD_JOIN_TIMEOUT = 5.0
 
 	def __init__(self):
 		self._cmdArgs = self._get_parsed_args()
-		self._storeCsvFn = ("" if self._cmdArgs["csv"] is None else self._cmdArgs["csv"])
-		self._csvOutpObj = (None if self._storeCsvFn == "" else cli_output.CsvOutput(self._storeCsvFn, self._debug_msg_cb))
-		self._consoleOutpObj = cli_output.ConsoleOutput(self._debug_msg_cb, self._status_msg_cb)
+		self._consoleOutpObj = cli_output.ConsoleOutput(self._debug_msg_cb, self._status_msg_cb, eseries=self._cmdArgs["eseries"])
+		self._dashboardOutpObj = (cli_dashboard.DashboardOutput(self._debug_msg_cb, refreshRate=self._cmdArgs["refresh_rate"])
+				if self._cmdArgs["dashboard"] else None)
+		self._ruleHookObj = None
+		if self._cmdArgs["rules"] is not None:
+			try:
+				self._ruleHookObj = cli_rules.RuleHookOutput(self._cmdArgs["rules"], self._debug_msg_cb, self._alarm_msg_cb)
+			except (ValueError, OSError) as err:
+				self._error_msg_cb(f"! Invalid rules file '{self._cmdArgs['rules']}': {str(err)}")
+				sys.exit(1)
+		#
+		self._meters = []
+		self._isMultiMeter = False
+		self._threads = []
+		# all outputs are accessed while holding this lock - only the reading happens in parallel
+		self._outputLock = threading.RLock()
+		self._stopEvent = threading.Event()
+		self._hasFailedMeter = False
 
 	def read_from_device(self):
 		try:
-			port = self._cmdArgs["COM_PORT"]
-			dispErrorRate = self._cmdArgs["show_error_rate"]
+			ports = self._get_ports()
+			self._isMultiMeter = (len(ports) > 1)
+			for port in ports:
+				self._meters.append(self._create_meter(port))
 			#
-			if self._csvOutpObj is not None and not self._csvOutpObj.isOpen:
-				self._csvOutpObj.openCsv()
+			if self._cmdArgs["serve"] is not None:
+				# one socket per meter, the framing doesn't identify the meter
+				for meterIx, meter in enumerate(self._meters):
+					tmpAddress = self._get_meter_address(self._cmdArgs["serve"], meter.port, meterIx)
+					try:
+						meter.socketServerObj = De5000SocketServer(tmpAddress)
+					except OSError as err:
+						self._error_msg_cb(f"! Can't serve on '{tmpAddress}': {str(err)}")
+						sys.exit(1)
+					self._get_meter_msg_cb(meter.port)(f"Serving packets on '{tmpAddress}'")
 			#
-			self._status_msg_cb(f"Starting DE-5000 monitor... (port='{port}')")
-			lcr = De5000Uart(port)
-			#
-			while True:
-				self._status_msg_cb("")
-				# @var packet: De5000StcPacket
-				packet = lcr.get_meas()
-				#
-				if not packet.dataValid:
-					self._error_msg_cb("DE-5000 is not connected or data was corrupted. " +
-							f"(Packets: {packet.packetCountErr} invalid, {packet.packetCountOk} OK)")
-					if packet.dbgMsg:
-						self._error_msg_cb(f"  -- {packet.dbgMsg}")
+			replayFn = self._cmdArgs["replay"]
+			for meter in self._meters:
+				self._status_msg_cb(f"Starting DE-5000 monitor... (port='{meter.port}')")
+				tmpLinkStats = meter.linkStatsOutpObj.linkStats if meter.linkStatsOutpObj is not None else None
+				if replayFn is not None:
+					meter.lcr = De5000Uart(De5000StreamTransport(
+							sys.stdin.buffer if replayFn == "-" else open(replayFn, mode="rb"),
+							name=replayFn),
+							linkStats=tmpLinkStats)
 				else:
-					self._consoleOutpObj.print_decoded_packet(packet, dispNormVal=False, dispErrorRate=dispErrorRate)
-					if self._csvOutpObj is not None and not packet.calMode:
-						self._csvOutpObj.writeCsvDecodedPacket(packet)
-					if self._cmdArgs["max_packets"] > 0 and packet.packetCountOk >= self._cmdArgs["max_packets"]:
-						self._status_msg_cb("")
-						self._status_msg_cb("Max packets reached. Stopping...")
-						break
-				#
-				time.sleep(self._SLEEP_TIME)
+					meter.lcr = De5000Uart(meter.port, reconnect=not self._cmdArgs["no_reconnect"], linkStats=tmpLinkStats)
+			#
+			if not self._isMultiMeter:
+				self._read_meter(self._meters[0])
+			else:
+				for meter in self._meters:
+					tmpThread = threading.Thread(target=self._read_meter_thread, args=(meter,), daemon=True)
+					tmpThread.start()
+					self._threads.append(tmpThread)
+				# join() with timeout keeps the main thread responsive to KeyboardInterrupt
+				while any(x.is_alive() for x in self._threads):
+					for tmpThread in self._threads:
+						tmpThread.join(0.5)
 		except SerialException as err:
+			self._close_dashboard()
 			self._error_msg_cb(f"Serial port error: {str(err)}")
 			sys.exit(1)
+		except OSError as err:
+			self._close_dashboard()
+			self._error_msg_cb(f"Error: {str(err)}")
+			sys.exit(1)
 		except KeyboardInterrupt:
+			self._close_dashboard()
 			self._status_msg_cb("KeyboardInterrupt.")
 		finally:
-			if self._csvOutpObj is not None:
-				self._csvOutpObj.closeCsv()
+			self._stopEvent.set()
+			for tmpThread in self._threads:
+				tmpThread.join(self._THREAD_JOIN_TIMEOUT)
+			self._close_dashboard()
+			for meter in self._meters:
+				self._close_meter(meter)
+		if self._ruleHookObj is not None and self._ruleHookObj.exitCode is not None:
+			sys.exit(self._ruleHookObj.exitCode)
+		if self._hasFailedMeter:
+			sys.exit(1)
 
 	# --------------------------------------------------------------------------
 	# --------------------------------------------------------------------------
 
+	def _get_ports(self) -> list:
+		if self._cmdArgs["replay"] is not None:
+			return [self._cmdArgs["replay"]]
+		if not self._cmdArgs["auto"]:
+			return [self._cmdArgs["COM_PORT"]]
+		candidatesA = list_candidate_ports()
+		self._status_msg_cb(f"Probing {len(candidatesA)} serial ports...")
+		resA = discover_ports(candidatesA, timeout=self._cmdArgs["auto_timeout"])
+		if not resA:
+			self._error_msg_cb("! No DE-5000 found")
+			sys.exit(1)
+		self._status_msg_cb(f"Found {len(resA)} DE-5000: {', '.join(resA)}")
+		return resA
+
+	def _get_meter_fn(self, fn: str, port: str) -> str:
+		""" Add the name of the port to a file name if there are several meters,
+		e.g. 'out.csv' -> 'out-ttyUSB0.csv' """
+		if not self._isMultiMeter:
+			return fn
+		tmpName = re.sub(r"[^A-Za-z0-9_.-]+", "_", os.path.basename(port.rstrip("/\\")))
+		tmpRoot, tmpExt = os.path.splitext(fn)
+		return f"{tmpRoot}-{tmpName}{tmpExt}"
+
+	def _get_meter_address(self, address: str, port: str, meterIx: int) -> str:
+		""" Get the socket address of a meter if there are several meters:
+		the port name is added to Unix-domain socket paths (see _get_meter_fn()),
+		TCP ports are counted up, e.g. 'tcp:127.0.0.1:5000' -> 'tcp:127.0.0.1:5001' """
+		if not self._isMultiMeter:
+			return address
+		if parse_address(address)[0] == socket.AF_UNIX:
+			tmpPrefix, _, tmpPath = address.partition(":")
+			return f"{tmpPrefix}:{self._get_meter_fn(tmpPath, port)}"
+		tmpHost, _, tmpPort = address.rpartition(":")
+		return f"{tmpHost}:{int(tmpPort) + meterIx}"
+
+	def _create_meter(self, port: str) -> _MeterContext:
+		meter = _MeterContext(port)
+		if self._cmdArgs["filter"] > 0:
+			meter.filterObj = De5000OutlierFilter(self._cmdArgs["filter"], nSigma=self._cmdArgs["filter_sigma"])
+		if self._cmdArgs["csv"] is not None:
+			meter.csvOutpObj = cli_output.CsvOutput(
+					self._get_meter_fn(self._cmdArgs["csv"], port),
+					self._debug_msg_cb,
+					rotateSize=self._cmdArgs["csv_rotate_size"],
+					rotateInterval=self._cmdArgs["csv_rotate_interval"],
+					compression=self._cmdArgs["csv_compress"],
+					eseries=self._cmdArgs["eseries"])
+			meter.csvOutpObj.openCsv()
+		if self._cmdArgs["sessions_csv"] is not None:
+			meter.sessionsCsvOutpObj = cli_output.SessionCsvOutput(
+					self._get_meter_fn(self._cmdArgs["sessions_csv"], port),
+					self._debug_msg_cb,
+					minReadings=self._cmdArgs["session_min_readings"])
+			meter.sessionsCsvOutpObj.openCsv()
+		if self._cmdArgs["sweep_csv"] is not None:
+			meter.sweepCsvOutpObj = cli_output.SweepCsvOutput(
+					self._get_meter_fn(self._cmdArgs["sweep_csv"], port),
+					self._debug_msg_cb,
+					settleReadings=self._cmdArgs["sweep_settle"])
+			meter.sweepCsvOutpObj.openCsv()
+		if self._cmdArgs["drift_log"] is not None:
+			meter.driftLogOutpObj = cli_output.DriftLogOutput(
+					self._get_meter_fn(self._cmdArgs["drift_log"], port),
+					self._debug_msg_cb,
+					warmup=self._cmdArgs["drift_warmup"])
+			meter.driftLogOutpObj.openCsv()
+		if self._cmdArgs["link_stats"] is not None:
+			meter.linkStatsOutpObj = cli_output.LinkStatsOutput(
+					self._get_meter_fn(self._cmdArgs["link_stats"], port),
+					self._debug_msg_cb,
+					binSize=self._cmdArgs["link_stats_interval"])
+		if self._cmdArgs["sorting_stats"] is not None:
+			meter.sortingStatsObj = cli_sorting_stats.SortingStatsOutput(
+					self._get_meter_fn(self._cmdArgs["sorting_stats"], port),
+					self._debug_msg_cb,
+					reportMsgCb=(self._get_meter_msg_cb(port) if self._dashboardOutpObj is None else None),
+					reportInterval=self._cmdArgs["sorting_stats_interval"])
+		if self._cmdArgs["shm"] is not None:
+			meter.shmPublisherObj = De5000ShmPublisher(self._get_meter_fn(self._cmdArgs["shm"], port))
+		return meter
+
+	def _close_meter(self, meter: _MeterContext):
+		if meter.csvOutpObj is not None:
+			meter.csvOutpObj.closeCsv()
+		if meter.sessionsCsvOutpObj is not None:
+			meter.sessionsCsvOutpObj.closeCsv()
+		if meter.sweepCsvOutpObj is not None:
+			meter.sweepCsvOutpObj.closeCsv()
+		if meter.driftLogOutpObj is not None:
+			meter.driftLogOutpObj.closeCsv()
+		if meter.sortingStatsObj is not None:
+			meter.sortingStatsObj.close()
+		if meter.shmPublisherObj is not None:
+			meter.shmPublisherObj.close()
+		if meter.socketServerObj is not None:
+			meter.socketServerObj.close()
+		if meter.filterObj is not None:
+			self._report_filter_stats(meter)
+		if meter.linkStatsOutpObj is not None:
+			for line in meter.linkStatsOutpObj.close():
+				self._get_meter_msg_cb(meter.port)(line)
+		if meter.stopMsg is not None:
+			# with several meters the messages are output when the dashboard is gone
+			self._status_msg_cb(f"{meter.port}: {meter.stopMsg}")
+
+	def _get_meter_msg_cb(self, port: str):
+		if not self._isMultiMeter:
+			return self._status_msg_cb
+		return lambda msg: self._status_msg_cb(f"[{port}] {msg}")
+
+	def _read_meter_thread(self, meter: _MeterContext):
+		try:
+			self._read_meter(meter)
+		except (SerialException, OSError) as err:
+			with self._outputLock:
+				self._hasFailedMeter = True
+				meter.stopMsg = f"Serial port error: {str(err)}"
+
+	def _read_meter(self, meter: _MeterContext):
+		""" Read and process packets until a stop condition """
+		while not self._stopEvent.is_set():
+			# @var packet: De5000StcPacket
+			packet = meter.lcr.get_meas()
+			with self._outputLock:
+				stopMsg = self._process_packet(meter, packet)
+			if stopMsg is not None:
+				if self._isMultiMeter:
+					meter.stopMsg = stopMsg
+				else:
+					self._close_dashboard()
+					self._status_msg_cb("")
+					self._status_msg_cb(stopMsg)
+				return
+			#
+			if self._cmdArgs["replay"] is None:
+				self._stopEvent.wait(self._SLEEP_TIME)
+
+	def _process_packet(self, meter: _MeterContext, packet) -> Optional[str]:
+		""" Pass a packet to all outputs
+
+		Returns:
+			str: message if the meter should be stopped, otherwise None
+		"""
+		port = meter.port
+		lcr = meter.lcr
+		if self._dashboardOutpObj is None:
+			self._status_msg_cb("")
+			if self._isMultiMeter:
+				self._status_msg_cb(f"Meter    : {port}")
+		#
+		if lcr.isConnected != meter.wasConnected:
+			meter.wasConnected = lcr.isConnected
+			if self._dashboardOutpObj is None:
+				self._report_connection_change(lcr)
+		#
+		if not packet.dataValid and lcr.isEndOfData:
+			return "End of replay data. Stopping..."
+		# outliers are dropped before they reach the rules and the outputs
+		isOutlier = meter.filterObj is not None and not meter.filterObj.process_packet(packet)
+		if self._ruleHookObj is not None and not isOutlier:
+			self._ruleHookObj.process_packet(port, packet)
+			if self._ruleHookObj.exitCode is not None:
+				# stops all meters
+				self._stopEvent.set()
+				return "Exit rule triggered. Stopping..."
+		if not packet.dataValid:
+			if self._dashboardOutpObj is not None:
+				self._dashboardOutpObj.update_packet(port, packet)
+			else:
+				self._error_msg_cb("DE-5000 is not connected or data was corrupted. " +
+						f"(Packets: {packet.packetCountErr} invalid, {packet.packetCountOk} OK)")
+				if packet.dbgMsg:
+					self._error_msg_cb(f"  -- {packet.dbgMsg}")
+		elif isOutlier:
+			if self._dashboardOutpObj is None:
+				tmpVals = [f"{x.quantity} = {x.format_norm_val()} {x.normUnits}".rstrip()
+						for x in [packet.dispMain, packet.dispSec] if x.quantity]
+				self._status_msg_cb(f"(outlier rejected: {', '.join(tmpVals)})")
+		else:
+			# sortRef, deltaRef, ... are read by all outputs
+			meter.refTracker.process_packet(packet)
+			if meter.shmPublisherObj is not None:
+				meter.shmPublisherObj.publish(packet)
+			if meter.socketServerObj is not None:
+				if self._cmdArgs["serve_mode"] in [SERVE_MODE_RAW, SERVE_MODE_BOTH]:
+					meter.socketServerObj.broadcast_raw(packet.rawData)
+				if self._cmdArgs["serve_mode"] in [SERVE_MODE_DECODED, SERVE_MODE_BOTH]:
+					meter.socketServerObj.broadcast_packet(packet)
+			if self._dashboardOutpObj is not None:
+				self._dashboardOutpObj.update_packet(port, packet)
+			else:
+				self._consoleOutpObj.print_decoded_packet(packet, dispNormVal=False, dispErrorRate=self._cmdArgs["show_error_rate"])
+			if meter.csvOutpObj is not None and not packet.calMode:
+				meter.csvOutpObj.writeCsvDecodedPacket(packet)
+			if meter.sessionsCsvOutpObj is not None:
+				meter.sessionsCsvOutpObj.writeCsvDecodedPacket(packet)
+			if meter.sweepCsvOutpObj is not None:
+				meter.sweepCsvOutpObj.writeCsvDecodedPacket(packet)
+			if meter.sortingStatsObj is not None:
+				meter.sortingStatsObj.process_packet(packet)
+			if meter.driftLogOutpObj is not None:
+				for event in meter.driftLogOutpObj.process_packet(packet):
+					self._alarm_msg_cb(port, event.get_message())
+			if self._cmdArgs["max_packets"] > 0 and packet.packetCountOk >= self._cmdArgs["max_packets"]:
+				return "Max packets reached. Stopping..."
+		return None
+
+	def _report_connection_change(self, lcr: De5000Uart):
+		if not lcr.isConnected:
+			self._error_msg_cb(f"Serial port '{lcr.port}' lost. Reconnecting...")
+			return
+		self._status_msg_cb(f"Reconnected to '{lcr.port}' after {lcr.lastOutageNs / 1E9:.1f}s " +
+				f"(reconnects: {lcr.reconnectCount}, total downtime: {lcr.downtimeNs / 1E9:.1f}s)")
+
+	def _report_filter_stats(self, meter: _MeterContext):
+		tmpCounts = ", ".join(f"{k}: {v}" for k, v in sorted(meter.filterObj.rejectedCounts.items()))
+		self._get_meter_msg_cb(meter.port)(f"Outliers rejected: {meter.filterObj.rejectedCount}" +
+				(f" ({tmpCounts})" if tmpCounts else ""))
+
+	def _alarm_msg_cb(self, meterName: str, msg: str):
+		if self._dashboardOutpObj is not None:
+			self._dashboardOutpObj.update_alarm(meterName, msg)
+		else:
+			self._consoleOutpObj.print_alarm(msg if not self._isMultiMeter else f"{meterName}: {msg}")
+
+	def _close_dashboard(self):
+		if self._dashboardOutpObj is not None:
+			self._dashboardOutpObj.close()
+
 	def _get_parsed_args(self):
 		parser = argparse.ArgumentParser(
 				formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -96,26 +414,226 @@ class CliDe5000(object):
 				action='store_true',
 				help="Enable output of transmission error rate"
 			)
+		parser.add_argument(
+				"--replay",
+				help="Read raw frames from capture file ('-' for stdin) at full speed instead of from COM_PORT"
+			)
+		parser.add_argument(
+				"--auto",
+				action='store_true',
+				help="Probe all serial ports and read from every DE-5000 found instead of from COM_PORT"
+			)
+		parser.add_argument(
+				"--auto-timeout",
+				type=float,
+				default=PROBE_TIMEOUT_DEF,
+				help="Seconds to wait for a frame on every port with --auto (default=%.1f)" % PROBE_TIMEOUT_DEF
+			)
+		parser.add_argument(
+				"--no-reconnect",
+				action='store_true',
+				help="Exit if the serial port gets lost instead of reconnecting"
+			)
 		parser.add_argument(
 				"--csv",
 				help="Output data to CSV file"
 			)
+		parser.add_argument(
+				"--csv-rotate-size",
+				type=self._parse_size_arg,
+				default=0,
+				help="Rotate the CSV file when it reaches this size, e.g. '100M' (default=0, 0 means never)"
+			)
+		parser.add_argument(
+				"--csv-rotate-interval",
+				type=float,
+				default=0.0,
+				help="Rotate the CSV file after this amount of seconds (default=0, 0 means never)"
+			)
+		parser.add_argument(
+				"--csv-compress",
+				choices=[cli_output.COMPRESSION_GZIP, cli_output.COMPRESSION_ZSTD],
+				help="Compress rotated CSV files in the background"
+			)
+		parser.add_argument(
+				"--eseries",
+				choices=ESERIES_NAMES,
+				help="Output the nearest nominal value of an E-series and the deviation (console and CSV)"
+			)
+		parser.add_argument(
+				"--filter",
+				type=int,
+				default=0,
+				metavar="K",
+				help="Drop outliers (Hampel filter over the running median of the last K readings) (default=0, 0 means off)"
+			)
+		parser.add_argument(
+				"--filter-sigma",
+				type=float,
+				default=OPT_FILTER_SIGMA_DEF,
+				help="Rejection threshold of --filter in standard deviations (default=%.1f)" % OPT_FILTER_SIGMA_DEF
+			)
+		parser.add_argument(
+				"--sessions-csv",
+				help="Output one aggregated row per component session (inserted part) to CSV file"
+			)
+		parser.add_argument(
+				"--session-min-readings",
+				type=int,
+				default=OPT_SESSION_MIN_READINGS_DEF,
+				help="Minimum amount of readings of a component session (default=%d)" % OPT_SESSION_MIN_READINGS_DEF
+			)
+		parser.add_argument(
+				"--sweep-csv",
+				help="Output one row per frequency sweep (part) with the readings of every test frequency to CSV file"
+			)
+		parser.add_argument(
+				"--sweep-settle",
+				type=int,
+				default=OPT_SWEEP_SETTLE_DEF,
+				help="Readings ignored after a change of the test frequency for --sweep-csv (default=%d)" % OPT_SWEEP_SETTLE_DEF
+			)
+		parser.add_argument(
+				"--drift-log",
+				help="Detect steps and drift of the readings (CUSUM/EWMA) and output the events to CSV file"
+			)
+		parser.add_argument(
+				"--drift-warmup",
+				type=int,
+				default=OPT_DRIFT_WARMUP_DEF,
+				help="Amount of readings for the baseline of --drift-log (default=%d)" % OPT_DRIFT_WARMUP_DEF
+			)
+		parser.add_argument(
+				"--link-stats",
+				help="Classify receive errors (timeout, short frame, bad header/footer, bad code) and output their histogram to CSV file"
+			)
+		parser.add_argument(
+				"--link-stats-interval",
+				type=float,
+				default=OPT_LINK_STATS_INTERVAL_DEF,
+				help="Seconds per histogram interval of --link-stats (default=%.1f)" % OPT_LINK_STATS_INTERVAL_DEF
+			)
+		parser.add_argument(
+				"--shm",
+				help="Publish the latest packet to memory-mapped file, e.g. '/dev/shm/de5000'"
+			)
+		parser.add_argument(
+				"--serve",
+				help="Broadcast packets to subscribers on socket, e.g. 'unix:/tmp/de5000.sock' or 'tcp:127.0.0.1:5000' (one socket per meter)"
+			)
+		parser.add_argument(
+				"--serve-mode",
+				choices=[SERVE_MODE_DECODED, SERVE_MODE_RAW, SERVE_MODE_BOTH],
+				default=SERVE_MODE_DECODED,
+				help="Broadcast decoded packets, raw frames or both (default=%s)" % SERVE_MODE_DECODED
+			)
+		parser.add_argument(
+				"--rules",
+				help="Check every packet against the limit rules in JSON file (see de5000_rules.py)"
+			)
+		parser.add_argument(
+				"--dashboard",
+				action='store_true',
+				help="Show an in-place dashboard instead of printing every packet"
+			)
+		parser.add_argument(
+				"--refresh-rate",
+				type=float,
+				default=OPT_REFRESH_RATE_DEF,
+				help="Maximum dashboard redraws per second (default=%.1f)" % OPT_REFRESH_RATE_DEF
+			)
+		parser.add_argument(
+				"--sorting-stats",
+				help="Output production statistics of the Component Sorting mode to summary file"
+			)
+		parser.add_argument(
+				"--sorting-stats-interval",
+				type=float,
+				default=OPT_SORTING_STATS_INTERVAL_DEF,
+				help="Seconds between two sorting statistics reports (default=%.1f)" % OPT_SORTING_STATS_INTERVAL_DEF
+			)
 		parser.add_argument(
 				"COM_PORT",
-				help="E.g. '/dev/ttyUSB0'"
+				nargs="?",
+				help="E.g. '/dev/ttyUSB0' or a pyserial URL like 'socket://localhost:7000'"
 			)
 		#
 		args = parser.parse_args()
 		args = vars(args)  # convert into dict
 		#
+		if [args["COM_PORT"] is not None, args["replay"] is not None, args["auto"]].count(True) != 1:
+			self._error_msg_cb("! Either COM_PORT, --replay or --auto is required")
+			sys.exit(1)
+		if args["auto_timeout"] <= 0.0:
+			self._error_msg_cb("! Invalid value for --auto-timeout (min>0)")
+			sys.exit(1)
 		if args["max_packets"] < 0:
 			self._error_msg_cb("! Invalid value for --max-packets (min=0)")
 			sys.exit(1)
+		if args["csv_rotate_interval"] < 0.0:
+			self._error_msg_cb("! Invalid value for --csv-rotate-interval (min=0)")
+			sys.exit(1)
+		if args["csv_compress"] is not None and not cli_output.is_compression_available(args["csv_compress"]):
+			self._error_msg_cb(f"! --csv-compress {args['csv_compress']} requires the Python package 'zstandard'")
+			sys.exit(1)
+		if args["serve"] is not None:
+			try:
+				parse_address(args["serve"])
+			except ValueError as err:
+				self._error_msg_cb(f"! Invalid value for --serve: {str(err)}")
+				sys.exit(1)
+		if args["filter"] != 0 and args["filter"] < 3:
+			self._error_msg_cb("! Invalid value for --filter (min=3, 0 means off)")
+			sys.exit(1)
+		if args["filter_sigma"] <= 0.0:
+			self._error_msg_cb("! Invalid value for --filter-sigma (min>0)")
+			sys.exit(1)
+		if args["session_min_readings"] < 1:
+			self._error_msg_cb("! Invalid value for --session-min-readings (min=1)")
+			sys.exit(1)
+		if args["sweep_settle"] < 0:
+			self._error_msg_cb("! Invalid value for --sweep-settle (min=0)")
+			sys.exit(1)
+		if args["drift_warmup"] < 2:
+			self._error_msg_cb("! Invalid value for --drift-warmup (min=2)")
+			sys.exit(1)
+		if args["link_stats_interval"] <= 0.0:
+			self._error_msg_cb("! Invalid value for --link-stats-interval (min>0)")
+			sys.exit(1)
+		if args["refresh_rate"] <= 0.0:
+			self._error_msg_cb("! Invalid value for --refresh-rate (min>0)")
+			sys.exit(1)
+		if args["sorting_stats_interval"] <= 0.0:
+			self._error_msg_cb("! Invalid value for --sorting-stats-interval (min>0)")
+			sys.exit(1)
 		#
 		if args["csv"] is not None and not args["csv"].endswith(".csv"):
 			args["csv"] += ".csv"
+		if args["sessions_csv"] is not None and not args["sessions_csv"].endswith(".csv"):
+			args["sessions_csv"] += ".csv"
+		if args["sweep_csv"] is not None and not args["sweep_csv"].endswith(".csv"):
+			args["sweep_csv"] += ".csv"
+		if args["drift_log"] is not None and not args["drift_log"].endswith(".csv"):
+			args["drift_log"] += ".csv"
+		if args["link_stats"] is not None and not args["link_stats"].endswith(".csv"):
+			args["link_stats"] += ".csv"
 		return args
 
+	def _parse_size_arg(self, value: str) -> int:
+		""" Parse size in bytes with optional suffix K, M or G """
+		tmpMuls = {"K": 1024, "M": 1024**2, "G": 1024**3}
+		tmpMul = 1
+		if value and value[-1].upper() in tmpMuls:
+			tmpMul = tmpMuls[value[-1].upper()]
+			value = value[:-1]
+		try:
+			res = int(value) * tmpMul
+		except ValueError:
+			raise argparse.ArgumentTypeError(f"invalid size '{value}'")
+		if res < 0:
+			raise argparse.ArgumentTypeError("size needs to be >= 0")
+		return res
+
 	def _status_msg_cb(self, msg):
 		print(msg)
 
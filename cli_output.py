@@ -2,11 +2,21 @@
 # by TS, Apr 2022
 #
 
-import calendar
 import csv
+import gzip
 from os import linesep, path
+import os
+import queue
+import shutil
 import sys
-from typing import Callable
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
 
 from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import \
 		STATUS_NORMAL, STATUS_BLANK, STATUS_OL, STATUS_PASS, STATUS_FAIL, \
@@ -19,6 +29,93 @@ from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import \
 		SEC_QUANTITY_THETA, SEC_QUANTITY_RP, SEC_QUANTITY_DELTA
 from tsitle.der_ee_de5000_lcr_meter_uart.de5000_stc_packet import \
 		De5000StcPacket, De5000StcPacketMainSecondary
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_csv_reader import \
+		detect_quotechar
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_session import \
+		De5000Session, De5000SessionSegmenter
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_eseries import \
+		bin_display
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_drift import \
+		De5000DriftMonitor, De5000DriftEvent
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_sweep import \
+		SWEEP_FREQS, De5000Sweep, De5000SweepSegmenter
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_link_stats import \
+		KINDS, De5000LinkStats
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def is_compression_available(compression: str) -> bool:
+	""" Check whether the module required for a compression is installed
+
+	Parameters:
+		compression (str): COMPRESSION_GZIP or COMPRESSION_ZSTD
+	Returns:
+		bool
+	"""
+	if compression == COMPRESSION_ZSTD:
+		return (zstandard is not None)
+	return (compression == COMPRESSION_GZIP)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _CompressWorker(object):
+	""" Compresses rotated log segments in a background thread,
+	so that the acquisition loop never has to wait for it
+	"""
+
+	def __init__(self, compression: str, debugMsgCb: Callable[[str], None]):
+		assert is_compression_available(compression), f"compression '{compression}' not available"
+		#
+		self._compression = compression
+		self._debug_msg_cb = debugMsgCb
+		self._queue = queue.Queue()
+		self._thread = threading.Thread(target=self._run, name="CsvCompressWorker", daemon=True)
+		self._thread.start()
+
+	def add_file(self, srcFn: str):
+		""" Queue a file for compression - it will be deleted afterwards """
+		self._queue.put(srcFn)
+
+	def stop(self):
+		""" Compress all queued files and stop the thread """
+		self._queue.put(None)
+		self._thread.join()
+
+	def _run(self):
+		while True:
+			srcFn = self._queue.get()
+			if srcFn is None:
+				break
+			try:
+				self._compress_file(srcFn)
+			except Exception as err:
+				# e.g. OSError or zstandard.ZstdError - keep the thread alive for the next segments
+				self._debug_msg_cb(f"compressing '{srcFn}' failed: {str(err)}")
+
+	def _compress_file(self, srcFn: str):
+		""" Compress into a temporary file that is renamed when complete,
+		so that readers never see a truncated archive under the final name
+		"""
+		dstFn = srcFn + (".zst" if self._compression == COMPRESSION_ZSTD else ".gz")
+		tmpFn = dstFn + ".tmp"
+		try:
+			if self._compression == COMPRESSION_ZSTD:
+				with open(srcFn, mode="rb") as srcFHnd, open(tmpFn, mode="wb") as dstFHnd:
+					zstandard.ZstdCompressor().copy_stream(srcFHnd, dstFHnd)
+			else:
+				with open(srcFn, mode="rb") as srcFHnd, gzip.open(tmpFn, mode="wb") as dstFHnd:
+					shutil.copyfileobj(srcFHnd, dstFHnd)
+			os.replace(tmpFn, dstFn)
+		except BaseException:
+			if path.exists(tmpFn):
+				os.remove(tmpFn)
+			raise
+		os.remove(srcFn)
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -34,10 +131,104 @@ class OutputCommon(object):
 		#
 		self._debug_msg_cb = debugMsgCb
 		#
-		self._sortRefVal = None
-		self._sortRefUnit = None
-		self._deltaRefVal = None
-		self._deltaRefUnit = None
+		self._dtCacheSec = None
+		self._dtCacheStr = ""
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_ts_utc_str(self, timestampNs: int) -> str:
+		""" Get UTC Timestamp as integer plus microseconds
+
+		Parameters:
+			timestampNs (int): nanoseconds since the epoch
+		Returns:
+			str
+		"""
+		return "{:010d}.{:06d}".format(timestampNs // 1000000000, (timestampNs // 1000) % 1000000)
+
+	def _get_dt_utc_str(self, timestampNs: int) -> str:
+		""" Get UTC Date/Time with microseconds
+
+		The date/time part only changes once per second,
+		so it gets cached.
+
+		Parameters:
+			timestampNs (int): nanoseconds since the epoch
+		Returns:
+			str
+		"""
+		tsSec = timestampNs // 1000000000
+		if tsSec != self._dtCacheSec:
+			self._dtCacheSec = tsSec
+			self._dtCacheStr = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(tsSec))
+		return "{:s}.{:06d}".format(self._dtCacheStr, (timestampNs // 1000) % 1000000)
+
+	def _get_freq_hz_str(self, freq: Optional[str]) -> str:
+		""" Convert test frequency (e.g. '1 kHz') to Hz
+
+		Parameters:
+			freq (str)
+		Returns:
+			str
+		"""
+		res = freq if freq else ""
+		if res.endswith(" Hz"):
+			res = res.replace(" Hz", "")
+		elif res.endswith(" kHz"):
+			res = str(int(res.replace(" kHz", "")) * 1000)
+		elif res == "DC":
+			res = "0"
+		return res
+
+	def _read_last_nr(self, csvFn: str, colName: str) -> int:
+		""" Get the highest number of a numbering column (e.g. 'Session') of an existing CSV file
+
+		Parameters:
+			csvFn (str)
+			colName (str)
+		Returns:
+			int: 0 if the file doesn't exist or contains no numbers
+		"""
+		res = 0
+		if not path.isfile(csvFn):
+			return res
+		with open(csvFn, mode="r", newline="") as fHnd:
+			for row in csv.DictReader(fHnd):
+				try:
+					res = max(res, int(row.get(colName) or ""))
+				except ValueError:
+					pass
+		return res
+
+	def _format_display(self, desc: str, packetDisp: De5000StcPacketMainSecondary, dispNormVal = False) -> Optional[str]:
+		""" Format the content of the main or secondary display as text line
+
+		Parameters:
+			desc (str): e.g. 'Primary'
+			packetDisp (De5000StcPacketMainSecondary)
+			dispNormVal (bool): if True output normalized values
+		Returns:
+			str: None if the display is blank
+		"""
+		if not packetDisp.status or packetDisp.status == STATUS_BLANK:
+			return None
+		msg = f"{desc:9s}: "
+		if packetDisp.status in [STATUS_NORMAL, STATUS_OL, STATUS_PASS, STATUS_FAIL]:
+			if packetDisp.quantity:
+				msg += f"{packetDisp.quantity:5s} = "
+			else:
+				msg += "n/a = "
+			if packetDisp.status == STATUS_NORMAL:
+				if dispNormVal:
+					msg += f"{packetDisp.format_norm_val(9)} {packetDisp.normUnits}"
+				else:
+					msg += f"{packetDisp.format_val(4)} {packetDisp.units}"
+			else:
+				msg += f"{packetDisp.status}"
+		else:
+			msg += f"{packetDisp.status}"
+		return msg
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -65,41 +256,56 @@ class CsvOutput(OutputCommon):
 	_ROW_HD_IS_SORT_MODE = "is Sorting Mode [bool]"
 	_ROW_HD_IS_LCR_AUTO_MODE = "is LCR Auto Mode [bool]"
 	_ROW_HD_IS_AUTO_RANGE_MODE = "is Auto Range Mode [bool]"
+	_ROW_HD_ESERIES_SUFFIX_NOMINAL = "Nominal"
+	_ROW_HD_ESERIES_SUFFIX_DEVIATION = "Deviation [%]"
 	#
 	_STR_TRUE = "true"
 	_STR_FALSE = "false"
 
-	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None]):
+	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None],
+			rotateSize: int = 0, rotateInterval: float = 0.0, compression: Optional[str] = None,
+			eseries: Optional[str] = None):
 		""" Initialize object
 
 		Parameters:
 			csvFn (str)
 			debugMsgCb (Callable[[str], None])
+			rotateSize (int): rotate the file when it reaches this size in bytes, 0 means never
+			rotateInterval (float): rotate the file after this amount of seconds, 0 means never
+			compression (str): compress rotated files with COMPRESSION_GZIP or COMPRESSION_ZSTD, None means no compression
+			eseries (str): add the nearest nominal value of this E-series (e.g. 'E24') and the deviation, None means no
 		"""
 		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
 		assert csvFn != "", "csvFn needs to be non-empty string"
+		assert rotateSize >= 0, "rotateSize needs to be >= 0"
+		assert rotateInterval >= 0.0, "rotateInterval needs to be >= 0"
+		assert compression is None or is_compression_available(compression), f"compression '{compression}' not available"
 		#
 		super().__init__(debugMsgCb)
 		#
 		self._fHnd = None
 		self._dictWr = None
 		self._csvFn = csvFn
+		self._rotateSize = rotateSize
+		self._rotateInterval = rotateInterval
+		self._compression = compression
+		self._compressWorkerObj = None
+		self._segmentStartTs = None
+		self._eseries = eseries
+		self._rowHdEseriesNominal = f"{self._ROW_HD_DISP_PREFIX_MAIN} {eseries} {self._ROW_HD_ESERIES_SUFFIX_NOMINAL}"
+		self._rowHdEseriesDeviation = f"{self._ROW_HD_DISP_PREFIX_MAIN} {eseries} {self._ROW_HD_ESERIES_SUFFIX_DEVIATION}"
 
 	def openCsv(self):
 		""" Open CSV file - if the file does not exist it will be created """
-		fieldnames = self._get_csv_header()
-		#
-		fileExisted = path.isfile(self._csvFn)
-		self._fHnd = open(self._csvFn, mode="a")
-		self._dictWr = csv.DictWriter(self._fHnd, fieldnames=fieldnames, lineterminator=linesep)
-		if not fileExisted:
-			self._dictWr.writeheader()
+		if self._compression is not None and self._compressWorkerObj is None:
+			self._compressWorkerObj = _CompressWorker(self._compression, self._debug_msg_cb)
+		self._open_segment()
 
 	def writeCsvDecodedPacket(self, packet: De5000StcPacket):
 		""" Write a decoded packet to CSV file
 
 		Parameters:
-			packet (De5000StcPacket)
+			packet (De5000StcPacket): already processed by De5000RefTracker
 		Raises:
 			Exception
 		"""
@@ -108,38 +314,17 @@ class CsvOutput(OutputCommon):
 		#
 		if not packet.dataValid:
 			return
-		if packet.sortingMode and packet.dispMain.status in [STATUS_NORMAL, STATUS_OL] and packet.dispSec.status == STATUS_BLANK:
-			# the setup for Component Sorting is being entered into the meter
-			#self._debug_msg_cb("(in sorting setup mode) (CSV)")
-			self._sortRefVal = packet.dispMain.normVal
-			self._sortRefUnit = packet.dispMain.normUnits
-			#self._debug_msg_cb(f"setting sortRefVal to {packet.dispMain.normVal:.09f} {packet.dispMain.normUnits} (CSV)")
-			return
-		elif not packet.sortingMode and self._sortRefVal:
-			#self._debug_msg_cb(f"resetting sortRefVal (CSV)")
-			self._sortRefVal = None
-			self._sortRefUnit = None
-		if packet.deltaMode and packet.refShown:
-			# the reference value for the Delta Mode is being displayed on the meter
-			#self._debug_msg_cb("(showing delta ref value) (CSV)")
-			self._deltaRefVal = packet.dispMain.normVal
-			self._deltaRefUnit = packet.dispMain.normUnits
-			#self._debug_msg_cb(f"setting deltaRefVal to {packet.dispMain.normVal:.09f} {packet.dispMain.normUnits} (CSV)")
+		if packet.sortSetup or packet.deltaRefSetup:
+			# a reference value is being set up on the meter
 			return
-		elif not packet.deltaMode and self._deltaRefVal:
-			#self._debug_msg_cb(f"resetting deltaRefVal (CSV)")
-			self._deltaRefVal = None
-			self._deltaRefUnit = None
 		if packet.dispMain.status not in [STATUS_NORMAL, STATUS_OL, STATUS_PASS, STATUS_FAIL]:
 			# the meter is not displaying anything helpful at the moment
 			#self._debug_msg_cb("(main display blank) (CSV)")
 			return
 		#
-		tsSecStr = "{:010d}".format(calendar.timegm(packet.timestamp.timetuple()))
-		tsMsStr = "{:06d}".format(packet.timestamp.microsecond)
 		rowVals = {
-				self._ROW_HD_TS_UTC: "{:s}.{:s}".format(tsSecStr, tsMsStr),  # UTC Timestamp as integer plus microseconds
-				self._ROW_HD_DT_UTC: str(packet.timestamp),  # UTC Date/Time
+				self._ROW_HD_TS_UTC: self._get_ts_utc_str(packet.timestampNs),  # UTC Timestamp as integer plus microseconds
+				self._ROW_HD_DT_UTC: self._get_dt_utc_str(packet.timestampNs),  # UTC Date/Time
 				f"{self._ROW_HD_DISP_PREFIX_MAIN} {self._ROW_HD_DISP_SUFFIX_QUANT}": "",
 				f"{self._ROW_HD_DISP_PREFIX_MAIN} {self._ROW_HD_DISP_SUFFIX_L}": "",
 				f"{self._ROW_HD_DISP_PREFIX_MAIN} {self._ROW_HD_DISP_SUFFIX_C}": "",
@@ -165,37 +350,38 @@ class CsvOutput(OutputCommon):
 				self._ROW_HD_IS_AUTO_RANGE_MODE: ""
 			}
 		#
-		rowVals = self._get_csv_cols_display(rowVals, packet.dispMain, self._ROW_HD_DISP_PREFIX_MAIN)
+		rowVals = self._get_csv_cols_display(rowVals, packet.dispMain, self._ROW_HD_DISP_PREFIX_MAIN, packet.sortRef)
 		if packet.dispSec.status in [STATUS_NORMAL, STATUS_OL]:
-			rowVals = self._get_csv_cols_display(rowVals, packet.dispSec, self._ROW_HD_DISP_PREFIX_SEC)
+			rowVals = self._get_csv_cols_display(rowVals, packet.dispSec, self._ROW_HD_DISP_PREFIX_SEC, packet.sortRef)
 		#
-		rowVals[self._ROW_HD_FREQ] = packet.freq if packet.freq else ""
-		if rowVals[self._ROW_HD_FREQ].endswith(" Hz"):
-			rowVals[self._ROW_HD_FREQ] = rowVals[self._ROW_HD_FREQ].replace(" Hz", "")
-		elif rowVals[self._ROW_HD_FREQ].endswith(" kHz"):
-			rowVals[self._ROW_HD_FREQ] = str(int(rowVals[self._ROW_HD_FREQ].replace(" kHz", "")) * 1000)
-		elif rowVals[self._ROW_HD_FREQ] == "DC":
-			rowVals[self._ROW_HD_FREQ] = "0"
+		rowVals[self._ROW_HD_FREQ] = self._get_freq_hz_str(packet.freq)
 		rowVals[self._ROW_HD_TOL] = packet.tolerance if packet.tolerance else ""
 		if packet.deltaMode:
-			if self._deltaRefVal:
-				rowVals[self._ROW_HD_DELTA_REF] = f"{self._deltaRefVal} {self._deltaRefUnit}"
-			else:
-				rowVals[self._ROW_HD_DELTA_REF] = "n/a"
+			rowVals[self._ROW_HD_DELTA_REF] = packet.deltaRef if packet.deltaRef else "n/a"
 		rowVals[self._ROW_HD_IS_DELTA_MODE] = self._STR_TRUE if packet.deltaMode else self._STR_FALSE
 		rowVals[self._ROW_HD_IS_SORT_MODE] = self._STR_TRUE if packet.sortingMode else self._STR_FALSE
 		rowVals[self._ROW_HD_IS_LCR_AUTO_MODE] = self._STR_TRUE if packet.lcrAuto else self._STR_FALSE
 		rowVals[self._ROW_HD_IS_AUTO_RANGE_MODE] = self._STR_TRUE if packet.autoRange else self._STR_FALSE
+		if self._eseries is not None:
+			tmpBin = bin_display(packet.dispMain, self._eseries)
+			rowVals[self._rowHdEseriesNominal] = tmpBin[1] if tmpBin is not None else ""
+			rowVals[self._rowHdEseriesDeviation] = f"{tmpBin[2]:.3f}" if tmpBin is not None else ""
 		#
 		self._dictWr.writerow(rowVals)
 		self._fHnd.flush()
+		#
+		if ((self._rotateSize > 0 and self._fHnd.tell() >= self._rotateSize) or
+				(self._rotateInterval > 0.0 and time.time() - self._segmentStartTs >= self._rotateInterval)):
+			self._rotate()
 
 	def closeCsv(self):
-		""" Close CSV file """
-		if self._fHnd is None:
-			return
-		self._fHnd.close()
-		self._fHnd = None
+		""" Close CSV file and wait for pending compressions """
+		if self._fHnd is not None:
+			self._fHnd.close()
+			self._fHnd = None
+		if self._compressWorkerObj is not None:
+			self._compressWorkerObj.stop()
+			self._compressWorkerObj = None
 
 	@property
 	def isOpen(self):
@@ -204,6 +390,63 @@ class CsvOutput(OutputCommon):
 	# --------------------------------------------------------------------------
 	# --------------------------------------------------------------------------
 
+	def _open_segment(self):
+		""" Open the current log segment and write the header if it is new.
+		An existing file with other columns (e.g. written with another
+		--eseries setting) is rotated first, appending would mix up the columns.
+		"""
+		tmpHeader = self._get_csv_header()
+		fileHeader = self._read_file_header()
+		if fileHeader is not None and fileHeader != tmpHeader:
+			self._debug_msg_cb(f"columns of existing '{self._csvFn}' differ, starting a new file")
+			self._move_segment(path.getmtime(self._csvFn))
+			fileHeader = None
+		self._fHnd = open(self._csvFn, mode="a")
+		self._dictWr = csv.DictWriter(self._fHnd, fieldnames=tmpHeader, lineterminator=linesep)
+		if fileHeader is None:
+			self._dictWr.writeheader()
+		self._segmentStartTs = time.time()
+
+	def _read_file_header(self) -> Optional[list]:
+		""" Get the header of the existing CSV file
+
+		Returns:
+			list: None if the file doesn't exist or is empty
+		"""
+		if not path.isfile(self._csvFn):
+			return None
+		with open(self._csvFn, mode="r", newline="") as fHnd:
+			firstLine = fHnd.readline()
+		if firstLine == "":
+			return None
+		return next(csv.reader([firstLine], quotechar=detect_quotechar(firstLine)), [])
+
+	def _rotate(self):
+		""" Close the current log segment, rename it to
+		'<name>-<YYYYmmdd-HHMMSS>.csv' and start a new one
+		"""
+		self._fHnd.close()
+		self._fHnd = None
+		self._move_segment(self._segmentStartTs)
+		self._open_segment()
+
+	def _move_segment(self, startTs: float):
+		""" Rename the current log segment file and queue it for compression
+
+		Parameters:
+			startTs (float): start of the segment, used for the new name
+		"""
+		tmpBase, tmpExt = path.splitext(self._csvFn)
+		tmpSuffix = time.strftime("%Y%m%d-%H%M%S", time.localtime(startTs))
+		rotatedFn = f"{tmpBase}-{tmpSuffix}{tmpExt}"
+		tmpCnt = 1
+		while path.exists(rotatedFn) or path.exists(rotatedFn + ".gz") or path.exists(rotatedFn + ".zst"):
+			rotatedFn = f"{tmpBase}-{tmpSuffix}-{tmpCnt}{tmpExt}"
+			tmpCnt += 1
+		os.rename(self._csvFn, rotatedFn)
+		if self._compressWorkerObj is not None:
+			self._compressWorkerObj.add_file(rotatedFn)
+
 	def _get_csv_header(self) -> list:
 		""" Get array with CSV header entries
 
@@ -237,9 +480,12 @@ class CsvOutput(OutputCommon):
 				self._ROW_HD_IS_LCR_AUTO_MODE,
 				self._ROW_HD_IS_AUTO_RANGE_MODE
 			]
+		if self._eseries is not None:
+			resA.append(self._rowHdEseriesNominal)
+			resA.append(self._rowHdEseriesDeviation)
 		return resA
 
-	def _get_csv_cols_display(self, rowVals: dict, packetDisp: De5000StcPacketMainSecondary, colPrefix: str) -> dict:
+	def _get_csv_cols_display(self, rowVals: dict, packetDisp: De5000StcPacketMainSecondary, colPrefix: str, sortRef: Optional[str]) -> dict:
 		if not packetDisp.quantity:
 			#self._debug_msg_cb(f"({colPrefix} no quant) (CSV)")
 			return rowVals
@@ -273,13 +519,10 @@ class CsvOutput(OutputCommon):
 			#self._debug_msg_cb(f"colA='{colA}', colB='{colB}' (CSV)")
 			if packetDisp.status in [STATUS_PASS, STATUS_FAIL]:
 				rowVals[colA] = self._STR_TRUE if packetDisp.status == STATUS_PASS else self._STR_FALSE
-				if self._sortRefVal:
-					rowVals[colB] = f"{self._sortRefVal} {self._sortRefUnit}"
-				else:
-					rowVals[colB] = "n/a"
+				rowVals[colB] = sortRef if sortRef else "n/a"
 				#self._debug_msg_cb(f"valB='{rowVals[colB]}' (CSV)")
 			elif packetDisp.status == STATUS_NORMAL:
-				rowVals[colA] = f"{packetDisp.normVal:.09f}" if packetDisp.normVal else ""
+				rowVals[colA] = packetDisp.format_norm_val(9) if packetDisp.mantissa else ""
 			else:
 				# Status is "Overload"
 				rowVals[colA] = self._STR_TRUE
@@ -289,25 +532,498 @@ class CsvOutput(OutputCommon):
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
+class SessionCsvOutput(OutputCommon):
+	""" Writes one aggregated CSV row per component session (inserted part) """
+
+	_ROW_HD_SESSION = "Session"
+	_ROW_HD_TS_UTC_START = "Start Timestamp UTC"
+	_ROW_HD_DT_UTC_START = "Start DateTime UTC"
+	_ROW_HD_TS_UTC_END = "End Timestamp UTC"
+	_ROW_HD_DURATION = "Duration [s]"
+	_ROW_HD_READINGS = "Readings"
+	_ROW_HD_FREQ = CsvOutput._ROW_HD_FREQ
+	_ROW_HD_IS_PARALLEL = "is Parallel [bool]"
+	_ROW_HD_IS_LCR_AUTO_MODE = CsvOutput._ROW_HD_IS_LCR_AUTO_MODE
+	_ROW_HD_DISP_PREFIX_MAIN = CsvOutput._ROW_HD_DISP_PREFIX_MAIN
+	_ROW_HD_DISP_PREFIX_SEC = CsvOutput._ROW_HD_DISP_PREFIX_SEC
+	_ROW_HD_DISP_SUFFIX_QUANT = CsvOutput._ROW_HD_DISP_SUFFIX_QUANT
+	_ROW_HD_DISP_SUFFIX_UNITS = "Unit"
+	_ROW_HD_DISP_SUFFIX_MEDIAN = "Median"
+	_ROW_HD_DISP_SUFFIX_MIN = "Min"
+	_ROW_HD_DISP_SUFFIX_MAX = "Max"
+	_ROW_HD_DISP_SUFFIX_SPREAD = "Spread"
+	#
+	_STR_TRUE = CsvOutput._STR_TRUE
+	_STR_FALSE = CsvOutput._STR_FALSE
+
+	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None], minReadings: int = 1):
+		""" Initialize object
+
+		Parameters:
+			csvFn (str)
+			debugMsgCb (Callable[[str], None])
+			minReadings (int): sessions with less readings are discarded
+		"""
+		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
+		assert csvFn != "", "csvFn needs to be non-empty string"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._fHnd = None
+		self._dictWr = None
+		self._csvFn = csvFn
+		self._segmenterObj = De5000SessionSegmenter(minReadings=minReadings)
+		self._nrOffset = 0
+
+	def openCsv(self):
+		""" Open CSV file - if the file does not exist it will be created
+
+		The session numbers continue after the last one of an existing file.
+		"""
+		fileExisted = path.isfile(self._csvFn)
+		self._nrOffset = self._read_last_nr(self._csvFn, self._ROW_HD_SESSION)
+		self._fHnd = open(self._csvFn, mode="a")
+		self._dictWr = csv.DictWriter(self._fHnd, fieldnames=self._get_csv_header(), lineterminator=linesep)
+		if not fileExisted:
+			self._dictWr.writeheader()
+
+	def writeCsvDecodedPacket(self, packet: De5000StcPacket):
+		""" Feed a decoded packet into the session segmentation and write
+		a row to the CSV file if a session has ended
+
+		Parameters:
+			packet (De5000StcPacket)
+		Raises:
+			Exception
+		"""
+		if self._fHnd is None or self._dictWr is None:
+			raise Exception("need to call openCsv() first")
+		#
+		session = self._segmenterObj.process_packet(packet)
+		if session is not None:
+			self._write_session(session)
+
+	def closeCsv(self):
+		""" Write the current session (if any) and close CSV file """
+		if self._fHnd is None:
+			return
+		session = self._segmenterObj.flush()
+		if session is not None:
+			self._write_session(session)
+		self._fHnd.close()
+		self._fHnd = None
+
+	@property
+	def isOpen(self):
+		return (self._fHnd is not None)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_csv_header(self) -> list:
+		resA = [
+				self._ROW_HD_SESSION,
+				self._ROW_HD_TS_UTC_START,
+				self._ROW_HD_DT_UTC_START,
+				self._ROW_HD_TS_UTC_END,
+				self._ROW_HD_DURATION,
+				self._ROW_HD_READINGS,
+				self._ROW_HD_FREQ,
+				self._ROW_HD_IS_PARALLEL,
+				self._ROW_HD_IS_LCR_AUTO_MODE
+			]
+		for colPrefix in [self._ROW_HD_DISP_PREFIX_MAIN, self._ROW_HD_DISP_PREFIX_SEC]:
+			for colSuffix in [
+					self._ROW_HD_DISP_SUFFIX_QUANT,
+					self._ROW_HD_DISP_SUFFIX_UNITS,
+					self._ROW_HD_DISP_SUFFIX_MEDIAN,
+					self._ROW_HD_DISP_SUFFIX_MIN,
+					self._ROW_HD_DISP_SUFFIX_MAX,
+					self._ROW_HD_DISP_SUFFIX_SPREAD]:
+				resA.append(f"{colPrefix} {colSuffix}")
+		return resA
+
+	def _write_session(self, session: De5000Session):
+		rowVals = {
+				self._ROW_HD_SESSION: str(self._nrOffset + session.sessionNr),
+				self._ROW_HD_TS_UTC_START: self._get_ts_utc_str(session.firstTimestampNs),
+				self._ROW_HD_DT_UTC_START: self._get_dt_utc_str(session.firstTimestampNs),
+				self._ROW_HD_TS_UTC_END: self._get_ts_utc_str(session.lastTimestampNs),
+				self._ROW_HD_DURATION: f"{session.duration:.06f}",
+				self._ROW_HD_READINGS: str(session.count),
+				self._ROW_HD_FREQ: self._get_freq_hz_str(session.freq),
+				self._ROW_HD_IS_PARALLEL: self._STR_TRUE if session.parallel else self._STR_FALSE,
+				self._ROW_HD_IS_LCR_AUTO_MODE: self._STR_TRUE if session.lcrAuto else self._STR_FALSE
+			}
+		for colPrefix, sessionDisp in [(self._ROW_HD_DISP_PREFIX_MAIN, session.dispMain), (self._ROW_HD_DISP_PREFIX_SEC, session.dispSec)]:
+			hasVals = (sessionDisp.count > 0)
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_QUANT}"] = sessionDisp.quantity if hasVals and sessionDisp.quantity else ""
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_UNITS}"] = sessionDisp.normUnits if hasVals and sessionDisp.normUnits else ""
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_MEDIAN}"] = sessionDisp.format_val(sessionDisp.median, 9)
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_MIN}"] = sessionDisp.format_val(sessionDisp.min, 9)
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_MAX}"] = sessionDisp.format_val(sessionDisp.max, 9)
+			rowVals[f"{colPrefix} {self._ROW_HD_DISP_SUFFIX_SPREAD}"] = sessionDisp.format_val(sessionDisp.spread, 9)
+		#
+		self._dictWr.writerow(rowVals)
+		self._fHnd.flush()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class SweepCsvOutput(OutputCommon):
+	""" Writes one CSV row per frequency sweep (part), with the median
+	of the main and secondary display for every test frequency
+	"""
+
+	_ROW_HD_SWEEP = "Sweep"
+	_ROW_HD_TS_UTC_START = SessionCsvOutput._ROW_HD_TS_UTC_START
+	_ROW_HD_DT_UTC_START = SessionCsvOutput._ROW_HD_DT_UTC_START
+	_ROW_HD_TS_UTC_END = SessionCsvOutput._ROW_HD_TS_UTC_END
+	_ROW_HD_DURATION = SessionCsvOutput._ROW_HD_DURATION
+	_ROW_HD_IS_PARALLEL = SessionCsvOutput._ROW_HD_IS_PARALLEL
+	_ROW_HD_DISP_PREFIX_MAIN = CsvOutput._ROW_HD_DISP_PREFIX_MAIN
+	_ROW_HD_DISP_PREFIX_SEC = CsvOutput._ROW_HD_DISP_PREFIX_SEC
+	_ROW_HD_DISP_SUFFIX_QUANT = CsvOutput._ROW_HD_DISP_SUFFIX_QUANT
+	_ROW_HD_DISP_SUFFIX_UNITS = SessionCsvOutput._ROW_HD_DISP_SUFFIX_UNITS
+	_ROW_HD_FREQ_SUFFIX_READINGS = SessionCsvOutput._ROW_HD_READINGS
+	#
+	_STR_TRUE = CsvOutput._STR_TRUE
+	_STR_FALSE = CsvOutput._STR_FALSE
+
+	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None], settleReadings: int = 1):
+		""" Initialize object
+
+		Parameters:
+			csvFn (str)
+			debugMsgCb (Callable[[str], None])
+			settleReadings (int): amount of readings after a frequency change that are ignored
+		"""
+		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
+		assert csvFn != "", "csvFn needs to be non-empty string"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._fHnd = None
+		self._dictWr = None
+		self._csvFn = csvFn
+		self._segmenterObj = De5000SweepSegmenter(settleReadings=settleReadings)
+		self._nrOffset = 0
+
+	def openCsv(self):
+		""" Open CSV file - if the file does not exist it will be created
+
+		The sweep numbers continue after the last one of an existing file.
+		"""
+		fileExisted = path.isfile(self._csvFn)
+		self._nrOffset = self._read_last_nr(self._csvFn, self._ROW_HD_SWEEP)
+		self._fHnd = open(self._csvFn, mode="a")
+		self._dictWr = csv.DictWriter(self._fHnd, fieldnames=self._get_csv_header(), lineterminator=linesep)
+		if not fileExisted:
+			self._dictWr.writeheader()
+
+	def writeCsvDecodedPacket(self, packet: De5000StcPacket):
+		""" Feed a decoded packet into the sweep segmentation and write
+		a row to the CSV file if a sweep has ended
+
+		Parameters:
+			packet (De5000StcPacket)
+		Raises:
+			Exception
+		"""
+		if self._fHnd is None or self._dictWr is None:
+			raise Exception("need to call openCsv() first")
+		#
+		sweep = self._segmenterObj.process_packet(packet)
+		if sweep is not None:
+			self._write_sweep(sweep)
+
+	def closeCsv(self):
+		""" Write the current sweep (if any) and close CSV file """
+		if self._fHnd is None:
+			return
+		sweep = self._segmenterObj.flush()
+		if sweep is not None:
+			self._write_sweep(sweep)
+		self._fHnd.close()
+		self._fHnd = None
+
+	@property
+	def isOpen(self):
+		return (self._fHnd is not None)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_csv_header(self) -> list:
+		resA = [
+				self._ROW_HD_SWEEP,
+				self._ROW_HD_TS_UTC_START,
+				self._ROW_HD_DT_UTC_START,
+				self._ROW_HD_TS_UTC_END,
+				self._ROW_HD_DURATION,
+				self._ROW_HD_IS_PARALLEL
+			]
+		for colPrefix in [self._ROW_HD_DISP_PREFIX_MAIN, self._ROW_HD_DISP_PREFIX_SEC]:
+			for colSuffix in [self._ROW_HD_DISP_SUFFIX_QUANT, self._ROW_HD_DISP_SUFFIX_UNITS]:
+				resA.append(f"{colPrefix} {colSuffix}")
+		for freq in SWEEP_FREQS:
+			for colSuffix in [self._ROW_HD_DISP_PREFIX_MAIN, self._ROW_HD_DISP_PREFIX_SEC, self._ROW_HD_FREQ_SUFFIX_READINGS]:
+				resA.append(self._get_freq_col(freq, colSuffix))
+		return resA
+
+	def _get_freq_col(self, freq: str, colSuffix: str) -> str:
+		return f"{self._get_freq_hz_str(freq)} Hz {colSuffix}"
+
+	def _write_sweep(self, sweep: De5000Sweep):
+		rowVals = {
+				self._ROW_HD_SWEEP: str(self._nrOffset + sweep.sweepNr),
+				self._ROW_HD_TS_UTC_START: self._get_ts_utc_str(sweep.firstTimestampNs),
+				self._ROW_HD_DT_UTC_START: self._get_dt_utc_str(sweep.firstTimestampNs),
+				self._ROW_HD_TS_UTC_END: self._get_ts_utc_str(sweep.lastTimestampNs),
+				self._ROW_HD_DURATION: f"{sweep.duration:.06f}",
+				self._ROW_HD_IS_PARALLEL: self._STR_TRUE if sweep.parallel else self._STR_FALSE,
+				f"{self._ROW_HD_DISP_PREFIX_MAIN} {self._ROW_HD_DISP_SUFFIX_QUANT}": sweep.mainQuantity if sweep.mainQuantity else "",
+				f"{self._ROW_HD_DISP_PREFIX_MAIN} {self._ROW_HD_DISP_SUFFIX_UNITS}": sweep.mainNormUnits if sweep.mainNormUnits else "",
+				f"{self._ROW_HD_DISP_PREFIX_SEC} {self._ROW_HD_DISP_SUFFIX_QUANT}": sweep.secQuantity if sweep.secQuantity else "",
+				f"{self._ROW_HD_DISP_PREFIX_SEC} {self._ROW_HD_DISP_SUFFIX_UNITS}": sweep.secNormUnits if sweep.secNormUnits else ""
+			}
+		for freq, step in sweep.steps.items():
+			rowVals[self._get_freq_col(freq, self._ROW_HD_DISP_PREFIX_MAIN)] = step.dispMain.format_val(step.dispMain.median, 9)
+			rowVals[self._get_freq_col(freq, self._ROW_HD_DISP_PREFIX_SEC)] = step.dispSec.format_val(step.dispSec.median, 9)
+			rowVals[self._get_freq_col(freq, self._ROW_HD_FREQ_SUFFIX_READINGS)] = str(step.count)
+		#
+		self._dictWr.writerow(rowVals)
+		self._fHnd.flush()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class LinkStatsOutput(OutputCommon):
+	""" Collects the link quality statistics of a meter and writes the
+	histogram (one row per interval) to a CSV file when closed
+	"""
+
+	_ROW_HD_TS_UTC_START = SessionCsvOutput._ROW_HD_TS_UTC_START
+	_ROW_HD_DT_UTC_START = SessionCsvOutput._ROW_HD_DT_UTC_START
+	_ROW_HD_OFFSET = "Offset [s]"
+	_ROW_HD_ERRORS = "Errors"
+	_ROW_HD_DISCARDED_BYTES = "Discarded Bytes"
+	_ROW_HD_RESYNCS = "Resyncs"
+	_ROW_HD_RESYNC_TIME = "Resync Time [s]"
+
+	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None], binSize: float = 60.0):
+		""" Initialize object
+
+		Parameters:
+			csvFn (str)
+			debugMsgCb (Callable[[str], None])
+			binSize (float): interval of the histogram in seconds
+		"""
+		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
+		assert csvFn != "", "csvFn needs to be non-empty string"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._csvFn = csvFn
+		self._linkStats = De5000LinkStats(binSize=binSize)
+
+	@property
+	def linkStats(self) -> De5000LinkStats:
+		""" Needs to be passed to De5000Uart """
+		return self._linkStats
+
+	def close(self) -> list:
+		""" Write the histogram to the CSV file
+
+		Returns:
+			list: summary, see De5000LinkStats.get_summary()
+		"""
+		with open(self._csvFn, mode="w") as fHnd:
+			dictWr = csv.DictWriter(fHnd, fieldnames=self._get_csv_header(), lineterminator=linesep)
+			dictWr.writeheader()
+			for binObj in self._linkStats.get_bins():
+				rowVals = {
+						self._ROW_HD_TS_UTC_START: self._get_ts_utc_str(binObj.startTimestampNs),
+						self._ROW_HD_DT_UTC_START: self._get_dt_utc_str(binObj.startTimestampNs),
+						self._ROW_HD_OFFSET: f"{binObj.startOffsetNs / 1E9:.03f}",
+						self._ROW_HD_ERRORS: str(binObj.errorCount),
+						self._ROW_HD_DISCARDED_BYTES: str(binObj.discardedBytes),
+						self._ROW_HD_RESYNCS: str(binObj.resyncCount),
+						self._ROW_HD_RESYNC_TIME: f"{binObj.resyncTimeNs / 1E9:.06f}"
+					}
+				for kind in KINDS:
+					rowVals[self._get_kind_col(kind)] = str(binObj.counts[kind])
+				dictWr.writerow(rowVals)
+		return self._linkStats.get_summary()
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_csv_header(self) -> list:
+		resA = [
+				self._ROW_HD_TS_UTC_START,
+				self._ROW_HD_DT_UTC_START,
+				self._ROW_HD_OFFSET
+			]
+		resA += [self._get_kind_col(x) for x in KINDS]
+		resA += [
+				self._ROW_HD_ERRORS,
+				self._ROW_HD_DISCARDED_BYTES,
+				self._ROW_HD_RESYNCS,
+				self._ROW_HD_RESYNC_TIME
+			]
+		return resA
+
+	def _get_kind_col(self, kind: str) -> str:
+		return kind.title()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class DriftLogOutput(OutputCommon):
+	""" Writes one CSV row per detected step or drift (see de5000_drift.py) """
+
+	_ROW_HD_TS_UTC = CsvOutput._ROW_HD_TS_UTC
+	_ROW_HD_DT_UTC = CsvOutput._ROW_HD_DT_UTC
+	_ROW_HD_DISPLAY = "Display"
+	_ROW_HD_QUANT = "Quantity"
+	_ROW_HD_UNITS = "Unit"
+	_ROW_HD_FREQ = CsvOutput._ROW_HD_FREQ
+	_ROW_HD_DETECTOR = "Detector"
+	_ROW_HD_DIRECTION = "Direction"
+	_ROW_HD_BASELINE = "Baseline"
+	_ROW_HD_BASELINE_STD = "Baseline Std"
+	_ROW_HD_LEVEL = "Level"
+	_ROW_HD_CHANGE = "Change [%]"
+
+	def __init__(self, csvFn: str, debugMsgCb: Callable[[str], None], warmup: int = 300):
+		""" Initialize object
+
+		Parameters:
+			csvFn (str)
+			debugMsgCb (Callable[[str], None])
+			warmup (int): amount of readings for the baseline
+		"""
+		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
+		assert csvFn != "", "csvFn needs to be non-empty string"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._fHnd = None
+		self._dictWr = None
+		self._csvFn = csvFn
+		self._monitorObj = De5000DriftMonitor(warmup=warmup)
+
+	def openCsv(self):
+		""" Open CSV file - if the file does not exist it will be created """
+		fileExisted = path.isfile(self._csvFn)
+		self._fHnd = open(self._csvFn, mode="a")
+		self._dictWr = csv.DictWriter(self._fHnd, fieldnames=self._get_csv_header(), lineterminator=linesep)
+		if not fileExisted:
+			self._dictWr.writeheader()
+
+	def process_packet(self, packet: De5000StcPacket) -> list:
+		""" Feed a decoded packet into the detectors and write a row per event
+
+		Parameters:
+			packet (De5000StcPacket)
+		Returns:
+			list: list of De5000DriftEvent
+		Raises:
+			Exception
+		"""
+		if self._fHnd is None or self._dictWr is None:
+			raise Exception("need to call openCsv() first")
+		#
+		eventsA = self._monitorObj.process_packet(packet)
+		for event in eventsA:
+			self._write_event(event)
+		return eventsA
+
+	def closeCsv(self):
+		""" Close CSV file """
+		if self._fHnd is None:
+			return
+		self._fHnd.close()
+		self._fHnd = None
+
+	@property
+	def isOpen(self):
+		return (self._fHnd is not None)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_csv_header(self) -> list:
+		return [
+				self._ROW_HD_TS_UTC,
+				self._ROW_HD_DT_UTC,
+				self._ROW_HD_DISPLAY,
+				self._ROW_HD_QUANT,
+				self._ROW_HD_UNITS,
+				self._ROW_HD_FREQ,
+				self._ROW_HD_DETECTOR,
+				self._ROW_HD_DIRECTION,
+				self._ROW_HD_BASELINE,
+				self._ROW_HD_BASELINE_STD,
+				self._ROW_HD_LEVEL,
+				self._ROW_HD_CHANGE
+			]
+
+	def _write_event(self, event: De5000DriftEvent):
+		tmpChange = event.changePerc
+		rowVals = {
+				self._ROW_HD_TS_UTC: self._get_ts_utc_str(event.timestampNs),
+				self._ROW_HD_DT_UTC: self._get_dt_utc_str(event.timestampNs),
+				self._ROW_HD_DISPLAY: CsvOutput._ROW_HD_DISP_PREFIX_SEC if event.isSecondary else CsvOutput._ROW_HD_DISP_PREFIX_MAIN,
+				self._ROW_HD_QUANT: event.quantity if event.quantity else "",
+				self._ROW_HD_UNITS: event.normUnits if event.normUnits else "",
+				self._ROW_HD_FREQ: self._get_freq_hz_str(event.freq),
+				self._ROW_HD_DETECTOR: event.detector,
+				self._ROW_HD_DIRECTION: event.direction,
+				self._ROW_HD_BASELINE: f"{event.baseline:.9g}",
+				self._ROW_HD_BASELINE_STD: f"{event.baselineStd:.6g}",
+				self._ROW_HD_LEVEL: f"{event.level:.9g}",
+				self._ROW_HD_CHANGE: f"{tmpChange:.4f}" if tmpChange is not None else ""
+			}
+		self._dictWr.writerow(rowVals)
+		self._fHnd.flush()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
 class ConsoleOutput(OutputCommon):
-	def __init__(self, debugMsgCb: Callable[[str], None], statusMsgCb: Callable[[str], None]):
+	_ANSI_ALARM = "\x1b[1;37;41m"
+	_ANSI_RESET = "\x1b[0m"
+
+	def __init__(self, debugMsgCb: Callable[[str], None], statusMsgCb: Callable[[str], None], eseries: Optional[str] = None):
 		""" Initialize object
 
 		Parameters:
 			debugMsgCb (Callable[[str], None])
 			statusMsgCb (Callable[[str], None])
+			eseries (str): output the nearest nominal value of this E-series (e.g. 'E24'), None means no
 		"""
 		assert statusMsgCb is not None, "statusMsgCb needs to be function"
 		#
 		super().__init__(debugMsgCb)
 		#
 		self._status_msg_cb = statusMsgCb
+		self._eseries = eseries
+
+	def print_alarm(self, msg: str):
+		""" Print a highlighted alarm message
+
+		Parameters:
+			msg (str)
+		"""
+		self._status_msg_cb(f"{self._ANSI_ALARM} ALARM {self._ANSI_RESET} {msg}")
 
 	def print_decoded_packet(self, packet: De5000StcPacket, dispNormVal = False, dispErrorRate = False):
 		""" Print a decoded packet to screen
 
 		Parameters:
-			packet (De5000StcPacket)
+			packet (De5000StcPacket): already processed by De5000RefTracker
 			dispNormVal (bool): if True output normalized values
 			dispErrorRate (bool): if True output transmission error rate
 		"""
@@ -345,51 +1061,30 @@ class ConsoleOutput(OutputCommon):
 
 		# Delta Mode Parameters
 		if packet.deltaMode:
-			if packet.refShown:
+			if packet.deltaRefSetup:
 				self._status_msg_cb("DELTA (showing reference)")
-				# the reference value for the Delta Mode is being displayed on the meter
-				self._deltaRefVal = packet.dispMain.normVal
-				self._deltaRefUnit = packet.dispMain.normUnits
-				#self._debug_msg_cb(f"setting deltaRefVal to {packet.dispMain.normVal:.09f} {packet.dispMain.normUnits} (CON)")
 			else:
 				self._status_msg_cb("DELTA")
 
 		# Main + Secondary Display
-		if packet.sortingMode and packet.dispMain.status in [STATUS_NORMAL, STATUS_OL] and packet.dispSec.status == STATUS_BLANK:
-			# the setup for Component Sorting is being entered into the meter
+		if packet.sortSetup:
 			self._status_msg_cb("(in sorting setup mode)")
-			self._sortRefVal = packet.dispMain.normVal
-			self._sortRefUnit = packet.dispMain.normUnits
-			self._status_msg_cb(f"(setting sorting reference to {packet.dispMain.normVal:.09f} {packet.dispMain.normUnits})")
+			self._status_msg_cb(f"(setting sorting reference to {packet.dispMain.format_norm_val(9)} {packet.dispMain.normUnits})")
 		else:
 			self._print_decoded_packet_display("Primary", packet.dispMain, dispNormVal=dispNormVal)
 			self._print_decoded_packet_display("Secondary", packet.dispSec, dispNormVal=dispNormVal)
+			if self._eseries is not None:
+				tmpBin = bin_display(packet.dispMain, self._eseries)
+				if tmpBin is not None:
+					self._status_msg_cb(f"{self._eseries:9s}: {tmpBin[1]} {packet.dispMain.normUnits} ({tmpBin[2]:+.2f}%)")
 
 		# Sorting Reference
 		if packet.sortingMode and packet.dispMain.status in [STATUS_PASS, STATUS_FAIL]:
-			msg = "Sorting Reference: "
-			if self._sortRefVal:
-				msg += f"{self._sortRefVal} {self._sortRefUnit}"
-			else:
-				msg += "n/a"
-			self._status_msg_cb(msg)
-		elif not packet.sortingMode and self._sortRefVal:
-			#self._debug_msg_cb(f"resetting sortRefVal (CON)")
-			self._sortRefVal = None
-			self._sortRefUnit = None
+			self._status_msg_cb(f"Sorting Reference: {packet.sortRef if packet.sortRef else 'n/a'}")
 
 		# Delta Reference
 		if packet.deltaMode and not packet.refShown:
-			msg = "Delta Reference: "
-			if self._deltaRefVal:
-				msg += f"{self._deltaRefVal} {self._deltaRefUnit}"
-			else:
-				msg += "n/a"
-			self._status_msg_cb(msg)
-		elif not packet.deltaMode and self._deltaRefVal:
-			#self._debug_msg_cb(f"resetting deltaRefVal (CON)")
-			self._deltaRefVal = None
-			self._deltaRefUnit = None
+			self._status_msg_cb(f"Delta Reference: {packet.deltaRef if packet.deltaRef else 'n/a'}")
 
 	# --------------------------------------------------------------------------
 	# --------------------------------------------------------------------------
@@ -397,21 +1092,6 @@ class ConsoleOutput(OutputCommon):
 	def _print_decoded_packet_display(self, desc: str, packetDisp: De5000StcPacketMainSecondary, dispNormVal = False):
 		#self._debug_msg_cb(str(packetDisp) + " (CON)")
 		#
-		if not packetDisp.status or packetDisp.status == STATUS_BLANK:
-			return
-		msg = f"{desc:9s}: "
-		if packetDisp.status in [STATUS_NORMAL, STATUS_OL, STATUS_PASS, STATUS_FAIL]:
-			if packetDisp.quantity:
-				msg += f"{packetDisp.quantity:5s} = "
-			else:
-				msg += "n/a = "
-			if packetDisp.status == STATUS_NORMAL:
-				if dispNormVal:
-					msg += f"{packetDisp.normVal:.09f} {packetDisp.normUnits}"
-				else:
-					msg += f"{packetDisp.val:.04f} {packetDisp.units}"
-			else:
-				msg += f"{packetDisp.status}"
-		else:
-			msg += f"{packetDisp.status}"
-		self._status_msg_cb(msg)
+		msg = self._format_display(desc, packetDisp, dispNormVal=dispNormVal)
+		if msg is not None:
+			self._status_msg_cb(msg)
@@ -0,0 +1,92 @@
+#
+# by TS, Mai 2022
+#
+
+import os
+import subprocess
+from typing import Callable, Optional
+
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_stc_packet import \
+		De5000StcPacket
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_rules import \
+		De5000RuleEngine, De5000RuleEvent, load_rules, \
+		ACTION_EXIT, ACTION_SCRIPT
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class RuleHookOutput(object):
+	""" Evaluates the rules of a config file on every packet and runs
+	the hooks of triggered rules:
+		- every trigger is passed to alarmMsgCb (console highlight)
+		- 'exit': exitCode gets set, the caller is supposed to stop
+		- 'script': the script is started in the background with the
+		  environment variables DE5000_RULE, DE5000_MESSAGE, DE5000_VALUE,
+		  DE5000_METER and DE5000_TIMESTAMP_NS
+	"""
+
+	def __init__(self, rulesFn: str, debugMsgCb: Callable[[str], None], alarmMsgCb: Callable[[str, str], None]):
+		""" Initialize object
+
+		Parameters:
+			rulesFn (str): JSON config file, see de5000_rules.py
+			debugMsgCb (Callable[[str], None])
+			alarmMsgCb (Callable[[str, str], None]): called with (meter name, message)
+		Raises:
+			ValueError: if the config file is invalid
+		"""
+		self._debug_msg_cb = debugMsgCb
+		self._alarm_msg_cb = alarmMsgCb
+		self._rules = load_rules(rulesFn)
+		# one engine per meter - error rates and trigger states are per meter
+		self._engines = {}
+		self._exitCode = None
+		self._scriptProcs = []
+
+	@property
+	def ruleCount(self) -> int:
+		return len(self._rules)
+
+	@property
+	def exitCode(self) -> Optional[int]:
+		""" Exit code of the first triggered 'exit' rule, None if none has triggered """
+		return self._exitCode
+
+	def process_packet(self, meterName: str, packet: De5000StcPacket):
+		""" Evaluate the rules
+
+		Parameters:
+			meterName (str): e.g. the serial port of the meter
+			packet (De5000StcPacket): valid or invalid packet
+		"""
+		engine = self._engines.get(meterName)
+		if engine is None:
+			engine = De5000RuleEngine(self._rules)
+			self._engines[meterName] = engine
+		for event in engine.process_packet(packet):
+			self._run_hooks(meterName, event)
+		if self._scriptProcs:
+			# reap finished scripts
+			self._scriptProcs = [x for x in self._scriptProcs if x.poll() is None]
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _run_hooks(self, meterName: str, event: De5000RuleEvent):
+		msg = event.get_message()
+		self._alarm_msg_cb(meterName, msg)
+		rule = event.rule
+		if rule.action == ACTION_EXIT:
+			if self._exitCode is None:
+				self._exitCode = rule.exitCode
+		elif rule.action == ACTION_SCRIPT:
+			tmpEnv = dict(os.environ)
+			tmpEnv["DE5000_RULE"] = rule.name
+			tmpEnv["DE5000_MESSAGE"] = msg
+			tmpEnv["DE5000_VALUE"] = f"{event.value:g}"
+			tmpEnv["DE5000_METER"] = meterName
+			tmpEnv["DE5000_TIMESTAMP_NS"] = str(event.packet.timestampNs) if event.packet.timestampNs is not None else ""
+			try:
+				self._scriptProcs.append(subprocess.Popen([rule.script], env=tmpEnv))
+			except OSError as err:
+				self._debug_msg_cb(f"could not run script '{rule.script}': {str(err)}")
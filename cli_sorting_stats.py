@@ -0,0 +1,248 @@
+#
+# by TS, Apr 2022
+#
+
+from collections import deque
+import datetime
+import math
+from typing import Callable, Optional
+
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import \
+		STATUS_PASS, STATUS_FAIL
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_stc_packet import \
+		De5000StcPacket
+
+from cli_output import OutputCommon
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _SortingGroupStats(object):
+	def __init__(self):
+		self.countPass = 0
+		self.countFail = 0
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class SortingStatsOutput(OutputCommon):
+	""" Live production statistics for the Component Sorting mode.
+
+	A part is detected when the main display changes to PASS/FAIL and
+	is counted with its final verdict once the display leaves PASS/FAIL
+	again (part removed) or the sorting mode is left.
+	"""
+
+	# amount of recent parts used for the recent throughput and yield
+	_RECENT_PARTS = 50
+	# length of a yield trend bucket in seconds
+	_TREND_BUCKET_SECS = 600
+	# amount of yield trend buckets shown
+	_TREND_BUCKETS = 6
+	# upper limits of the time-per-part histogram bins in seconds
+	_HISTO_LIMITS = [2.0, 5.0, 10.0, 20.0, 30.0, 60.0]
+
+	def __init__(self, summaryFn: str, debugMsgCb: Callable[[str], None], reportMsgCb: Optional[Callable[[str], None]] = None, reportInterval: float = 60.0):
+		""" Initialize object
+
+		Parameters:
+			summaryFn (str): file the summary gets written to
+			debugMsgCb (Callable[[str], None])
+			reportMsgCb (Callable[[str], None]): callback for console reports, None disables them
+			reportInterval (float): seconds between two console reports / summary file updates
+		"""
+		assert summaryFn is not None and isinstance(summaryFn, str), "summaryFn needs to be string"
+		assert summaryFn != "", "summaryFn needs to be non-empty string"
+		assert reportInterval > 0.0, "reportInterval needs to be > 0"
+		#
+		super().__init__(debugMsgCb)
+		#
+		self._summaryFn = summaryFn
+		self._report_msg_cb = reportMsgCb
+		self._reportInterval = reportInterval
+		#
+		self._groups = {}
+		self._countPass = 0
+		self._countFail = 0
+		self._firstPartTs = None
+		self._lastPartStartTs = None
+		self._lastReportTs = None
+		self._cycleTimes = []
+		self._contactTimes = []
+		self._recentParts = deque(maxlen=self._RECENT_PARTS)
+		self._trendBuckets = deque(maxlen=self._TREND_BUCKETS)
+		#
+		self._partStartTs = None
+		self._partStartWallTs = None
+		self._partVerdict = None
+		self._partGroupKey = None
+
+	def process_packet(self, packet: De5000StcPacket):
+		""" Update the statistics with a decoded packet
+
+		Parameters:
+			packet (De5000StcPacket): already processed by De5000RefTracker
+		"""
+		if not packet.dataValid or packet.calMode:
+			return
+		# durations are based on the monotonic clock
+		ts = packet.monotonicNs / 1E9
+		#
+		if packet.sortSetup or not packet.sortingMode:
+			self._end_part(ts)
+			return
+		#
+		if packet.dispMain.status in [STATUS_PASS, STATUS_FAIL]:
+			if self._partStartTs is None:
+				self._start_part(ts, packet.timestampNs / 1E9, packet)
+			self._partVerdict = (packet.dispMain.status == STATUS_PASS)
+		else:
+			# blank, OL, '----', ...: the part has been removed
+			self._end_part(ts)
+		#
+		if self._lastReportTs is None:
+			self._lastReportTs = ts
+		elif ts - self._lastReportTs >= self._reportInterval:
+			self._lastReportTs = ts
+			self._report()
+
+	def close(self):
+		""" Count a part that is still inserted and write the final summary """
+		self._end_part(None)
+		self._report()
+
+	def get_summary_lines(self) -> list:
+		""" Get the current statistics as text lines
+
+		Returns:
+			list
+		"""
+		tmpTotal = self._countPass + self._countFail
+		resA = ["Sorting statistics"]
+		resA.append(f"  Parts: {tmpTotal} ({self._countPass} PASS, {self._countFail} FAIL), " +
+				f"Yield: {self._get_yield_str(self._countPass, tmpTotal)}")
+		if tmpTotal == 0:
+			return resA
+		#
+		resA.append("  Per reference value and tolerance:")
+		for groupKey in sorted(self._groups.keys()):
+			group = self._groups[groupKey]
+			tmpGrpTotal = group.countPass + group.countFail
+			resA.append(f"    {groupKey[0]} {groupKey[1]}: {tmpGrpTotal} parts " +
+					f"({group.countPass} PASS, {group.countFail} FAIL), " +
+					f"Yield: {self._get_yield_str(group.countPass, tmpGrpTotal)}")
+		#
+		tmpElapsed = self._lastPartStartTs - self._firstPartTs
+		if tmpElapsed > 0.0 and tmpTotal > 1:
+			resA.append(f"  Throughput: {(tmpTotal - 1) * 3600.0 / tmpElapsed:.0f} parts/h overall")
+		tmpRecentCycles = [x[1] for x in self._recentParts if x[1] is not None]
+		if tmpRecentCycles:
+			tmpMean = math.fsum(tmpRecentCycles) / len(tmpRecentCycles)
+			if tmpMean > 0.0:
+				resA.append(f"  Throughput: {3600.0 / tmpMean:.0f} parts/h over the last {len(tmpRecentCycles)} parts")
+		#
+		if self._cycleTimes:
+			resA.append("  Time per part (start to start): " + self._get_distribution_str(self._cycleTimes))
+			resA.append("    Histogram: " + self._get_histogram_str(self._cycleTimes))
+		if self._contactTimes:
+			resA.append("  Time on fixture: " + self._get_distribution_str(self._contactTimes))
+		#
+		tmpRecentPass = sum(1 for x in self._recentParts if x[0])
+		resA.append(f"  Yield of the last {len(self._recentParts)} parts: " +
+				self._get_yield_str(tmpRecentPass, len(self._recentParts)))
+		trendA = []
+		for bucketStartTs, bucketPass, bucketTotal in self._trendBuckets:
+			tmpTime = datetime.datetime.fromtimestamp(bucketStartTs).strftime("%H:%M")
+			trendA.append(f"{tmpTime} {self._get_yield_str(bucketPass, bucketTotal)} ({bucketTotal})")
+		resA.append("  Yield trend: " + ", ".join(trendA))
+		return resA
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _start_part(self, ts: float, wallTs: float, packet: De5000StcPacket):
+		self._partStartTs = ts
+		self._partStartWallTs = wallTs
+		self._partVerdict = None
+		self._partGroupKey = (
+				packet.sortRef if packet.sortRef else "n/a",
+				packet.tolerance if packet.tolerance else "n/a"
+			)
+
+	def _end_part(self, ts: Optional[float]):
+		if self._partStartTs is None:
+			return
+		startTs = self._partStartTs
+		startWallTs = self._partStartWallTs
+		isPass = self._partVerdict
+		groupKey = self._partGroupKey
+		self._partStartTs = None
+		if isPass is None:
+			return
+		#
+		group = self._groups.get(groupKey)
+		if group is None:
+			group = _SortingGroupStats()
+			self._groups[groupKey] = group
+		if isPass:
+			self._countPass += 1
+			group.countPass += 1
+		else:
+			self._countFail += 1
+			group.countFail += 1
+		#
+		cycleTime = None
+		if self._firstPartTs is None:
+			self._firstPartTs = startTs
+		else:
+			cycleTime = startTs - self._lastPartStartTs
+			self._cycleTimes.append(cycleTime)
+		self._lastPartStartTs = startTs
+		if ts is not None:
+			self._contactTimes.append(ts - startTs)
+		self._recentParts.append((isPass, cycleTime))
+		#
+		bucketStartTs = startWallTs - (startWallTs % self._TREND_BUCKET_SECS)
+		if not self._trendBuckets or self._trendBuckets[-1][0] != bucketStartTs:
+			self._trendBuckets.append((bucketStartTs, 0, 0))
+		bucket = self._trendBuckets[-1]
+		self._trendBuckets[-1] = (bucket[0], bucket[1] + (1 if isPass else 0), bucket[2] + 1)
+
+	def _report(self):
+		linesA = self.get_summary_lines()
+		if self._report_msg_cb is not None:
+			for line in linesA:
+				self._report_msg_cb(line)
+		with open(self._summaryFn, mode="w") as fHnd:
+			fHnd.write(f"Updated: {datetime.datetime.now()}\n")
+			for line in linesA:
+				fHnd.write(line + "\n")
+
+	def _get_yield_str(self, countPass: int, countTotal: int) -> str:
+		if countTotal == 0:
+			return "n/a"
+		return f"{(countPass / countTotal) * 100.0:.01f}%"
+
+	def _get_distribution_str(self, valsA: list) -> str:
+		tmpSorted = sorted(valsA)
+		tmpCnt = len(tmpSorted)
+		tmpMean = math.fsum(tmpSorted) / tmpCnt
+		tmpMedian = tmpSorted[tmpCnt // 2]
+		tmpP90 = tmpSorted[min(tmpCnt - 1, int(tmpCnt * 0.9))]
+		return (f"mean={tmpMean:.01f}s median={tmpMedian:.01f}s p90={tmpP90:.01f}s " +
+				f"min={tmpSorted[0]:.01f}s max={tmpSorted[-1]:.01f}s")
+
+	def _get_histogram_str(self, valsA: list) -> str:
+		binsA = [0] * (len(self._HISTO_LIMITS) + 1)
+		for val in valsA:
+			ix = 0
+			while ix < len(self._HISTO_LIMITS) and val >= self._HISTO_LIMITS[ix]:
+				ix += 1
+			binsA[ix] += 1
+		resA = []
+		tmpLower = 0.0
+		for ix, limit in enumerate(self._HISTO_LIMITS):
+			resA.append(f"{tmpLower:g}-{limit:g}s: {binsA[ix]}")
+			tmpLower = limit
+		resA.append(f">{tmpLower:g}s: {binsA[-1]}")
+		return ", ".join(resA)
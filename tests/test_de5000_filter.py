@@ -0,0 +1,70 @@
+#
+# by TS, Mai 2022
+#
+
+import io
+import unittest
+
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_uart import De5000Uart, MAIN_QUANTITY_CS
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_transport import De5000StreamTransport
+from tsitle.der_ee_de5000_lcr_meter_uart.de5000_filter import De5000OutlierFilter
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Cs = 96.82 uF, D = 0.0075, 120 Hz
+_FRAME = bytes([0x00, 0x0D, 0x00, 0x20, 0x00, 0x02, 0x25, 0xD2, 0x5A, 0x00, 0x01, 0x00, 0x4B, 0x04, 0x00, 0x0D, 0x0A])
+
+_STATUS_OL = 3
+
+def _get_frame(mantissa: int, mainStatus: int = 0) -> bytes:
+	""" Frame with main display mantissa (2 decimals, uF) """
+	res = bytearray(_FRAME)
+	res[0x06] = mantissa >> 8
+	res[0x07] = mantissa & 0xFF
+	res[0x09] = mainStatus
+	return bytes(res)
+
+def _replay(data: bytes, filterObj: De5000OutlierFilter) -> list:
+	""" Decode a capture and return (main value, accepted) per valid packet """
+	lcr = De5000Uart(De5000StreamTransport(io.BytesIO(data)))
+	resA = []
+	while True:
+		packet = lcr.get_meas()
+		if not packet.dataValid:
+			if lcr.isEndOfData:
+				break
+			continue
+		resA.append((packet.dispMain.normVal, filterObj.process_packet(packet)))
+	return resA
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class TestOutlierFilter(unittest.TestCase):
+	def test_part_swap(self):
+		""" 10 uF -> OL -> 47 uF: the new part must not be rejected """
+		data = (b"".join(_get_frame(1000 + x % 2) for x in range(12)) +
+				_get_frame(0, _STATUS_OL) * 2 +
+				b"".join(_get_frame(4700 + x % 2) for x in range(12)))
+		filterObj = De5000OutlierFilter(9)
+		resA = _replay(data, filterObj)
+		self.assertEqual(len(resA), 26)
+		self.assertTrue(all(x[1] for x in resA))
+		self.assertEqual(filterObj.rejectedCount, 0)
+		self.assertEqual(filterObj.rejectedCounts.get(MAIN_QUANTITY_CS, 0), 0)
+
+	def test_spike(self):
+		""" A single wrong reading of the same part is still rejected """
+		valsA = [1000 + x % 2 for x in range(12)]
+		valsA[10] = 4700
+		filterObj = De5000OutlierFilter(9)
+		resA = _replay(b"".join(_get_frame(x) for x in valsA), filterObj)
+		self.assertEqual([x[1] for x in resA], [x != 10 for x in range(12)])
+		self.assertEqual(filterObj.rejectedCounts.get(MAIN_QUANTITY_CS, 0), 1)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+	unittest.main()
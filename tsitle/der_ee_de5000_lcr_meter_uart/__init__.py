@@ -3,4 +3,21 @@
 #
 
 from . import de5000_stc_packet
+from . import de5000_transport
+from . import de5000_link_stats
 from . import de5000_uart
+from . import de5000_discovery
+from . import de5000_ref_tracker
+from . import de5000_filter
+from . import de5000_drift
+from . import de5000_session
+from . import de5000_sweep
+from . import de5000_csv_reader
+from . import de5000_record
+from . import de5000_shm_feed
+from . import de5000_socket_server
+from . import de5000_csv_loader
+from . import de5000_circuit_fit
+from . import de5000_history
+from . import de5000_rules
+from . import de5000_eseries
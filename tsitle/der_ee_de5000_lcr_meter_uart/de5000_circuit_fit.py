@@ -0,0 +1,307 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Equivalent-circuit fitting across the test frequencies
+
+Readings (as loaded by de5000_csv_loader) are grouped into parts: a new
+part starts when the test frequency decreases, when the kind of
+component (L, C or R) changes, after a time gap or after the meter showed
+no reading (part removed, OL). Every reading is
+converted into a complex impedance Z and averaged per part and frequency,
+giving a (parts x frequencies) matrix.
+
+All parts are then fitted at once with weighted linear least squares
+(normal equations solved in closed form on whole arrays):
+	series model:    Z = ESR + j(w*Ls - 1/(w*Cs))
+	parallel model:  Y = 1/Rleak + j(w*Cp - 1/(w*Lp))
+The self-resonance is estimated from Ls/Cs for capacitors (ESL) and
+from Lp/Cp for inductors (winding capacitance).
+
+Requires NumPy.
+"""
+
+from typing import Optional
+
+from .de5000_uart import \
+		MAIN_QUANTITY_LS, MAIN_QUANTITY_LP, MAIN_QUANTITY_CS, MAIN_QUANTITY_CP, \
+		MAIN_QUANTITY_RS, MAIN_QUANTITY_RP, \
+		SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR, SEC_QUANTITY_THETA, SEC_QUANTITY_RP
+from .de5000_csv_reader import COL_TIMESTAMP_UTC, COL_FREQ, COL_MAIN_QUANTITY, COL_SEC_QUANTITY
+from .de5000_csv_loader import load_csv_arrays, TIMESTAMP_MISSING
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Test frequencies of the DE-5000 (columns of the impedance matrix)
+FIT_FREQS_HZ = [100, 120, 1000, 10000, 100000]
+
+KIND_NONE = -1
+KIND_L = 0
+KIND_C = 1
+KIND_R = 2
+
+KIND_NAMES = ["L", "C", "R"]
+
+# main quantity -> (kind, is parallel)
+_MAIN_QUANTITIES = {
+		MAIN_QUANTITY_LS: (KIND_L, False),
+		MAIN_QUANTITY_LP: (KIND_L, True),
+		MAIN_QUANTITY_CS: (KIND_C, False),
+		MAIN_QUANTITY_CP: (KIND_C, True),
+		MAIN_QUANTITY_RS: (KIND_R, False),
+		MAIN_QUANTITY_RP: (KIND_R, True)
+	}
+
+# columns needed for the fit
+FIT_COLUMNS = [
+		COL_TIMESTAMP_UTC, COL_FREQ, COL_MAIN_QUANTITY, COL_SEC_QUANTITY,
+		"Main L [uH]", "Main C [uF]", "Main R [Ohm]", "Main Overload [bool]",
+		"Sec R [Ohm]", "Sec D", "Sec Q", "Sec Theta [degree]"
+	]
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def _require_numpy():
+	if numpy is None:
+		raise ImportError("de5000_circuit_fit requires the Python package 'numpy'")
+
+def _lookup(codes, categoriesA: list, mapFnc, default):
+	""" Map categorical codes through a function of their label """
+	lut = numpy.array([mapFnc(x) for x in categoriesA] + [default])
+	# code -1 (empty) picks the default at the end of the table
+	return lut[numpy.where(codes < 0, len(categoriesA), codes)]
+
+def get_impedances(arrays: dict, categories: dict) -> tuple:
+	""" Convert readings into complex impedances
+
+	Parameters:
+		arrays (dict), categories (dict): as returned by load_csv_arrays(columns=FIT_COLUMNS)
+	Returns:
+		tuple: (kinds, impedances)
+		       kinds (numpy.ndarray): KIND_* per reading
+		       impedances (numpy.ndarray): complex Z in Ohm per reading,
+		                   NaN real part if the secondary display has no loss value,
+		                   NaN if the reading can't be used at all
+	"""
+	_require_numpy()
+	mainCodes = arrays[COL_MAIN_QUANTITY]
+	mainCats = categories[COL_MAIN_QUANTITY]
+	kinds = _lookup(mainCodes, mainCats, lambda x: _MAIN_QUANTITIES.get(x, (KIND_NONE, False))[0], KIND_NONE)
+	isPar = _lookup(mainCodes, mainCats, lambda x: _MAIN_QUANTITIES.get(x, (KIND_NONE, False))[1], False)
+	secCodes = arrays[COL_SEC_QUANTITY]
+	secCats = categories[COL_SEC_QUANTITY]
+	isSecD, isSecQ, isSecEsr, isSecTheta, isSecRp = [
+			_lookup(secCodes, secCats, lambda x, y=secQuantity: x == y, False)
+			for secQuantity in [SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR, SEC_QUANTITY_THETA, SEC_QUANTITY_RP]
+		]
+	#
+	omega = 2.0 * numpy.pi * arrays[COL_FREQ]
+	valL = arrays["Main L [uH]"] * 1E-6
+	valC = arrays["Main C [uF]"] * 1E-6
+	valR = arrays["Main R [Ohm]"]
+	tanTheta = numpy.tan(numpy.radians(arrays["Sec Theta [degree]"]))
+	nan = numpy.full(len(omega), numpy.nan)
+	#
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		# series representation: Z = R + jX
+		serX = numpy.select(
+				[kinds == KIND_L, kinds == KIND_C, (kinds == KIND_R) & isSecTheta, kinds == KIND_R],
+				[omega * valL, -1.0 / (omega * valC), valR * tanTheta, 0.0],
+				numpy.nan
+			)
+		serR = numpy.select(
+				[kinds == KIND_R, isSecD, isSecQ, isSecEsr, isSecTheta],
+				[valR, arrays["Sec D"] * numpy.abs(serX), numpy.abs(serX) / arrays["Sec Q"],
+						arrays["Sec R [Ohm]"], serX / tanTheta],
+				numpy.nan
+			)
+		# parallel representation: Y = G + jB
+		parB = numpy.select(
+				[kinds == KIND_L, kinds == KIND_C, (kinds == KIND_R) & isSecTheta, kinds == KIND_R],
+				[-1.0 / (omega * valL), omega * valC, -tanTheta / valR, 0.0],
+				numpy.nan
+			)
+		parG = numpy.select(
+				[kinds == KIND_R, isSecD, isSecQ, isSecRp, isSecTheta],
+				[1.0 / valR, arrays["Sec D"] * numpy.abs(parB), numpy.abs(parB) / arrays["Sec Q"],
+						1.0 / arrays["Sec R [Ohm]"], -parB / tanTheta],
+				numpy.nan
+			)
+		# without a loss value only the reactance is known (G assumed to be 0)
+		parZ = 1.0 / (numpy.where(numpy.isnan(parG), 0.0, parG) + 1j * parB)
+		parZ = numpy.where(numpy.isnan(parG), nan + 1j * parZ.imag, parZ)
+	serZ = serR + 1j * serX
+	impedances = numpy.where(isPar, parZ, serZ)
+	impedances[kinds == KIND_NONE] = numpy.nan
+	return (kinds, impedances)
+
+def assign_part_ids(timestampNs, freqHz, kinds, maxGapSec: float = 60.0, isEmpty=None):
+	""" Assign part numbers to consecutive readings
+
+	A new part starts when the frequency decreases, the kind of
+	component changes, more than maxGapSec passed since the previous reading
+	or the previous reading was empty.
+
+	Parameters:
+		timestampNs (numpy.ndarray): int64
+		freqHz (numpy.ndarray)
+		kinds (numpy.ndarray): KIND_* per reading
+		maxGapSec (float)
+		isEmpty (numpy.ndarray): bool per reading, True if the meter showed no value (part removed, OL),
+		                         None means all readings have a value
+	Returns:
+		numpy.ndarray: int64 part number per reading, starting at 0
+	"""
+	_require_numpy()
+	if len(timestampNs) == 0:
+		return numpy.zeros(0, dtype=numpy.int64)
+	isNew = numpy.ones(len(timestampNs), dtype=bool)
+	isNew[1:] = ((freqHz[1:] < freqHz[:-1]) |
+			(kinds[1:] != kinds[:-1]) |
+			(numpy.diff(timestampNs) > int(maxGapSec * 1E9)))
+	if isEmpty is not None:
+		isNew[1:] |= isEmpty[:-1]
+	return numpy.cumsum(isNew) - 1
+
+def _solve_2x2(w, m, omega, vals) -> tuple:
+	""" Weighted least squares of vals = a*w - b/w per row (masked by m) """
+	w2 = numpy.where(m, w * w, 0.0)
+	valsZ = numpy.where(m, vals, 0.0)
+	a11 = (w2 * omega * omega).sum(axis=1)
+	a12 = -w2.sum(axis=1)
+	a22 = (w2 / (omega * omega)).sum(axis=1)
+	r1 = (w2 * omega * valsZ).sum(axis=1)
+	r2 = -(w2 * valsZ / omega).sum(axis=1)
+	det = a11 * a22 - a12 * a12
+	# fewer than two frequencies -> det is 0 (up to rounding errors) -> NaN
+	isSolvable = (det > 1E-9 * a11 * a22)
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		resA = numpy.where(isSolvable, (r1 * a22 - r2 * a12) / det, numpy.nan)
+		resB = numpy.where(isSolvable, (a11 * r2 - a12 * r1) / det, numpy.nan)
+		pred = resA[:, None] * omega - resB[:, None] / omega
+		resid = numpy.sqrt(numpy.where(m, w2 * (vals - pred) ** 2, 0.0).sum(axis=1) / m.sum(axis=1))
+	return (resA, resB, numpy.where(isSolvable, resid, numpy.nan))
+
+def _masked_mean(vals, m):
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		return numpy.where(m, vals, 0.0).sum(axis=1) / m.sum(axis=1)
+
+def _get_srf(valL, valC):
+	with numpy.errstate(invalid="ignore"):
+		return numpy.where((valL > 0) & (valC > 0), 1.0 / (2.0 * numpy.pi * numpy.sqrt(valL * valC)), numpy.nan)
+
+def fit_parts(arrays: dict, categories: dict, maxGapSec: float = 60.0) -> dict:
+	""" Group readings into parts and fit the equivalent circuits
+
+	Parameters:
+		arrays (dict), categories (dict): as returned by load_csv_arrays(columns=FIT_COLUMNS)
+		maxGapSec (float): see assign_part_ids()
+	Returns:
+		dict: one array per key, one element per part:
+		      'startTimestampNs' (int64), 'kind' (KIND_*), 'freqCount',
+		      'impedances' (complex, parts x FIT_FREQS_HZ, NaN if not measured),
+		      'esrOhm', 'seriesL', 'seriesC', 'seriesResid',
+		      'leakageOhm', 'parallelL', 'parallelC', 'parallelResid',
+		      'srfHz'
+		      L in H, C in F, residuals are relative RMS values of the reactance/susceptance fit
+	"""
+	_require_numpy()
+	kinds, impedances = get_impedances(arrays, categories)
+	timestampNs = arrays[COL_TIMESTAMP_UTC]
+	freqHz = arrays[COL_FREQ]
+	isOverload = arrays["Main Overload [bool]"]
+	isTimed = (timestampNs != TIMESTAMP_MISSING)
+	kinds = kinds[isTimed]
+	impedances = impedances[isTimed]
+	timestampNs = timestampNs[isTimed]
+	freqHz = freqHz[isTimed]
+	isOverload = isOverload[isTimed]
+	# the part boundaries need the empty readings, so they are determined before dropping those
+	isEmpty = isOverload | ((kinds != KIND_NONE) & numpy.isnan(impedances.imag))
+	partIds = assign_part_ids(timestampNs, freqHz, kinds, maxGapSec, isEmpty)
+	#
+	freqIxs = numpy.searchsorted(FIT_FREQS_HZ, freqHz)
+	freqIxs = numpy.minimum(freqIxs, len(FIT_FREQS_HZ) - 1)
+	isUsable = ((kinds != KIND_NONE) & ~isEmpty &
+			(numpy.asarray(FIT_FREQS_HZ)[freqIxs] == freqHz))
+	kinds = kinds[isUsable]
+	impedances = impedances[isUsable]
+	timestampNs = timestampNs[isUsable]
+	freqIxs = freqIxs[isUsable]
+	# renumber, parts without usable readings are omitted
+	partIds = numpy.unique(partIds[isUsable], return_inverse=True)[1].reshape(-1)
+	partCnt = int(partIds[-1]) + 1 if len(partIds) else 0
+	freqCnt = len(FIT_FREQS_HZ)
+	# average repeated readings per part and frequency
+	sumRe = numpy.zeros((partCnt, freqCnt))
+	sumIm = numpy.zeros((partCnt, freqCnt))
+	cntRe = numpy.zeros((partCnt, freqCnt))
+	cntIm = numpy.zeros((partCnt, freqCnt))
+	hasRe = ~numpy.isnan(impedances.real)
+	numpy.add.at(sumIm, (partIds, freqIxs), impedances.imag)
+	numpy.add.at(cntIm, (partIds, freqIxs), 1.0)
+	numpy.add.at(sumRe, (partIds[hasRe], freqIxs[hasRe]), impedances.real[hasRe])
+	numpy.add.at(cntRe, (partIds[hasRe], freqIxs[hasRe]), 1.0)
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		zMat = sumRe / cntRe + 1j * (sumIm / cntIm)
+		yMat = 1.0 / numpy.where(cntRe > 0, zMat, 1j * zMat.imag)
+	mRe = (cntRe > 0)
+	mIm = (cntIm > 0)
+	omega = 2.0 * numpy.pi * numpy.asarray(FIT_FREQS_HZ, dtype=numpy.float64)[None, :]
+	#
+	# series model, weighted by 1/|X| (relative errors)
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		serW = 1.0 / numpy.abs(zMat.imag)
+	serW = numpy.where(numpy.isfinite(serW), serW, 0.0)
+	seriesL, seriesInvC, seriesResid = _solve_2x2(serW, mIm & (serW > 0), omega, zMat.imag)
+	# parallel model, weighted by 1/|B|
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		parW = 1.0 / numpy.abs(yMat.imag)
+	parW = numpy.where(numpy.isfinite(parW), parW, 0.0)
+	parallelC, parallelInvL, parallelResid = _solve_2x2(parW, mIm & (parW > 0), omega, yMat.imag)
+	#
+	with numpy.errstate(divide="ignore", invalid="ignore"):
+		seriesC = 1.0 / seriesInvC
+		parallelL = 1.0 / parallelInvL
+		leakageOhm = 1.0 / _masked_mean(yMat.real, mRe)
+	firstIxs = numpy.searchsorted(partIds, numpy.arange(partCnt))
+	partKinds = kinds[firstIxs]
+	srfHz = numpy.where(partKinds == KIND_C, _get_srf(seriesL, seriesC),
+			numpy.where(partKinds == KIND_L, _get_srf(parallelL, parallelC), numpy.nan))
+	return {
+			"startTimestampNs": timestampNs[firstIxs],
+			"kind": partKinds,
+			"freqCount": mIm.sum(axis=1),
+			"impedances": zMat,
+			"esrOhm": _masked_mean(zMat.real, mRe),
+			"seriesL": seriesL,
+			"seriesC": seriesC,
+			"seriesResid": seriesResid,
+			"leakageOhm": leakageOhm,
+			"parallelL": parallelL,
+			"parallelC": parallelC,
+			"parallelResid": parallelResid,
+			"srfHz": srfHz
+		}
+
+def fit_csv(csvFn: str, maxGapSec: float = 60.0,
+		tsFromNs: Optional[int] = None, tsToNs: Optional[int] = None) -> dict:
+	""" Load a CsvOutput file and fit the equivalent circuits of all parts
+
+	Parameters:
+		csvFn (str): .csv, .csv.gz or .csv.zst file
+		maxGapSec (float): see assign_part_ids()
+		tsFromNs (int), tsToNs (int): see load_csv_arrays()
+	Returns:
+		dict: see fit_parts()
+	"""
+	arrays, categories = load_csv_arrays(csvFn, columns=FIT_COLUMNS, tsFromNs=tsFromNs, tsToNs=tsToNs)
+	return fit_parts(arrays, categories, maxGapSec)
@@ -0,0 +1,178 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Vectorized loader for CSV files written by CsvOutput
+
+The whole file is split into cells in one pass and each requested
+column is converted with a single NumPy operation:
+	- 'Timestamp UTC' becomes int64 nanoseconds since the epoch
+	- 'DateTime UTC' becomes datetime64[ns] (derived from 'Timestamp UTC')
+	- '... [bool]' columns become bool ('true' -> True, 'false' and empty -> False)
+	- quantities, tolerance and references become categoricals
+	- all other columns become float64 (empty -> NaN)
+
+Requires NumPy, load_csv_dataframe() additionally requires pandas.
+"""
+
+from typing import Optional
+
+from .de5000_csv_reader import \
+		get_column_type, open_csv_file, \
+		COL_TYPE_TIMESTAMP, COL_TYPE_DATETIME, COL_TYPE_BOOL, COL_TYPE_CATEGORY, \
+		COL_TIMESTAMP_UTC
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Missing timestamps (same value as NumPy's NaT)
+TIMESTAMP_MISSING = -(2**63)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def _require_numpy():
+	if numpy is None:
+		raise ImportError("de5000_csv_loader requires the Python package 'numpy'")
+
+def _read_cells(csvFn: str) -> tuple:
+	""" Read the file and split it into a 2D array of byte strings
+
+	Returns:
+		tuple: (header, cells)
+	"""
+	with open_csv_file(csvFn, binary=True) as fHnd:
+		data = fHnd.read()
+	# cells never contain commas or quotes, so quoting can simply be removed
+	data = data.translate(None, b"'\"\r")
+	lines = data.split(b"\n")
+	header = [x.decode() for x in lines[0].split(b",")]
+	colCnt = len(header)
+	lines = lines[1:]
+	if lines and lines[-1] == b"":
+		lines.pop()
+	cells = b",".join(lines).split(b",") if lines else []
+	if len(cells) != len(lines) * colCnt:
+		# slow path: skip empty or truncated lines
+		lines = [x for x in lines if x.count(b",") == colCnt - 1]
+		cells = b",".join(lines).split(b",") if lines else []
+	return (header, numpy.array(cells, dtype=numpy.bytes_).reshape(len(lines), colCnt))
+
+def _convert_timestamps(col):
+	res = numpy.full(len(col), TIMESTAMP_MISSING, dtype=numpy.int64)
+	isSet = (col != b"")
+	if isSet.any():
+		parts = numpy.char.partition(col[isSet], b".")
+		secs = parts[:, 0].astype(numpy.int64)
+		fracs = numpy.char.ljust(parts[:, 2], 9, b"0")
+		res[isSet] = secs * 1000000000 + fracs.astype(numpy.int64)
+	return res
+
+def _convert_floats(col):
+	return numpy.where(col == b"", b"nan", col).astype(numpy.float64)
+
+def _convert_categories(col) -> tuple:
+	categories, codes = numpy.unique(col, return_inverse=True)
+	codes = codes.astype(numpy.int16)
+	categoriesA = [x.decode() for x in categories]
+	if categoriesA and categoriesA[0] == "":
+		# empty cells are missing values
+		categoriesA = categoriesA[1:]
+		codes -= 1
+	return (codes, categoriesA)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def load_csv_arrays(csvFn: str, columns: Optional[list] = None,
+		tsFromNs: Optional[int] = None, tsToNs: Optional[int] = None) -> tuple:
+	""" Load a CsvOutput file into typed NumPy arrays
+
+	Parameters:
+		csvFn (str): .csv, .csv.gz or .csv.zst file
+		columns (list): names of the columns to load, None means all
+		tsFromNs (int): only rows at or after this time (ns since the epoch)
+		tsToNs (int): only rows before this time (ns since the epoch)
+	Returns:
+		tuple: (arrays, categories)
+		       arrays (dict): column name -> numpy.ndarray,
+		                      categorical columns contain int16 codes (-1 = empty)
+		       categories (dict): categorical column name -> list of labels
+	Raises:
+		ImportError: if NumPy is not installed
+		KeyError: if a requested column doesn't exist
+	"""
+	_require_numpy()
+	header, cells = _read_cells(csvFn)
+	colIxs = {name: ix for ix, name in enumerate(header)}
+	if columns is None:
+		columns = header
+	for colName in columns:
+		if colName not in colIxs:
+			raise KeyError(f"column '{colName}' not found in '{csvFn}'")
+	#
+	tsArr = None
+	if COL_TIMESTAMP_UTC in colIxs:
+		tsNeeded = (tsFromNs is not None or tsToNs is not None or
+				COL_TIMESTAMP_UTC in columns or any(get_column_type(x) == COL_TYPE_DATETIME for x in columns))
+		if tsNeeded:
+			tsArr = _convert_timestamps(cells[:, colIxs[COL_TIMESTAMP_UTC]])
+	if tsFromNs is not None or tsToNs is not None:
+		if tsArr is None:
+			raise KeyError(f"column '{COL_TIMESTAMP_UTC}' not found in '{csvFn}'")
+		mask = (tsArr != TIMESTAMP_MISSING)
+		if tsFromNs is not None:
+			mask &= (tsArr >= tsFromNs)
+		if tsToNs is not None:
+			mask &= (tsArr < tsToNs)
+		cells = cells[mask]
+		tsArr = tsArr[mask]
+	#
+	arrays = {}
+	categories = {}
+	for colName in columns:
+		colType = get_column_type(colName)
+		col = cells[:, colIxs[colName]]
+		if colType == COL_TYPE_TIMESTAMP:
+			arrays[colName] = tsArr
+		elif colType == COL_TYPE_DATETIME:
+			arrays[colName] = tsArr.view("datetime64[ns]") if tsArr is not None else None
+		elif colType == COL_TYPE_BOOL:
+			arrays[colName] = (col == b"true")
+		elif colType == COL_TYPE_CATEGORY:
+			arrays[colName], categories[colName] = _convert_categories(col)
+		else:
+			arrays[colName] = _convert_floats(col)
+	return (arrays, categories)
+
+def load_csv_dataframe(csvFn: str, columns: Optional[list] = None,
+		tsFromNs: Optional[int] = None, tsToNs: Optional[int] = None):
+	""" Load a CsvOutput file into a pandas DataFrame
+
+	Parameters:
+		see load_csv_arrays()
+	Returns:
+		pandas.DataFrame: categorical columns have the dtype 'category'
+	Raises:
+		ImportError: if NumPy or pandas are not installed
+		KeyError: if a requested column doesn't exist
+	"""
+	try:
+		import pandas
+	except ImportError:
+		raise ImportError("load_csv_dataframe() requires the Python package 'pandas'")
+	#
+	arrays, categories = load_csv_arrays(csvFn, columns=columns, tsFromNs=tsFromNs, tsToNs=tsToNs)
+	dataD = {}
+	for colName, arr in arrays.items():
+		if colName in categories:
+			dataD[colName] = pandas.Categorical.from_codes(arr, categories[colName])
+		else:
+			dataD[colName] = arr
+	return pandas.DataFrame(dataD)
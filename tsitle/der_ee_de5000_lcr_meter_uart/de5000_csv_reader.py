@@ -0,0 +1,235 @@
+#
+# by TS, Mai 2022
+#
+
+import csv
+import gzip
+import io
+import itertools
+from typing import Optional
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Column types of the CSV files written by CsvOutput (see cli_output.py)
+COL_TYPE_TIMESTAMP = "timestamp"
+COL_TYPE_DATETIME = "datetime"
+COL_TYPE_BOOL = "bool"
+COL_TYPE_CATEGORY = "category"
+COL_TYPE_FLOAT = "float"
+
+COL_TIMESTAMP_UTC = "Timestamp UTC"
+COL_DATETIME_UTC = "DateTime UTC"
+COL_FREQ = "Freq [Hz]"
+COL_MAIN_QUANTITY = "Main Quantity"
+COL_SEC_QUANTITY = "Sec Quantity"
+
+# Value columns of the main and secondary display
+COLS_MAIN_VALUE = ["Main L [uH]", "Main C [uF]", "Main R [Ohm]"]
+COLS_SEC_VALUE = ["Sec L [uH]", "Sec C [uF]", "Sec R [Ohm]", "Sec D", "Sec Q", "Sec Theta [degree]", "Sec Delta [%]"]
+
+_CATEGORY_COLS = [COL_MAIN_QUANTITY, COL_SEC_QUANTITY, "Tolerance", "Sorting Reference", "Delta Reference"]
+
+_STR_TRUE = "true"
+_STR_FALSE = "false"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def get_column_type(colName: str) -> str:
+	""" Get the type of a CsvOutput column by its name
+
+	Parameters:
+		colName (str)
+	Returns:
+		str: one of the COL_TYPE_* constants
+	"""
+	if colName == COL_TIMESTAMP_UTC:
+		return COL_TYPE_TIMESTAMP
+	if colName == COL_DATETIME_UTC:
+		return COL_TYPE_DATETIME
+	if colName.endswith("[bool]"):
+		return COL_TYPE_BOOL
+	if colName in _CATEGORY_COLS:
+		return COL_TYPE_CATEGORY
+	return COL_TYPE_FLOAT
+
+def parse_timestamp_ns(value: str) -> Optional[int]:
+	""" Parse a 'Timestamp UTC' cell ('1651591738.566955') into
+	nanoseconds since the epoch without going through float
+
+	Parameters:
+		value (str)
+	Returns:
+		int: None if the cell is empty
+	"""
+	if not value:
+		return None
+	secStr, _, fracStr = value.partition(".")
+	fracStr = (fracStr + "000000000")[:9]
+	return int(secStr) * 1000000000 + int(fracStr)
+
+def parse_cell(colType: str, value: str):
+	""" Convert a CSV cell to its typed value
+
+	Parameters:
+		colType (str): one of the COL_TYPE_* constants
+		value (str)
+	Returns:
+		int|bool|float|str|None: None for empty cells
+	"""
+	if value == "":
+		return None
+	if colType == COL_TYPE_FLOAT:
+		return float(value)
+	if colType == COL_TYPE_BOOL:
+		return (value == _STR_TRUE)
+	if colType == COL_TYPE_TIMESTAMP:
+		return parse_timestamp_ns(value)
+	return value
+
+def open_csv_file(csvFn: str, binary: bool = False):
+	""" Open a CSV file or a compressed log segment ('.gz' or '.zst',
+	see --csv-compress of cli_de5000.py) for reading
+
+	Parameters:
+		csvFn (str)
+		binary (bool): False for text mode with newline=""
+	Returns:
+		file object - only supports sequential reading
+	Raises:
+		ImportError: for '.zst' files if the Python package 'zstandard' is missing
+	"""
+	if csvFn.endswith(".gz"):
+		return gzip.open(csvFn, mode="rb" if binary else "rt", newline=None if binary else "")
+	if csvFn.endswith(".zst"):
+		if zstandard is None:
+			raise ImportError(f"reading '{csvFn}' requires the Python package 'zstandard'")
+		fHnd = zstandard.ZstdDecompressor().stream_reader(open(csvFn, mode="rb"), closefd=True)
+		return fHnd if binary else io.TextIOWrapper(fHnd, newline="")
+	return open(csvFn, mode="rb" if binary else "r", newline=None if binary else "")
+
+def detect_quotechar(firstLine: str) -> str:
+	""" Older CsvOutput versions quoted all cells with single quotes,
+	current versions use the csv module's default
+
+	Parameters:
+		firstLine (str): the header line
+	Returns:
+		str
+	"""
+	return "'" if firstLine.startswith("'") else '"'
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000CsvReader(object):
+	""" Streaming reader for CSV files written by CsvOutput.
+
+	Rows are read one at a time, so files of any size can be processed
+	with constant memory.
+	"""
+
+	def __init__(self, csvFn: str):
+		""" Initialize object
+
+		Parameters:
+			csvFn (str)
+		"""
+		assert csvFn is not None and isinstance(csvFn, str), "csvFn needs to be string"
+		#
+		self._csvFn = csvFn
+		self._fHnd = None
+		self._reader = None
+		self._header = []
+		self._colTypes = []
+
+	def __enter__(self):
+		self.open()
+		return self
+
+	def __exit__(self, excType, excVal, excTb):
+		self.close()
+
+	def open(self):
+		""" Open the CSV file and read the header """
+		self._fHnd = open_csv_file(self._csvFn)
+		firstLine = self._fHnd.readline()
+		# compressed segments can't seek back
+		self._reader = csv.reader(itertools.chain([firstLine], self._fHnd), quotechar=detect_quotechar(firstLine))
+		self._header = next(self._reader, [])
+		self._colTypes = [get_column_type(x) for x in self._header]
+
+	def close(self):
+		""" Close the CSV file """
+		if self._fHnd is None:
+			return
+		self._fHnd.close()
+		self._fHnd = None
+		self._reader = None
+
+	@property
+	def header(self) -> list:
+		return self._header
+
+	def iter_raw_rows(self):
+		""" Iterate over the rows as lists of strings
+
+		Yields:
+			list
+		"""
+		if self._reader is None:
+			raise Exception("need to call open() first")
+		tmpColCnt = len(self._header)
+		for row in self._reader:
+			if len(row) != tmpColCnt:
+				# empty or truncated line (e.g. file was being written)
+				continue
+			yield row
+
+	def __iter__(self):
+		""" Iterate over the rows as dicts of typed values
+
+		Yields:
+			dict
+		"""
+		header = self._header
+		colTypes = self._colTypes
+		for row in self.iter_raw_rows():
+			yield {header[ix]: parse_cell(colTypes[ix], row[ix]) for ix in range(len(row))}
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def get_row_main_value(row: dict) -> Optional[tuple]:
+	""" Get the value of the main display of a typed row
+
+	Parameters:
+		row (dict)
+	Returns:
+		tuple: (column name, value), None if the row has no value
+	"""
+	for colName in COLS_MAIN_VALUE:
+		val = row.get(colName)
+		if val is not None:
+			return (colName, val)
+	return None
+
+def get_row_sec_value(row: dict) -> Optional[tuple]:
+	""" Get the value of the secondary display of a typed row
+
+	Parameters:
+		row (dict)
+	Returns:
+		tuple: (column name, value), None if the row has no value
+	"""
+	for colName in COLS_SEC_VALUE:
+		val = row.get(colName)
+		if val is not None:
+			return (colName, val)
+	return None
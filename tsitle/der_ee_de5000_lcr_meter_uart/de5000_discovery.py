@@ -0,0 +1,92 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Discovery of connected meters
+
+All candidate serial ports are probed concurrently: every port is opened
+(which powers the IR receiver via DTR) and read until a frame with valid
+header and footer bytes has been received or the timeout has passed.
+"""
+
+import concurrent.futures
+import time
+from typing import Optional
+
+import serial
+import serial.tools.list_ports
+
+from .de5000_uart import find_raw_frame
+from .de5000_transport import De5000SerialTransport
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Frames are sent about once per second - wait a bit longer than one period
+PROBE_TIMEOUT_DEF = 1.5
+
+# Maximum amount of bytes read from a port that doesn't send frames
+_PROBE_MAX_BYTES = 4096
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def list_candidate_ports() -> list:
+	""" Get the device names of all serial ports
+
+	Returns:
+		list: e.g. ['/dev/ttyUSB0', '/dev/ttyUSB1']
+	"""
+	return sorted(x.device for x in serial.tools.list_ports.comports())
+
+def probe_port(port: str, timeout: float = PROBE_TIMEOUT_DEF) -> bool:
+	""" Check whether a meter is sending frames on a port
+
+	Parameters:
+		port (str): e.g. '/dev/ttyUSB0' or a pyserial URL
+		timeout (float): in seconds
+	Returns:
+		bool: False if no valid frame has been received or the port can't be opened
+	"""
+	deadline = time.monotonic() + timeout
+	try:
+		transport = De5000SerialTransport(port)
+	except (serial.SerialException, OSError, ValueError):
+		return False
+	try:
+		transport.reset_input_buffer()
+		data = b""
+		while len(data) < _PROBE_MAX_BYTES:
+			remaining = deadline - time.monotonic()
+			if remaining <= 0.0:
+				break
+			transport.set_read_timeout(remaining)
+			data += transport.read_until(b"\x0D\x0A", _PROBE_MAX_BYTES - len(data))
+			if find_raw_frame(data) >= 0:
+				return True
+		return False
+	except (serial.SerialException, OSError):
+		return False
+	finally:
+		try:
+			transport.close()
+		except (serial.SerialException, OSError):
+			pass
+
+def discover_ports(ports: Optional[list] = None, timeout: float = PROBE_TIMEOUT_DEF) -> list:
+	""" Probe ports concurrently
+
+	Parameters:
+		ports (list): ports to probe, None means all serial ports (see list_candidate_ports())
+		timeout (float): in seconds, the whole discovery takes about as long as probing one port
+	Returns:
+		list: the ports that a meter is connected to, in the order of ports
+	"""
+	if ports is None:
+		ports = list_candidate_ports()
+	if not ports:
+		return []
+	with concurrent.futures.ThreadPoolExecutor(max_workers=len(ports)) as executor:
+		resultsA = list(executor.map(lambda x: probe_port(x, timeout), ports))
+	return [port for port, isMeter in zip(ports, resultsA) if isMeter]
@@ -0,0 +1,202 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Streaming detection of steps and drift for long-running measurements
+(e.g. burn-in and aging tests of one part)
+
+For every display, quantity and test frequency the mean and standard
+deviation of the first readings are taken as baseline. After that every
+reading updates
+	- a two-sided CUSUM (sensitive to steps)
+	- an EWMA (sensitive to slow drift)
+in constant time and memory. When one of them exceeds its limit an event
+is reported and a new baseline is taken from the following readings.
+"""
+
+import math
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+DETECTOR_CUSUM = "CUSUM"
+DETECTOR_EWMA = "EWMA"
+
+DIRECTION_UP = "up"
+DIRECTION_DOWN = "down"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000ChangeDetector(object):
+	def __init__(self, warmup: int = 300, cusumK: float = 0.5, cusumH: float = 14.0,
+			ewmaLambda: float = 0.05, ewmaL: float = 5.0):
+		""" Initialize object - detector for one series of values
+
+		The defaults give about one false alarm per 10^6 readings of
+		stationary white noise and detect a step of one standard deviation
+		after about 25 readings.
+
+		Parameters:
+			warmup (int): amount of readings for the baseline
+			cusumK (float): CUSUM allowance in standard deviations (half of the step to detect)
+			cusumH (float): CUSUM decision threshold in standard deviations
+			ewmaLambda (float): EWMA weight of a new reading
+			ewmaL (float): EWMA control limit in standard deviations of the EWMA
+		"""
+		assert warmup >= 2, "warmup needs to be >= 2"
+		assert 0.0 < ewmaLambda <= 1.0, "ewmaLambda needs to be > 0 and <= 1"
+		#
+		self._warmup = warmup
+		self._cusumK = cusumK
+		self._cusumH = cusumH
+		self._ewmaLambda = ewmaLambda
+		self._ewmaLimit = ewmaL * math.sqrt(ewmaLambda / (2.0 - ewmaLambda))
+		self._restart()
+
+	@property
+	def isWarmingUp(self) -> bool:
+		return self._count < self._warmup
+
+	@property
+	def baseline(self) -> Optional[float]:
+		return self._baseline
+
+	@property
+	def baselineStd(self) -> Optional[float]:
+		return self._baselineStd
+
+	def add(self, value: float, resolution: float) -> Optional[tuple]:
+		""" Add a reading
+
+		Parameters:
+			value (float)
+			resolution (float): one digit of the display, lower limit of the standard deviation
+		Returns:
+			tuple: (detector, direction, estimated new level) if a change has been detected, otherwise None
+		"""
+		if self._count < self._warmup:
+			# Welford's algorithm
+			self._count += 1
+			delta = value - self._mean
+			self._mean += delta / self._count
+			self._m2 += delta * (value - self._mean)
+			self._resolution = max(self._resolution, resolution)
+			if self._count == self._warmup:
+				self._baseline = self._mean
+				self._baselineStd = max(math.sqrt(self._m2 / (self._count - 1)), self._resolution)
+				self._ewma = self._baseline
+			return None
+		#
+		dev = (value - self._baseline) / self._baselineStd
+		self._cusumPos = max(0.0, self._cusumPos + dev - self._cusumK)
+		self._cusumPosCnt = self._cusumPosCnt + 1 if self._cusumPos > 0.0 else 0
+		self._cusumNeg = max(0.0, self._cusumNeg - dev - self._cusumK)
+		self._cusumNegCnt = self._cusumNegCnt + 1 if self._cusumNeg > 0.0 else 0
+		self._ewma += self._ewmaLambda * (value - self._ewma)
+		#
+		res = None
+		if self._cusumPos > self._cusumH:
+			# mean of the readings since the CUSUM left 0
+			res = (DETECTOR_CUSUM, DIRECTION_UP,
+					self._baseline + self._baselineStd * (self._cusumK + self._cusumPos / self._cusumPosCnt))
+		elif self._cusumNeg > self._cusumH:
+			res = (DETECTOR_CUSUM, DIRECTION_DOWN,
+					self._baseline - self._baselineStd * (self._cusumK + self._cusumNeg / self._cusumNegCnt))
+		elif abs(self._ewma - self._baseline) > self._ewmaLimit * self._baselineStd:
+			res = (DETECTOR_EWMA, DIRECTION_UP if self._ewma > self._baseline else DIRECTION_DOWN, self._ewma)
+		if res is not None:
+			self._restart()
+		return res
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _restart(self):
+		self._count = 0
+		self._mean = 0.0
+		self._m2 = 0.0
+		self._resolution = 0.0
+		self._baseline = None
+		self._baselineStd = None
+		self._cusumPos = 0.0
+		self._cusumPosCnt = 0
+		self._cusumNeg = 0.0
+		self._cusumNegCnt = 0
+		self._ewma = None
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000DriftEvent(object):
+	def __init__(self, packet: De5000StcPacket, isSecondary: bool, packetDisp: De5000StcPacketMainSecondary,
+			detector: str, direction: str, baseline: float, baselineStd: float, level: float):
+		self.timestampNs = packet.timestampNs
+		self.freq = packet.freq
+		self.isSecondary = isSecondary
+		self.quantity = packetDisp.quantity
+		self.normUnits = packetDisp.normUnits
+		self.detector = detector
+		self.direction = direction
+		self.baseline = baseline
+		self.baselineStd = baselineStd
+		self.level = level
+
+	@property
+	def changePerc(self) -> Optional[float]:
+		""" Change of the level relative to the baseline, None if the baseline is 0 """
+		if self.baseline == 0.0:
+			return None
+		return (self.level / self.baseline - 1.0) * 100.0
+
+	def get_message(self) -> str:
+		tmpChange = self.changePerc
+		return (f"{self.detector}: {self.quantity} @ {self.freq} {self.direction} " +
+				f"from {self.baseline:g} to {self.level:g} {self.normUnits}" +
+				(f" ({tmpChange:+.3f}%)" if tmpChange is not None else ""))
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000DriftMonitor(object):
+	def __init__(self, **detectorArgs):
+		""" Initialize object
+
+		Parameters:
+			detectorArgs: see De5000ChangeDetector
+		"""
+		self._detectorArgs = detectorArgs
+		# (is secondary display, quantity, freq) -> De5000ChangeDetector
+		self._detectors = {}
+
+	def process_packet(self, packet: De5000StcPacket) -> list:
+		""" Update the detectors with the normal readings of both displays
+
+		Parameters:
+			packet (De5000StcPacket)
+		Returns:
+			list: list of De5000DriftEvent
+		"""
+		resA = []
+		if not packet.dataValid or packet.calMode:
+			return resA
+		for isSecondary, packetDisp in [(False, packet.dispMain), (True, packet.dispSec)]:
+			if packetDisp.status != STATUS_NORMAL or packetDisp.mantissa is None:
+				continue
+			key = (isSecondary, packetDisp.quantity, packet.freq)
+			detector = self._detectors.get(key)
+			if detector is None:
+				detector = De5000ChangeDetector(**self._detectorArgs)
+				self._detectors[key] = detector
+			baseline = detector.baseline
+			baselineStd = detector.baselineStd
+			tmpRes = detector.add(packetDisp.normVal, 10.0 ** packetDisp.normExponent)
+			if tmpRes is not None:
+				resA.append(De5000DriftEvent(packet, isSecondary, packetDisp,
+						tmpRes[0], tmpRes[1], baseline, baselineStd, tmpRes[2]))
+		return resA
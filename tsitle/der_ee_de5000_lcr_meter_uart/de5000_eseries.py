@@ -0,0 +1,126 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Binning of measured values into the nominal values of the
+IEC 60063 E-series (E6, E12, E24, E48, E96, E192)
+
+For every series a sorted table of all nominal values across the
+decades that the meter can show (normalized units uH, uF and Ohm) is
+built once, together with the boundaries between neighbouring values.
+A lookup is then a single bisect on the boundaries.
+"""
+
+import bisect
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL, UNIT_NORMALIZED_L, UNIT_NORMALIZED_C, UNIT_NORMALIZED_R
+from .de5000_stc_packet import De5000StcPacketMainSecondary, format_fixed_point
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+ESERIES_NAMES = ["E6", "E12", "E24", "E48", "E96", "E192"]
+
+# E24 has historical values that don't follow the formula, E12 and E6 are subsets of it
+_E24_BASE = [10, 11, 12, 13, 15, 16, 18, 20, 22, 24, 27, 30, 33, 36, 39, 43, 47, 51, 56, 62, 68, 75, 82, 91]
+# E192 follows the formula except for 9.20 (instead of 9.19), E96 and E48 are subsets of it
+_E192_BASE = [int(round(10 ** (ix / 192) * 100)) for ix in range(192)]
+_E192_BASE[185] = 920
+
+_BASES = {
+		"E6": (_E24_BASE[::4], 2),
+		"E12": (_E24_BASE[::2], 2),
+		"E24": (_E24_BASE, 2),
+		"E48": (_E192_BASE[::4], 3),
+		"E96": (_E192_BASE[::2], 3),
+		"E192": (_E192_BASE, 3)
+	}
+
+# Decades covered (normalized units): 1 nOhm/uH/uF ... 10 GOhm/uH/uF
+_DECADE_MIN = -9
+_DECADE_MAX = 9
+
+_BINNED_UNITS = [UNIT_NORMALIZED_L, UNIT_NORMALIZED_C, UNIT_NORMALIZED_R]
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000ESeries(object):
+	def __init__(self, seriesName: str):
+		""" Initialize object and build the lookup tables
+
+		Parameters:
+			seriesName (str): one of ESERIES_NAMES
+		"""
+		assert seriesName in _BASES, f"seriesName needs to be one of {ESERIES_NAMES}"
+		#
+		self._name = seriesName
+		baseA, digits = _BASES[seriesName]
+		self._nominals = []
+		self._nominalStrs = []
+		for decade in range(_DECADE_MIN, _DECADE_MAX + 1):
+			exp = decade - digits + 1
+			for mantissa in baseA:
+				# parsing the decimal string gives the closest float
+				self._nominals.append(float(f"{mantissa}e{exp}"))
+				self._nominalStrs.append(format_fixed_point(mantissa, exp))
+		# a value belongs to the nominal value with the smallest relative
+		# deviation - the boundary between a and b is their harmonic mean
+		self._bounds = [
+				2.0 * a * b / (a + b)
+				for a, b in zip(self._nominals, self._nominals[1:])
+			]
+
+	@property
+	def name(self) -> str:
+		return self._name
+
+	def get_nearest(self, value: float) -> Optional[tuple]:
+		""" Get the nearest nominal value
+
+		Parameters:
+			value (float): in normalized units
+		Returns:
+			tuple: (nominal value, nominal value as string, deviation in percent),
+			       None if the value is outside of the covered decades
+		"""
+		if not (self._nominals[0] <= value <= self._nominals[-1]):
+			return None
+		ix = bisect.bisect_right(self._bounds, value)
+		nominal = self._nominals[ix]
+		return (nominal, self._nominalStrs[ix], (value / nominal - 1.0) * 100.0)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+_ESERIES_CACHE = {}
+
+def get_eseries(seriesName: str) -> De5000ESeries:
+	""" Get the (shared) lookup tables of a series
+
+	Parameters:
+		seriesName (str): one of ESERIES_NAMES
+	Returns:
+		De5000ESeries
+	"""
+	res = _ESERIES_CACHE.get(seriesName)
+	if res is None:
+		res = De5000ESeries(seriesName)
+		_ESERIES_CACHE[seriesName] = res
+	return res
+
+def bin_display(packetDisp: De5000StcPacketMainSecondary, seriesName: str) -> Optional[tuple]:
+	""" Get the nearest nominal value of an L, C or R reading
+
+	Parameters:
+		packetDisp (De5000StcPacketMainSecondary): e.g. packet.dispMain
+		seriesName (str): one of ESERIES_NAMES
+	Returns:
+		tuple: see De5000ESeries.get_nearest(),
+		       None if the display doesn't show a normal L, C or R value
+	"""
+	if packetDisp.status != STATUS_NORMAL or packetDisp.normUnits not in _BINNED_UNITS or not packetDisp.mantissa:
+		return None
+	return get_eseries(seriesName).get_nearest(packetDisp.normVal)
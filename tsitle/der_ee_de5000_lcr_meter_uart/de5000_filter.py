@@ -0,0 +1,224 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Streaming outlier rejection (Hampel filter)
+
+A reading is rejected if it deviates from the running median of the
+last K readings by more than nSigma times the scaled median absolute
+deviation (MAD). Rejected readings still enter the window, so that a
+real step (e.g. another part) is accepted after K/2 readings.
+
+Every window is kept as a sorted list: inserting and removing is a
+bisect plus a memmove, the median is a lookup and the MAD is found
+with a binary search over the two sorted runs of deviations left and
+right of the median - O(log K) comparisons per reading.
+
+There is one window per display, quantity and test frequency. The
+windows are cleared when the part is removed (display not normal, e.g.
+OL or blank) and when the setup changes (quantity, test frequency or
+manually selected range), so that the next part starts with an empty
+window instead of being rejected as outlier.
+"""
+
+import bisect
+import collections
+import math
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# MAD to standard deviation for normally distributed values
+_MAD_SCALE = 1.4826
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000RunningMedian(object):
+	def __init__(self, windowSize: int):
+		""" Initialize object
+
+		Parameters:
+			windowSize (int): amount of values (K)
+		"""
+		assert windowSize > 0, "windowSize needs to be > 0"
+		#
+		self._windowSize = windowSize
+		self._fifo = collections.deque()
+		self._sorted = []
+
+	def __len__(self) -> int:
+		return len(self._sorted)
+
+	@property
+	def isFull(self) -> bool:
+		return len(self._sorted) == self._windowSize
+
+	def add(self, value: float):
+		""" Add a value - the oldest one is dropped if the window is full """
+		if len(self._fifo) == self._windowSize:
+			oldVal = self._fifo.popleft()
+			del self._sorted[bisect.bisect_left(self._sorted, oldVal)]
+		self._fifo.append(value)
+		bisect.insort(self._sorted, value)
+
+	def get_median(self) -> Optional[float]:
+		""" Get the median, None if the window is empty """
+		cnt = len(self._sorted)
+		if cnt == 0:
+			return None
+		if cnt % 2 == 1:
+			return self._sorted[cnt // 2]
+		return (self._sorted[cnt // 2 - 1] + self._sorted[cnt // 2]) / 2.0
+
+	def get_mad(self, median: float) -> float:
+		""" Get the median absolute deviation from median
+
+		Parameters:
+			median (float): see get_median()
+		Returns:
+			float
+		"""
+		cnt = len(self._sorted)
+		if cnt % 2 == 1:
+			return self._get_kth_deviation(median, cnt // 2)
+		return (self._get_kth_deviation(median, cnt // 2 - 1) + self._get_kth_deviation(median, cnt // 2)) / 2.0
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_kth_deviation(self, center: float, k: int) -> float:
+		""" Get the k-th smallest (0-based) absolute deviation from center
+
+		The deviations of the values left of center (read backwards) and
+		right of center are two ascending runs - the k-th smallest of
+		both is found by a binary search over the amount taken from the left run.
+		"""
+		valsA = self._sorted
+		split = bisect.bisect_right(valsA, center)
+		cntL = split
+		cntR = len(valsA) - split
+		need = k + 1
+		lo = max(0, need - cntR)
+		hi = min(need, cntL)
+		while lo < hi:
+			takeL = (lo + hi) // 2
+			takeR = need - takeL
+			if center - valsA[split - 1 - takeL] < valsA[split + takeR - 1] - center:
+				lo = takeL + 1
+			else:
+				hi = takeL
+		takeR = need - lo
+		devL = center - valsA[split - lo] if lo > 0 else -math.inf
+		devR = valsA[split + takeR - 1] - center if takeR > 0 else -math.inf
+		return max(devL, devR)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000OutlierFilter(object):
+	def __init__(self, windowSize: int = 9, nSigma: float = 3.0, minRelDeviation: float = 0.01):
+		""" Initialize object
+
+		Parameters:
+			windowSize (int): amount of readings of the running median (K)
+			nSigma (float): rejection threshold in (MAD based) standard deviations
+			minRelDeviation (float): deviations below this fraction of the median are never rejected
+			                         (the MAD of a stable reading is 0)
+		"""
+		assert windowSize >= 3, "windowSize needs to be >= 3"
+		assert nSigma > 0.0, "nSigma needs to be > 0"
+		#
+		self._windowSize = windowSize
+		self._nSigma = nSigma
+		self._minRelDeviation = minRelDeviation
+		# (is secondary display, quantity, freq) -> De5000RunningMedian
+		self._windows = {}
+		# is secondary display -> setup of the current window
+		self._setups = {}
+		self._rejectedCount = 0
+		self._rejectedCounts = {}
+
+	@property
+	def rejectedCount(self) -> int:
+		""" Total amount of rejected packets """
+		return self._rejectedCount
+
+	@property
+	def rejectedCounts(self) -> dict:
+		""" Amount of rejected readings per quantity """
+		return self._rejectedCounts
+
+	def process_packet(self, packet: De5000StcPacket) -> bool:
+		""" Check the normal readings of both displays
+
+		Parameters:
+			packet (De5000StcPacket)
+		Returns:
+			bool: False if the packet is an outlier and should be dropped
+		"""
+		if not packet.dataValid or packet.calMode:
+			return True
+		if packet.dispMain.status != STATUS_NORMAL or packet.dispMain.mantissa is None:
+			# the part has been removed
+			self._reset_display(True)
+		isOutlierMain = self._process_display(False, packet.dispMain, packet)
+		isOutlierSec = self._process_display(True, packet.dispSec, packet)
+		if isOutlierMain or isOutlierSec:
+			self._rejectedCount += 1
+			return False
+		return True
+
+	def get_median(self, quantity: str, freq: str, secondary: bool = False) -> Optional[float]:
+		""" Get the running median of a quantity
+
+		Parameters:
+			quantity (str): e.g. MAIN_QUANTITY_CS
+			freq (str): e.g. '1 kHz'
+			secondary (bool): True for the secondary display
+		Returns:
+			float: in normalized units, None if there were no readings yet
+		"""
+		window = self._windows.get((secondary, quantity, freq))
+		return window.get_median() if window is not None else None
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _reset_display(self, isSecondary: bool):
+		for key in [x for x in self._windows if x[0] == isSecondary]:
+			del self._windows[key]
+		self._setups.pop(isSecondary, None)
+
+	def _process_display(self, isSecondary: bool, packetDisp: De5000StcPacketMainSecondary, packet: De5000StcPacket) -> bool:
+		if packetDisp.status != STATUS_NORMAL or packetDisp.mantissa is None:
+			self._reset_display(isSecondary)
+			return False
+		freq = packet.freq
+		# with auto range the range follows the value, only a manual change is a new setup
+		setupKey = (packetDisp.quantity, freq, None if packet.autoRange else (packetDisp.units, packetDisp.exponent))
+		if self._setups.get(isSecondary) != setupKey:
+			self._reset_display(isSecondary)
+			self._setups[isSecondary] = setupKey
+		key = (isSecondary, packetDisp.quantity, freq)
+		window = self._windows.get(key)
+		if window is None:
+			window = De5000RunningMedian(self._windowSize)
+			self._windows[key] = window
+		val = packetDisp.normVal
+		isOutlier = False
+		if window.isFull:
+			median = window.get_median()
+			# one digit of the display is the smallest meaningful scale
+			scale = max(_MAD_SCALE * window.get_mad(median), 10.0 ** packetDisp.normExponent)
+			limit = max(self._nSigma * scale, self._minRelDeviation * abs(median))
+			isOutlier = abs(val - median) > limit
+		window.add(val)
+		if isOutlier:
+			self._rejectedCounts[packetDisp.quantity] = self._rejectedCounts.get(packetDisp.quantity, 0) + 1
+		return isOutlier
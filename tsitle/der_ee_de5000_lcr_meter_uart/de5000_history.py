@@ -0,0 +1,150 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+In-memory history of the last N decoded packets
+
+The packets are stored as record fields (see de5000_record.py) in
+preallocated typed arrays - one array per field - so that a reading
+takes 48 bytes no matter how long the history runs, instead of
+several Python objects per packet.
+"""
+
+import array
+import bisect
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL
+from .de5000_stc_packet import De5000StcPacket, fixed_point_to_float
+from .de5000_record import \
+		RECORD_FIELD_TYPES, get_packet_fields, packet_from_fields, encode_quantity, encode_status, \
+		FIELD_TIMESTAMP_NS, FIELD_MONOTONIC_NS, FIELD_MAIN, FIELD_SEC, \
+		FIELD_DISP_QUANTITY, FIELD_DISP_STATUS, FIELD_DISP_MANTISSA, FIELD_DISP_NORM_EXPONENT
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _RingView(object):
+	""" Read-only sequence of one column in logical order (oldest first) - for bisect """
+
+	def __init__(self, col: array.array, start: int, count: int):
+		self._col = col
+		self._start = start
+		self._count = count
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __getitem__(self, ix: int):
+		return self._col[(self._start + ix) % len(self._col)]
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000History(object):
+	def __init__(self, capacity: int):
+		""" Initialize object - all memory is allocated here
+
+		Parameters:
+			capacity (int): amount of packets kept, older packets get overwritten
+		"""
+		assert capacity > 0, "capacity needs to be > 0"
+		#
+		self._capacity = capacity
+		# struct format characters are also valid array typecodes
+		self._cols = [array.array(x, [0]) * capacity for x in RECORD_FIELD_TYPES]
+		self._start = 0
+		self._count = 0
+
+	@property
+	def capacity(self) -> int:
+		return self._capacity
+
+	def __len__(self) -> int:
+		return self._count
+
+	def append(self, packet: De5000StcPacket):
+		""" Add a packet - invalid packets are ignored
+
+		Parameters:
+			packet (De5000StcPacket): as returned by De5000Uart.get_meas()
+		"""
+		if not packet.dataValid or packet.monotonicNs is None:
+			return
+		if self._count == self._capacity:
+			ix = self._start
+			self._start = (self._start + 1) % self._capacity
+		else:
+			ix = (self._start + self._count) % self._capacity
+			self._count += 1
+		for col, val in zip(self._cols, get_packet_fields(packet)):
+			col[ix] = val
+
+	def clear(self):
+		self._start = 0
+		self._count = 0
+
+	def get_packet(self, ix: int) -> De5000StcPacket:
+		""" Rebuild a stored packet
+
+		Parameters:
+			ix (int): 0 is the oldest packet, -1 the newest
+		Returns:
+			De5000StcPacket
+		Raises:
+			IndexError
+		"""
+		if ix < 0:
+			ix += self._count
+		if ix < 0 or ix >= self._count:
+			raise IndexError("history index out of range")
+		physIx = (self._start + ix) % self._capacity
+		return packet_from_fields(tuple(col[physIx] for col in self._cols))
+
+	def get_values(self, lastSeconds: Optional[float] = None, lastCount: Optional[int] = None,
+			quantity: Optional[str] = None, secondary: bool = False) -> tuple:
+		""" Get the normalized values of a display within a window.
+		Readings that are not a normal value (OL, blank, ...) are skipped.
+
+		Parameters:
+			lastSeconds (float): only packets received within the last seconds
+			                     (relative to the newest packet), None means no limit
+			lastCount (int): only the last N matching packets, None means no limit
+			quantity (str): only packets with this quantity (e.g. 'Cs'), None means all
+			secondary (bool): use the secondary instead of the main display
+		Returns:
+			tuple: (timestampsNs, values), typed arrays 'q' and 'd', oldest first
+		"""
+		dispOffs = FIELD_SEC if secondary else FIELD_MAIN
+		colQuantity = self._cols[dispOffs + FIELD_DISP_QUANTITY]
+		colStatus = self._cols[dispOffs + FIELD_DISP_STATUS]
+		colMantissa = self._cols[dispOffs + FIELD_DISP_MANTISSA]
+		colNormExponent = self._cols[dispOffs + FIELD_DISP_NORM_EXPONENT]
+		colTimestamp = self._cols[FIELD_TIMESTAMP_NS]
+		quantityCode = encode_quantity(quantity) if quantity is not None else None
+		statusCode = encode_status(STATUS_NORMAL)
+		#
+		firstIx = self._get_first_ix(lastSeconds)
+		ixsA = []
+		ix = self._count - 1
+		while ix >= firstIx and (lastCount is None or len(ixsA) < lastCount):
+			physIx = (self._start + ix) % self._capacity
+			if colStatus[physIx] == statusCode and (quantityCode is None or colQuantity[physIx] == quantityCode):
+				ixsA.append(physIx)
+			ix -= 1
+		ixsA.reverse()
+		#
+		timestampsNs = array.array("q", (colTimestamp[x] for x in ixsA))
+		values = array.array("d", (fixed_point_to_float(colMantissa[x], colNormExponent[x]) for x in ixsA))
+		return (timestampsNs, values)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_first_ix(self, lastSeconds: Optional[float]) -> int:
+		""" Get the logical index of the first packet within the last seconds """
+		if lastSeconds is None or self._count == 0:
+			return 0
+		colMonotonic = _RingView(self._cols[FIELD_MONOTONIC_NS], self._start, self._count)
+		return bisect.bisect_left(colMonotonic, colMonotonic[self._count - 1] - int(lastSeconds * 1E9))
@@ -0,0 +1,193 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Link quality statistics of the IR/serial connection
+
+Every read attempt of De5000Uart is classified (see KIND_*). Errors
+start a resync that ends with the next valid frame - its duration and
+the amount of discarded bytes are the cost of recovering from the error.
+Besides the totals, the counts are kept in a histogram over time
+(bins of binSize seconds), e.g. to compare adapter placements.
+
+The fragment read right after the input buffer has been flushed by
+De5000Uart.get_meas() is expected and not an error (KIND_FLUSH_CUT).
+"""
+
+import time
+from typing import Optional
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+KIND_OK = "ok"
+KIND_FLUSH_CUT = "flush cut"
+KIND_TIMEOUT = "timeout"
+KIND_SHORT_FRAME = "short frame"
+KIND_BAD_HEADER = "bad header"
+KIND_BAD_FOOTER = "bad footer"
+KIND_BAD_CODE = "bad code"
+
+ERROR_KINDS = [KIND_TIMEOUT, KIND_SHORT_FRAME, KIND_BAD_HEADER, KIND_BAD_FOOTER, KIND_BAD_CODE]
+KINDS = [KIND_OK, KIND_FLUSH_CUT] + ERROR_KINDS
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000LinkStatsBin(object):
+	""" Counts of one time interval of the histogram """
+
+	def __init__(self, startTimestampNs: int, startOffsetNs: int):
+		self.startTimestampNs = startTimestampNs
+		# relative to the first read attempt
+		self.startOffsetNs = startOffsetNs
+		self.counts = {x: 0 for x in KINDS}
+		self.discardedBytes = 0
+		self.resyncCount = 0
+		self.resyncTimeNs = 0
+
+	@property
+	def errorCount(self) -> int:
+		return sum(self.counts[x] for x in ERROR_KINDS)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000LinkStats(object):
+	def __init__(self, binSize: float = 60.0):
+		""" Initialize object
+
+		Parameters:
+			binSize (float): interval of the histogram in seconds
+		"""
+		assert binSize > 0.0, "binSize needs to be > 0"
+		#
+		self._binSizeNs = int(binSize * 1E9)
+		self._counts = {x: 0 for x in KINDS}
+		self._discardedBytes = 0
+		self._bins = {}
+		self._startMonotonicNs = None
+		self._startTimestampNs = None
+		#
+		self._resyncStartNs = None
+		self._resyncBytes = 0
+		self._resyncCount = 0
+		self._resyncTimeNs = 0
+		self._resyncMaxNs = 0
+		self._resyncMaxBytes = 0
+
+	@property
+	def counts(self) -> dict:
+		""" Amount of read attempts per kind (see KINDS) """
+		return self._counts
+
+	@property
+	def errorCount(self) -> int:
+		return sum(self._counts[x] for x in ERROR_KINDS)
+
+	@property
+	def errorRate(self) -> float:
+		""" Errors per frame (valid frames plus errors), 0 if nothing has been received yet """
+		tmpSum = self._counts[KIND_OK] + self.errorCount
+		return self.errorCount / tmpSum if tmpSum > 0 else 0.0
+
+	@property
+	def discardedBytes(self) -> int:
+		""" Bytes of all erroneous reads (without the fragments after a flush) """
+		return self._discardedBytes
+
+	@property
+	def isResyncing(self) -> bool:
+		return self._resyncStartNs is not None
+
+	@property
+	def resyncCount(self) -> int:
+		""" Amount of finished resyncs """
+		return self._resyncCount
+
+	@property
+	def resyncTimeNs(self) -> int:
+		""" Total duration of the finished resyncs """
+		return self._resyncTimeNs
+
+	@property
+	def resyncMaxNs(self) -> int:
+		return self._resyncMaxNs
+
+	@property
+	def resyncMaxBytes(self) -> int:
+		return self._resyncMaxBytes
+
+	def add(self, kind: str, byteCount: int, monotonicNs: Optional[int] = None):
+		""" Count a read attempt
+
+		Parameters:
+			kind (str): see KINDS
+			byteCount (int): amount of bytes read
+			monotonicNs (int): time.monotonic_ns() of the read, None means now
+		"""
+		assert kind in self._counts, "kind invalid"
+		#
+		if monotonicNs is None:
+			monotonicNs = time.monotonic_ns()
+		if self._startMonotonicNs is None:
+			self._startMonotonicNs = monotonicNs
+			self._startTimestampNs = time.time_ns()
+		binObj = self._get_bin(monotonicNs)
+		self._counts[kind] += 1
+		binObj.counts[kind] += 1
+		if kind in ERROR_KINDS:
+			self._discardedBytes += byteCount
+			binObj.discardedBytes += byteCount
+			if self._resyncStartNs is None:
+				self._resyncStartNs = monotonicNs
+				self._resyncBytes = 0
+			self._resyncBytes += byteCount
+		elif kind == KIND_OK and self._resyncStartNs is not None:
+			durationNs = monotonicNs - self._resyncStartNs
+			self._resyncCount += 1
+			self._resyncTimeNs += durationNs
+			self._resyncMaxNs = max(self._resyncMaxNs, durationNs)
+			self._resyncMaxBytes = max(self._resyncMaxBytes, self._resyncBytes)
+			binObj.resyncCount += 1
+			binObj.resyncTimeNs += durationNs
+			self._resyncStartNs = None
+
+	def get_bins(self) -> list:
+		""" Get the histogram
+
+		Returns:
+			list: list of De5000LinkStatsBin, ascending - intervals without read attempts are omitted
+		"""
+		return [self._bins[x] for x in sorted(self._bins)]
+
+	def get_summary(self) -> list:
+		""" Get a human readable summary
+
+		Returns:
+			list: list of str
+		"""
+		resA = [
+				f"Link: {self._counts[KIND_OK]} frames ok, {self.errorCount} errors ({self.errorRate * 100.0:.2f}%), " +
+				f"{self._discardedBytes} bytes discarded"
+			]
+		resA.append("  " + ", ".join(f"{x}: {self._counts[x]}" for x in ERROR_KINDS + [KIND_FLUSH_CUT]))
+		if self._resyncCount > 0:
+			resA.append(
+					f"  Resync: {self._resyncCount}x, " +
+					f"mean {self._resyncTimeNs / self._resyncCount / 1E6:.1f} ms, max {self._resyncMaxNs / 1E6:.1f} ms, " +
+					f"max {self._resyncMaxBytes} bytes")
+		return resA
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_bin(self, monotonicNs: int) -> De5000LinkStatsBin:
+		binIx = (monotonicNs - self._startMonotonicNs) // self._binSizeNs
+		binObj = self._bins.get(binIx)
+		if binObj is None:
+			offsetNs = binIx * self._binSizeNs
+			binObj = De5000LinkStatsBin(self._startTimestampNs + offsetNs, offsetNs)
+			self._bins[binIx] = binObj
+		return binObj
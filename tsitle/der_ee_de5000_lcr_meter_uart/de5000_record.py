@@ -0,0 +1,242 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Fixed-layout binary record of a decoded packet
+
+All strings of De5000StcPacket are stored as small integer codes
+(index into the tables below, -1 for None) and the values as
+fixed-point mantissa plus decimal exponent, so that a record can be
+written into and read from shared memory or a socket without any
+further encoding.
+"""
+
+import struct
+
+from .de5000_uart import \
+		_FREQ_ARR, _TOLERANCE_ARR, _MAIN_UNITS_ARR, _STATUS_ARR, \
+		MAIN_QUANTITY_LS, MAIN_QUANTITY_LP, MAIN_QUANTITY_CS, MAIN_QUANTITY_CP, \
+		MAIN_QUANTITY_RS, MAIN_QUANTITY_RP, MAIN_QUANTITY_DCR, \
+		SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR, SEC_QUANTITY_THETA, SEC_QUANTITY_DELTA, \
+		UNIT_NORMALIZED_L, UNIT_NORMALIZED_C, UNIT_NORMALIZED_R
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Code tables
+FREQ_CODES = [x.replace("KHz", "kHz") for x in _FREQ_ARR]
+TOLERANCE_CODES = list(_TOLERANCE_ARR)
+QUANTITY_CODES = [
+		MAIN_QUANTITY_LS, MAIN_QUANTITY_LP,
+		MAIN_QUANTITY_CS, MAIN_QUANTITY_CP,
+		MAIN_QUANTITY_RS, MAIN_QUANTITY_RP,
+		MAIN_QUANTITY_DCR,
+		SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR,
+		SEC_QUANTITY_THETA, SEC_QUANTITY_DELTA
+	]
+STATUS_CODES = list(_STATUS_ARR)
+UNITS_CODES = list(_MAIN_UNITS_ARR)
+NORM_UNITS_CODES = ["", UNIT_NORMALIZED_L, UNIT_NORMALIZED_C, UNIT_NORMALIZED_R, "%", "deg"]
+
+# Bits of the flags field
+FLAG_DATA_VALID = 0x0001
+FLAG_REF_SHOWN = 0x0002
+FLAG_DELTA_MODE = 0x0004
+FLAG_CAL_MODE = 0x0008
+FLAG_SORTING_MODE = 0x0010
+FLAG_LCR_AUTO = 0x0020
+FLAG_AUTO_RANGE = 0x0040
+FLAG_PARALLEL = 0x0080
+
+# Record layout (little-endian):
+#   timestampNs, monotonicNs, packetCountOk, packetCountErr, flags, freqCode, toleranceCode,
+#   main display: quantityCode, statusCode, unitsCode, normUnitsCode, mantissa, exponent, normExponent
+#   secondary display: same as main display
+RECORD_FIELD_TYPES = "qqIIHbb" + "bbbbibb" * 2
+_RECORD_STRUCT = struct.Struct("<" + RECORD_FIELD_TYPES)
+RECORD_SIZE = _RECORD_STRUCT.size
+
+# Indexes of the record fields
+FIELD_TIMESTAMP_NS = 0
+FIELD_MONOTONIC_NS = 1
+FIELD_FLAGS = 4
+FIELD_FREQ = 5
+FIELD_TOLERANCE = 6
+FIELD_MAIN = 7
+FIELD_SEC = 14
+# Offsets within the fields of a display (add FIELD_MAIN or FIELD_SEC)
+FIELD_DISP_QUANTITY = 0
+FIELD_DISP_STATUS = 1
+FIELD_DISP_UNITS = 2
+FIELD_DISP_NORM_UNITS = 3
+FIELD_DISP_MANTISSA = 4
+FIELD_DISP_EXPONENT = 5
+FIELD_DISP_NORM_EXPONENT = 6
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def _get_code_map(codesA: list) -> dict:
+	resD = {}
+	for ix, val in enumerate(codesA):
+		if val is not None and val not in resD:
+			resD[val] = ix
+	return resD
+
+_FREQ_MAP = _get_code_map(FREQ_CODES)
+_TOLERANCE_MAP = _get_code_map(TOLERANCE_CODES)
+_QUANTITY_MAP = _get_code_map(QUANTITY_CODES)
+_STATUS_MAP = _get_code_map(STATUS_CODES)
+_NORM_UNITS_MAP = _get_code_map(NORM_UNITS_CODES)
+
+def encode_quantity(quantity) -> int:
+	return _QUANTITY_MAP.get(quantity, -1)
+
+def encode_status(status) -> int:
+	return _STATUS_MAP.get(status, -1)
+
+def encode_freq(freq) -> int:
+	return _FREQ_MAP.get(freq, -1)
+
+def encode_norm_units(normUnits) -> int:
+	return _NORM_UNITS_MAP.get(normUnits, -1)
+
+def _decode(codesA: list, code: int):
+	return codesA[code] if 0 <= code < len(codesA) else None
+
+# ------------------------------------------------------------------------------
+
+def _get_flags(packet: De5000StcPacket) -> int:
+	res = 0
+	if packet.dataValid:
+		res |= FLAG_DATA_VALID
+	if packet.refShown:
+		res |= FLAG_REF_SHOWN
+	if packet.deltaMode:
+		res |= FLAG_DELTA_MODE
+	if packet.calMode:
+		res |= FLAG_CAL_MODE
+	if packet.sortingMode:
+		res |= FLAG_SORTING_MODE
+	if packet.lcrAuto:
+		res |= FLAG_LCR_AUTO
+	if packet.autoRange:
+		res |= FLAG_AUTO_RANGE
+	if packet.parallel:
+		res |= FLAG_PARALLEL
+	return res
+
+def _get_disp_fields(packetDisp: De5000StcPacketMainSecondary) -> tuple:
+	return (
+			_QUANTITY_MAP.get(packetDisp.quantity, -1),
+			_STATUS_MAP.get(packetDisp.status, -1),
+			packetDisp.unitsCode if packetDisp.unitsCode is not None else -1,
+			_NORM_UNITS_MAP.get(packetDisp.normUnits, -1),
+			packetDisp.mantissa if packetDisp.mantissa is not None else 0,
+			packetDisp.exponent if packetDisp.exponent is not None else 0,
+			packetDisp.normExponent if packetDisp.normExponent is not None else 0
+		)
+
+def get_packet_fields(packet: De5000StcPacket) -> tuple:
+	""" Get the record fields of a packet
+
+	Parameters:
+		packet (De5000StcPacket)
+	Returns:
+		tuple: see record layout
+	"""
+	return (
+			packet.timestampNs,
+			packet.monotonicNs,
+			packet.packetCountOk & 0xFFFFFFFF,
+			packet.packetCountErr & 0xFFFFFFFF,
+			_get_flags(packet),
+			_FREQ_MAP.get(packet.freq, -1),
+			_TOLERANCE_MAP.get(packet.tolerance, -1),
+			*_get_disp_fields(packet.dispMain),
+			*_get_disp_fields(packet.dispSec)
+		)
+
+def pack_packet_into(buf, offset: int, packet: De5000StcPacket):
+	""" Write a packet as binary record into a buffer
+
+	Parameters:
+		buf (bytearray|mmap|memoryview)
+		offset (int)
+		packet (De5000StcPacket)
+	"""
+	_RECORD_STRUCT.pack_into(buf, offset, *get_packet_fields(packet))
+
+def pack_packet(packet: De5000StcPacket) -> bytes:
+	""" Get a packet as binary record
+
+	Parameters:
+		packet (De5000StcPacket)
+	Returns:
+		bytes
+	"""
+	buf = bytearray(RECORD_SIZE)
+	pack_packet_into(buf, 0, packet)
+	return bytes(buf)
+
+def unpack_fields(buf, offset: int = 0) -> tuple:
+	""" Get the raw fields of a binary record without building a packet
+
+	Parameters:
+		buf (bytes|bytearray|mmap|memoryview)
+		offset (int)
+	Returns:
+		tuple: see record layout
+	"""
+	return _RECORD_STRUCT.unpack_from(buf, offset)
+
+def _set_disp_fields(packetDisp: De5000StcPacketMainSecondary, fieldsA: tuple):
+	packetDisp.quantity = _decode(QUANTITY_CODES, fieldsA[0])
+	packetDisp.status = _decode(STATUS_CODES, fieldsA[1])
+	if fieldsA[2] >= 0:
+		packetDisp.unitsCode = fieldsA[2]
+		packetDisp.units = _decode(UNITS_CODES, fieldsA[2])
+	packetDisp.normUnits = _decode(NORM_UNITS_CODES, fieldsA[3])
+	if packetDisp.units is not None:
+		packetDisp.mantissa = fieldsA[4]
+		packetDisp.exponent = fieldsA[5]
+		packetDisp.normExponent = fieldsA[6]
+
+def packet_from_fields(fieldsA: tuple) -> De5000StcPacket:
+	""" Build a packet from the record fields
+
+	Parameters:
+		fieldsA (tuple): see record layout
+	Returns:
+		De5000StcPacket
+	"""
+	res = De5000StcPacket(timestampNs=fieldsA[0], monotonicNs=fieldsA[1])
+	res.packetCountOk = fieldsA[2]
+	res.packetCountErr = fieldsA[3]
+	flags = fieldsA[4]
+	res.dataValid = bool(flags & FLAG_DATA_VALID)
+	res.refShown = bool(flags & FLAG_REF_SHOWN)
+	res.deltaMode = bool(flags & FLAG_DELTA_MODE)
+	res.calMode = bool(flags & FLAG_CAL_MODE)
+	res.sortingMode = bool(flags & FLAG_SORTING_MODE)
+	res.lcrAuto = bool(flags & FLAG_LCR_AUTO)
+	res.autoRange = bool(flags & FLAG_AUTO_RANGE)
+	res.parallel = bool(flags & FLAG_PARALLEL)
+	res.freq = _decode(FREQ_CODES, fieldsA[5])
+	res.tolerance = _decode(TOLERANCE_CODES, fieldsA[6])
+	_set_disp_fields(res.dispMain, fieldsA[7:14])
+	_set_disp_fields(res.dispSec, fieldsA[14:21])
+	return res
+
+def unpack_packet(buf, offset: int = 0) -> De5000StcPacket:
+	""" Build a packet from a binary record
+
+	Parameters:
+		buf (bytes|bytearray|mmap|memoryview)
+		offset (int)
+	Returns:
+		De5000StcPacket
+	"""
+	return packet_from_fields(_RECORD_STRUCT.unpack_from(buf, offset))
@@ -0,0 +1,60 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Tracking of the reference values of the Component Sorting and the Delta Mode
+
+The meter only shows the reference values while they are being set up,
+the following packets just contain PASS/FAIL resp. the deviation.
+The tracker remembers them and annotates every packet, so that all
+outputs read the same state from the packet.
+"""
+
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL, STATUS_OL, STATUS_BLANK
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000RefTracker(object):
+	def __init__(self):
+		""" Initialize object - one tracker per meter """
+		self._sortRef = None
+		self._deltaRef = None
+
+	def process_packet(self, packet: De5000StcPacket):
+		""" Update the state and set the fields sortSetup, sortRef,
+		deltaRefSetup and deltaRef of the packet
+
+		Invalid packets and packets in Calibration Mode don't change the state.
+
+		Parameters:
+			packet (De5000StcPacket)
+		"""
+		if packet.dataValid and not packet.calMode:
+			if packet.sortingMode and packet.dispMain.status in [STATUS_NORMAL, STATUS_OL] and packet.dispSec.status == STATUS_BLANK:
+				# the setup for Component Sorting is being entered into the meter
+				packet.sortSetup = True
+				self._sortRef = self._get_ref(packet.dispMain)
+			elif not packet.sortingMode:
+				self._sortRef = None
+			if packet.deltaMode and packet.refShown:
+				# the reference value for the Delta Mode is being displayed on the meter
+				packet.deltaRefSetup = True
+				self._deltaRef = self._get_ref(packet.dispMain)
+			elif not packet.deltaMode:
+				self._deltaRef = None
+		packet.sortRef = self._sortRef
+		packet.deltaRef = self._deltaRef
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_ref(self, packetDisp: De5000StcPacketMainSecondary) -> Optional[str]:
+		tmpVal = packetDisp.format_norm_val()
+		if not tmpVal:
+			return None
+		return f"{tmpVal} {packetDisp.normUnits}"
@@ -0,0 +1,250 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Rule engine for software limit checks
+
+Rules are read from a JSON file:
+
+	{
+		"rules": [
+			{"name": "Cs 1kHz", "quantity": "Cs", "freq": "1 kHz", "min": 9.5, "max": 10.5, "action": "highlight"},
+			{"name": "D high", "quantity": "D", "max": 0.05, "action": "script", "script": "./notify.sh"},
+			{"name": "link", "errorRate": 0.05, "window": 60, "action": "exit", "exitCode": 3}
+		]
+	}
+
+Limits are given in normalized units (uH, uF, Ohm). "freq" is optional
+(default: all frequencies). "display" ("main" or "sec") is only needed
+for 'Rp', which can be shown on both displays (default: main).
+
+The rules are compiled into a table indexed by (display, quantity, freq),
+so that only the rules relevant for a packet are evaluated. A rule
+triggers once when it starts failing and is re-armed when it passes again.
+"""
+
+import collections
+import json
+import math
+import time
+
+from .de5000_uart import \
+		STATUS_NORMAL, \
+		MAIN_QUANTITY_LS, MAIN_QUANTITY_LP, MAIN_QUANTITY_CS, MAIN_QUANTITY_CP, \
+		MAIN_QUANTITY_RS, MAIN_QUANTITY_RP, MAIN_QUANTITY_DCR, \
+		SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR, SEC_QUANTITY_THETA, SEC_QUANTITY_DELTA
+from .de5000_stc_packet import De5000StcPacket
+from .de5000_record import FREQ_CODES
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+ACTION_HIGHLIGHT = "highlight"
+ACTION_EXIT = "exit"
+ACTION_SCRIPT = "script"
+ACTIONS = [ACTION_HIGHLIGHT, ACTION_EXIT, ACTION_SCRIPT]
+
+DISPLAY_MAIN = "main"
+DISPLAY_SEC = "sec"
+
+_MAIN_QUANTITIES = [
+		MAIN_QUANTITY_LS, MAIN_QUANTITY_LP, MAIN_QUANTITY_CS, MAIN_QUANTITY_CP,
+		MAIN_QUANTITY_RS, MAIN_QUANTITY_RP, MAIN_QUANTITY_DCR
+	]
+_SEC_QUANTITIES = [
+		SEC_QUANTITY_D, SEC_QUANTITY_Q, SEC_QUANTITY_ESR, SEC_QUANTITY_THETA,
+		MAIN_QUANTITY_RP, SEC_QUANTITY_DELTA
+	]
+
+_DEF_EXIT_CODE = 2
+_DEF_MIN_PACKETS = 10
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000Rule(object):
+	def __init__(self, ruleD: dict, ix: int):
+		""" Initialize object from one entry of the config file
+
+		Parameters:
+			ruleD (dict)
+			ix (int): position in the config file (for messages and default name)
+		Raises:
+			ValueError: if the rule is invalid
+		"""
+		self.name = str(ruleD.get("name", f"rule #{ix + 1}"))
+		self.action = ruleD.get("action", ACTION_HIGHLIGHT)
+		if self.action not in ACTIONS:
+			raise ValueError(f"{self.name}: invalid action '{self.action}'")
+		self.script = ruleD.get("script")
+		if self.action == ACTION_SCRIPT and not self.script:
+			raise ValueError(f"{self.name}: action '{ACTION_SCRIPT}' requires 'script'")
+		self.exitCode = int(ruleD.get("exitCode", _DEF_EXIT_CODE))
+		#
+		self.errorRate = ruleD.get("errorRate")
+		if self.errorRate is not None:
+			self.errorRate = float(self.errorRate)
+			self.windowSec = float(ruleD.get("window", 60.0))
+			self.minPackets = int(ruleD.get("minPackets", _DEF_MIN_PACKETS))
+			if self.windowSec <= 0.0:
+				raise ValueError(f"{self.name}: 'window' needs to be > 0")
+			return
+		#
+		self.quantity = ruleD.get("quantity")
+		self.display = ruleD.get("display")
+		if self.display is None:
+			self.display = DISPLAY_MAIN if self.quantity in _MAIN_QUANTITIES else DISPLAY_SEC
+		if self.display not in [DISPLAY_MAIN, DISPLAY_SEC]:
+			raise ValueError(f"{self.name}: invalid display '{self.display}'")
+		if self.quantity not in (_MAIN_QUANTITIES if self.display == DISPLAY_MAIN else _SEC_QUANTITIES):
+			raise ValueError(f"{self.name}: invalid quantity '{self.quantity}'")
+		self.freq = ruleD.get("freq")
+		if self.freq is not None and self.freq not in FREQ_CODES:
+			raise ValueError(f"{self.name}: invalid freq '{self.freq}'")
+		self.minVal = float(ruleD["min"]) if "min" in ruleD else None
+		self.maxVal = float(ruleD["max"]) if "max" in ruleD else None
+		if self.minVal is None and self.maxVal is None:
+			raise ValueError(f"{self.name}: 'min' and/or 'max' required")
+
+	@property
+	def isErrorRate(self) -> bool:
+		return self.errorRate is not None
+
+	def get_limits_str(self) -> str:
+		if self.isErrorRate:
+			return f"error rate > {self.errorRate * 100.0:g}% over {self.windowSec:g}s"
+		resA = []
+		if self.minVal is not None:
+			resA.append(f">= {self.minVal:g}")
+		if self.maxVal is not None:
+			resA.append(f"<= {self.maxVal:g}")
+		return f"{self.quantity}{' @ ' + self.freq if self.freq else ''} " + " and ".join(resA)
+
+# ------------------------------------------------------------------------------
+
+class De5000RuleEvent(object):
+	def __init__(self, rule: De5000Rule, value: float, packet: De5000StcPacket):
+		self.rule = rule
+		self.value = value
+		self.packet = packet
+
+	def get_message(self) -> str:
+		if self.rule.isErrorRate:
+			return f"{self.rule.name}: error rate {self.value * 100.0:.1f}% ({self.rule.get_limits_str()})"
+		return f"{self.rule.name}: {self.value:g} violates {self.rule.get_limits_str()}"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def load_rules(rulesFn: str) -> list:
+	""" Read rules from a JSON config file
+
+	Parameters:
+		rulesFn (str)
+	Returns:
+		list: list of De5000Rule
+	Raises:
+		ValueError: if the file or a rule is invalid
+	"""
+	with open(rulesFn, mode="r") as fHnd:
+		try:
+			configD = json.load(fHnd)
+		except json.JSONDecodeError as err:
+			raise ValueError(f"invalid JSON: {str(err)}")
+	if not isinstance(configD, dict) or not isinstance(configD.get("rules"), list):
+		raise ValueError("config needs to contain a list 'rules'")
+	return [De5000Rule(ruleD, ix) for ix, ruleD in enumerate(configD["rules"])]
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000RuleEngine(object):
+	def __init__(self, rulesA: list):
+		""" Initialize object and compile the rules
+
+		Parameters:
+			rulesA (list): list of De5000Rule, see load_rules()
+		"""
+		self._rules = rulesA
+		# (display, quantity, freq or None) -> tuple of (lower limit, upper limit, rule index)
+		self._index = {}
+		self._errorRateRuleIxs = []
+		for ix, rule in enumerate(rulesA):
+			if rule.isErrorRate:
+				self._errorRateRuleIxs.append(ix)
+				continue
+			key = (rule.display, rule.quantity, rule.freq)
+			entry = (
+					rule.minVal if rule.minVal is not None else -math.inf,
+					rule.maxVal if rule.maxVal is not None else math.inf,
+					ix
+				)
+			self._index[key] = self._index.get(key, ()) + (entry,)
+		self._isFailing = [False] * len(rulesA)
+		#
+		self._errorWindowSec = max((rulesA[x].windowSec for x in self._errorRateRuleIxs), default=0.0)
+		self._packetHist = collections.deque()
+		self._packetHistErr = 0
+
+	@property
+	def rules(self) -> list:
+		return self._rules
+
+	def process_packet(self, packet: De5000StcPacket) -> list:
+		""" Evaluate the relevant rules
+
+		Parameters:
+			packet (De5000StcPacket): valid or invalid packet
+		Returns:
+			list: list of De5000RuleEvent for rules that have started failing
+		"""
+		resA = []
+		if self._errorRateRuleIxs:
+			self._check_error_rate(packet, resA)
+		if not packet.dataValid or packet.calMode:
+			return resA
+		self._check_display(DISPLAY_MAIN, packet.dispMain, packet, resA)
+		self._check_display(DISPLAY_SEC, packet.dispSec, packet, resA)
+		return resA
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _check_display(self, display: str, packetDisp, packet: De5000StcPacket, resA: list):
+		if packetDisp.status != STATUS_NORMAL or packetDisp.mantissa is None:
+			return
+		entriesA = self._index.get((display, packetDisp.quantity, packet.freq), ())
+		entriesB = self._index.get((display, packetDisp.quantity, None), ())
+		if not entriesA and not entriesB:
+			return
+		val = packetDisp.normVal
+		for entries in (entriesA, entriesB):
+			for minVal, maxVal, ix in entries:
+				self._set_state(ix, not (minVal <= val <= maxVal), val, packet, resA)
+
+	def _check_error_rate(self, packet: De5000StcPacket, resA: list):
+		nowNs = packet.monotonicNs if packet.monotonicNs is not None else time.monotonic_ns()
+		isErr = not packet.dataValid
+		self._packetHist.append((nowNs, isErr))
+		self._packetHistErr += isErr
+		while nowNs - self._packetHist[0][0] > self._errorWindowSec * 1E9:
+			self._packetHistErr -= self._packetHist.popleft()[1]
+		for ix in self._errorRateRuleIxs:
+			rule = self._rules[ix]
+			if rule.windowSec == self._errorWindowSec:
+				cnt = len(self._packetHist)
+				cntErr = self._packetHistErr
+			else:
+				histA = [x for x in self._packetHist if nowNs - x[0] <= rule.windowSec * 1E9]
+				cnt = len(histA)
+				cntErr = sum(x[1] for x in histA)
+			if cnt < rule.minPackets:
+				continue
+			rate = cntErr / cnt
+			self._set_state(ix, rate > rule.errorRate, rate, packet, resA)
+
+	def _set_state(self, ix: int, isFailing: bool, val: float, packet: De5000StcPacket, resA: list):
+		if isFailing and not self._isFailing[ix]:
+			resA.append(De5000RuleEvent(self._rules[ix], val, packet))
+		self._isFailing[ix] = isFailing
@@ -0,0 +1,201 @@
+#
+# by TS, Mai 2022
+#
+
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary, \
+		fixed_point_to_float, format_fixed_point
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def fixed_point_sub(valA: tuple, valB: tuple) -> tuple:
+	""" Subtract two fixed-point values (mantissa, exponent) exactly
+
+	Parameters:
+		valA (tuple): (mantissa, exponent)
+		valB (tuple): (mantissa, exponent)
+	Returns:
+		tuple: (mantissa, exponent) of valA - valB
+	"""
+	exp = min(valA[1], valB[1])
+	return (valA[0] * 10**(valA[1] - exp) - valB[0] * 10**(valB[1] - exp), exp)
+
+def fixed_point_median(valsA: list) -> Optional[tuple]:
+	""" Get the exact median of fixed-point values
+
+	Parameters:
+		valsA (list): list of (mantissa, exponent) tuples
+	Returns:
+		tuple: (mantissa, exponent), None if valsA is empty
+	"""
+	if not valsA:
+		return None
+	tmpSorted = sorted(valsA, key=lambda x: fixed_point_to_float(x[0], x[1]))
+	tmpCnt = len(tmpSorted)
+	if tmpCnt % 2 == 1:
+		return tmpSorted[tmpCnt // 2]
+	valA = tmpSorted[tmpCnt // 2 - 1]
+	valB = tmpSorted[tmpCnt // 2]
+	exp = min(valA[1], valB[1])
+	tmpSum = valA[0] * 10**(valA[1] - exp) + valB[0] * 10**(valB[1] - exp)
+	if tmpSum % 2 == 0:
+		return (tmpSum // 2, exp)
+	# x / 2 == x * 5 / 10
+	return (tmpSum * 5, exp - 1)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SessionDisplay(object):
+	""" Aggregated values of the main or secondary display during a session.
+	All values are normalized fixed-point tuples (mantissa, exponent).
+	"""
+
+	def __init__(self, quantity: Optional[str], normUnits: Optional[str], valsA: list):
+		self.quantity = quantity
+		self.normUnits = normUnits
+		self.count = len(valsA)
+		self.median = fixed_point_median(valsA)
+		self.min = min(valsA, key=lambda x: fixed_point_to_float(x[0], x[1])) if valsA else None
+		self.max = max(valsA, key=lambda x: fixed_point_to_float(x[0], x[1])) if valsA else None
+		self.spread = fixed_point_sub(self.max, self.min) if valsA else None
+
+	def format_val(self, val: Optional[tuple], decimals: Optional[int] = None) -> str:
+		""" Format one of the aggregated values
+
+		Parameters:
+			val (tuple): e.g. self.median
+			decimals (int): amount of decimal places, None means exact
+		Returns:
+			str
+		"""
+		if val is None:
+			return ""
+		return format_fixed_point(val[0], val[1], decimals)
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000Session(object):
+	""" One component session, i.e. the readings of one inserted part """
+
+	def __init__(self, sessionNr: int, firstPacket: De5000StcPacket, lastPacket: De5000StcPacket,
+			count: int, dispMain: De5000SessionDisplay, dispSec: De5000SessionDisplay):
+		self.sessionNr = sessionNr
+		self.firstTimestampNs = firstPacket.timestampNs
+		self.lastTimestampNs = lastPacket.timestampNs
+		self.durationNs = lastPacket.monotonicNs - firstPacket.monotonicNs
+		self.count = count
+		self.freq = firstPacket.freq
+		self.parallel = firstPacket.parallel
+		self.lcrAuto = firstPacket.lcrAuto
+		self.autoRange = firstPacket.autoRange
+		self.dispMain = dispMain
+		self.dispSec = dispSec
+
+	@property
+	def duration(self) -> float:
+		return self.durationNs / 1E9
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SessionSegmenter(object):
+	""" Segments the continuous packet stream into component sessions.
+
+	A session starts when the main display shows a normal reading and
+	ends when it doesn't anymore (blank, OL, '----', ...), i.e. when the
+	part has been removed. A change of the measurement setup (quantity,
+	units, test frequency, serial/parallel) also ends the session.
+	"""
+
+	def __init__(self, minReadings: int = 1):
+		""" Initialize object
+
+		Parameters:
+			minReadings (int): sessions with less readings are discarded (contact bounce)
+		"""
+		assert minReadings > 0, "minReadings needs to be > 0"
+		#
+		self._minReadings = minReadings
+		self._sessionCount = 0
+		self._discardedCount = 0
+		self._reset_session()
+
+	def process_packet(self, packet: De5000StcPacket) -> Optional[De5000Session]:
+		""" Feed a decoded packet into the segmenter
+
+		Parameters:
+			packet (De5000StcPacket)
+		Returns:
+			De5000Session: the session that has just ended, otherwise None
+		"""
+		if not packet.dataValid or packet.calMode:
+			return None
+		if packet.sortingMode or packet.deltaMode or packet.dispMain.status != STATUS_NORMAL:
+			# the part has been removed or the meter is not displaying a plain reading
+			return self.flush()
+		#
+		res = None
+		setupKey = (packet.dispMain.quantity, packet.dispMain.normUnits, packet.freq, packet.parallel,
+				packet.dispSec.quantity, packet.dispSec.normUnits)
+		if self._firstPacket is not None and setupKey != self._setupKey:
+			res = self.flush()
+		if self._firstPacket is None:
+			self._firstPacket = packet
+			self._setupKey = setupKey
+		self._lastPacket = packet
+		self._count += 1
+		self._valsMain.append(self._get_fixed_point(packet.dispMain))
+		if packet.dispSec.status == STATUS_NORMAL and packet.dispSec.mantissa is not None:
+			self._valsSec.append(self._get_fixed_point(packet.dispSec))
+		return res
+
+	def flush(self) -> Optional[De5000Session]:
+		""" End the current session
+
+		Returns:
+			De5000Session: None if there was no session or it was discarded
+		"""
+		if self._firstPacket is None:
+			return None
+		res = None
+		if self._count >= self._minReadings:
+			self._sessionCount += 1
+			res = De5000Session(
+					self._sessionCount,
+					self._firstPacket,
+					self._lastPacket,
+					self._count,
+					De5000SessionDisplay(self._firstPacket.dispMain.quantity, self._firstPacket.dispMain.normUnits, self._valsMain),
+					De5000SessionDisplay(self._firstPacket.dispSec.quantity, self._firstPacket.dispSec.normUnits, self._valsSec)
+				)
+		else:
+			self._discardedCount += 1
+		self._reset_session()
+		return res
+
+	@property
+	def sessionCount(self) -> int:
+		return self._sessionCount
+
+	@property
+	def discardedCount(self) -> int:
+		return self._discardedCount
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _reset_session(self):
+		self._firstPacket = None
+		self._lastPacket = None
+		self._setupKey = None
+		self._count = 0
+		self._valsMain = []
+		self._valsSec = []
+
+	def _get_fixed_point(self, packetDisp: De5000StcPacketMainSecondary) -> tuple:
+		return (packetDisp.mantissa, packetDisp.normExponent)
@@ -0,0 +1,182 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Live feed of the latest decoded packet via a memory-mapped file
+
+The publisher (acquisition process) writes each packet into a
+fixed-layout segment. Any number of local reader processes can map
+the same file and read the latest packet without locks:
+
+Layout:
+	0x00  magic 'DE5K'
+	0x04  layout version (uint16)
+	0x06  record size (uint16)
+	0x08  sequence counter (uint64)
+	0x10  record (see de5000_record.py)
+
+The sequence counter is odd while the publisher is writing the record
+and even otherwise (seqlock). A reader retries if the counter was odd
+or has changed while it was reading the record.
+"""
+
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+from .de5000_stc_packet import De5000StcPacket
+from .de5000_record import RECORD_SIZE, pack_packet_into, unpack_fields, unpack_packet
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+_MAGIC = b"DE5K"
+_LAYOUT_VERSION = 1
+_HEADER_STRUCT = struct.Struct("<4sHH")
+_SEQ_STRUCT = struct.Struct("<Q")
+_OFFS_SEQ = 0x08
+_OFFS_RECORD = 0x10
+_SEGMENT_SIZE = _OFFS_RECORD + RECORD_SIZE
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000ShmPublisher(object):
+	def __init__(self, shmFn: str):
+		""" Initialize object - creates or overwrites the segment file
+
+		Parameters:
+			shmFn (str): e.g. '/dev/shm/de5000-ttyUSB0'
+		"""
+		assert shmFn is not None and isinstance(shmFn, str), "shmFn needs to be string"
+		assert shmFn != "", "shmFn needs to be non-empty string"
+		#
+		self._shmFn = shmFn
+		self._fd = os.open(self._shmFn, os.O_RDWR | os.O_CREAT, 0o644)
+		os.ftruncate(self._fd, _SEGMENT_SIZE)
+		self._mm = mmap.mmap(self._fd, _SEGMENT_SIZE, access=mmap.ACCESS_WRITE)
+		self._mm[0:_OFFS_RECORD] = bytes(_OFFS_RECORD)
+		_HEADER_STRUCT.pack_into(self._mm, 0, _MAGIC, _LAYOUT_VERSION, RECORD_SIZE)
+		self._seq = 0
+
+	def publish(self, packet: De5000StcPacket):
+		""" Write a packet into the segment
+
+		Parameters:
+			packet (De5000StcPacket)
+		"""
+		if self._mm is None:
+			return
+		self._seq += 1
+		_SEQ_STRUCT.pack_into(self._mm, _OFFS_SEQ, self._seq)
+		pack_packet_into(self._mm, _OFFS_RECORD, packet)
+		self._seq += 1
+		_SEQ_STRUCT.pack_into(self._mm, _OFFS_SEQ, self._seq)
+
+	def close(self):
+		""" Unmap the segment - the file is kept so that readers can still map it """
+		if self._mm is None:
+			return
+		self._mm.close()
+		self._mm = None
+		os.close(self._fd)
+
+	def __del__(self):
+		if hasattr(self, "_mm"):
+			self.close()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000ShmReader(object):
+	_MAX_RETRIES = 1000
+
+	def __init__(self, shmFn: str):
+		""" Initialize object
+
+		Parameters:
+			shmFn (str): the file given to De5000ShmPublisher
+		Raises:
+			Exception: if the file is not a DE-5000 live feed
+		"""
+		assert shmFn is not None and isinstance(shmFn, str), "shmFn needs to be string"
+		#
+		self._shmFn = shmFn
+		with open(self._shmFn, mode="rb") as fHnd:
+			self._mm = mmap.mmap(fHnd.fileno(), _SEGMENT_SIZE, access=mmap.ACCESS_READ)
+		magic, version, recordSize = _HEADER_STRUCT.unpack_from(self._mm, 0)
+		if magic != _MAGIC or version != _LAYOUT_VERSION or recordSize != RECORD_SIZE:
+			self._mm.close()
+			self._mm = None
+			raise Exception(f"'{shmFn}' is not a compatible DE-5000 live feed")
+		self._lastSeq = 0
+
+	@property
+	def sequence(self) -> int:
+		""" Current sequence counter - increases by two with every packet """
+		return _SEQ_STRUCT.unpack_from(self._mm, _OFFS_SEQ)[0]
+
+	def read_fields(self) -> Optional[tuple]:
+		""" Read a consistent copy of the raw record fields directly
+		from the mapped memory (see de5000_record.py for the layout)
+
+		Returns:
+			tuple: (sequence, fields), None if nothing has been published yet
+		"""
+		for _ in range(self._MAX_RETRIES):
+			seq1 = _SEQ_STRUCT.unpack_from(self._mm, _OFFS_SEQ)[0]
+			if seq1 == 0:
+				return None
+			if seq1 & 1:
+				# publisher is writing
+				time.sleep(0)
+				continue
+			fieldsA = unpack_fields(self._mm, _OFFS_RECORD)
+			seq2 = _SEQ_STRUCT.unpack_from(self._mm, _OFFS_SEQ)[0]
+			if seq1 == seq2:
+				self._lastSeq = seq1
+				return (seq1, fieldsA)
+		raise Exception("could not get a consistent read")
+
+	def read_packet(self) -> Optional[De5000StcPacket]:
+		""" Read the latest packet
+
+		Returns:
+			De5000StcPacket: None if nothing has been published yet
+		"""
+		for _ in range(self._MAX_RETRIES):
+			seq1 = _SEQ_STRUCT.unpack_from(self._mm, _OFFS_SEQ)[0]
+			if seq1 == 0:
+				return None
+			if seq1 & 1:
+				time.sleep(0)
+				continue
+			res = unpack_packet(self._mm, _OFFS_RECORD)
+			seq2 = _SEQ_STRUCT.unpack_from(self._mm, _OFFS_SEQ)[0]
+			if seq1 == seq2:
+				self._lastSeq = seq1
+				return res
+		raise Exception("could not get a consistent read")
+
+	def read_packet_if_new(self) -> Optional[De5000StcPacket]:
+		""" Read the latest packet if it hasn't been read before
+
+		Returns:
+			De5000StcPacket: None if there is no new packet
+		"""
+		if self.sequence == self._lastSeq:
+			return None
+		return self.read_packet()
+
+	def close(self):
+		if self._mm is None:
+			return
+		self._mm.close()
+		self._mm = None
+
+	def __del__(self):
+		if hasattr(self, "_mm"):
+			self.close()
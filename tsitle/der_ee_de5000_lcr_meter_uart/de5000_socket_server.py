@@ -0,0 +1,299 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Broadcast of received frames to any number of local subscribers
+via a Unix-domain or TCP socket
+
+Framing: every message consists of a 2 byte header (message type,
+payload length) followed by the payload:
+	MSG_TYPE_HELLO    sent once after connecting: magic 'DE5K', version (uint16), record size (uint16)
+	MSG_TYPE_RAW      the raw 17 byte frame as received from the meter
+	MSG_TYPE_RECORD   the decoded packet as binary record (see de5000_record.py)
+
+The server never blocks: each client has its own send buffer and
+clients that can't keep up (buffer exceeds its limit) are dropped.
+"""
+
+import os
+import selectors
+import socket
+import stat
+import struct
+from typing import Optional
+
+from .de5000_stc_packet import De5000StcPacket
+from .de5000_record import RECORD_SIZE, pack_packet, unpack_packet
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+MSG_TYPE_HELLO = 0x00
+MSG_TYPE_RAW = 0x01
+MSG_TYPE_RECORD = 0x02
+
+_MSG_HEADER_STRUCT = struct.Struct("<BB")
+_HELLO_STRUCT = struct.Struct("<4sHH")
+_MAGIC = b"DE5K"
+_PROTOCOL_VERSION = 1
+
+_UNIX_PREFIX = "unix:"
+_TCP_PREFIX = "tcp:"
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def parse_address(address: str) -> tuple:
+	""" Parse 'unix:/path/to/socket', 'tcp:host:port' or 'host:port'
+
+	Parameters:
+		address (str)
+	Returns:
+		tuple: (socket family, address)
+	Raises:
+		ValueError
+	"""
+	if address.startswith(_UNIX_PREFIX):
+		return (socket.AF_UNIX, address[len(_UNIX_PREFIX):])
+	if address.startswith(_TCP_PREFIX):
+		address = address[len(_TCP_PREFIX):]
+	host, sep, port = address.rpartition(":")
+	if not sep or not port.isdigit():
+		raise ValueError(f"invalid socket address '{address}'")
+	return (socket.AF_INET, (host if host else "127.0.0.1", int(port)))
+
+def _get_message(msgType: int, payload: bytes) -> bytes:
+	return _MSG_HEADER_STRUCT.pack(msgType, len(payload)) + payload
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class _Client(object):
+	def __init__(self, sock: socket.socket, peerName: str):
+		self.sock = sock
+		self.peerName = peerName
+		self.outBuf = bytearray()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SocketServer(object):
+	def __init__(self, address: str, maxClientBuffer: int = 65536):
+		""" Initialize object and start listening
+
+		Parameters:
+			address (str): see parse_address()
+			maxClientBuffer (int): clients with more unsent bytes are dropped
+		Raises:
+			OSError: e.g. the address is in use or a Unix-domain socket path is taken by another file
+		"""
+		assert maxClientBuffer > 0, "maxClientBuffer needs to be > 0"
+		#
+		self._family, self._address = parse_address(address)
+		self._maxClientBuffer = maxClientBuffer
+		self._clients = {}
+		self._droppedCount = 0
+		self._sel = selectors.DefaultSelector()
+		#
+		if self._family == socket.AF_UNIX:
+			self._remove_stale_socket()
+		self._listenSock = socket.socket(self._family, socket.SOCK_STREAM)
+		if self._family == socket.AF_INET:
+			self._listenSock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self._listenSock.bind(self._address)
+		self._listenSock.listen()
+		self._listenSock.setblocking(False)
+		self._sel.register(self._listenSock, selectors.EVENT_READ)
+		#
+		self._helloMsg = _get_message(MSG_TYPE_HELLO, _HELLO_STRUCT.pack(_MAGIC, _PROTOCOL_VERSION, RECORD_SIZE))
+
+	@property
+	def clientCount(self) -> int:
+		return len(self._clients)
+
+	@property
+	def droppedCount(self) -> int:
+		""" Amount of clients that were dropped because they were too slow """
+		return self._droppedCount
+
+	def poll(self):
+		""" Accept new clients and notice closed connections - does not block """
+		for key, _ in self._sel.select(timeout=0):
+			if key.fileobj is self._listenSock:
+				self._accept()
+			else:
+				self._read_from_client(self._clients.get(key.fileobj))
+
+	def broadcast_raw(self, rawData: bytes):
+		""" Send a raw frame to all clients
+
+		Parameters:
+			rawData (bytes)
+		"""
+		self._broadcast(_get_message(MSG_TYPE_RAW, rawData))
+
+	def broadcast_packet(self, packet: De5000StcPacket):
+		""" Send a decoded packet to all clients
+
+		Parameters:
+			packet (De5000StcPacket)
+		"""
+		self._broadcast(_get_message(MSG_TYPE_RECORD, pack_packet(packet)))
+
+	def close(self):
+		""" Disconnect all clients and stop listening """
+		if self._listenSock is None:
+			return
+		for client in list(self._clients.values()):
+			self._remove_client(client)
+		self._sel.unregister(self._listenSock)
+		self._listenSock.close()
+		self._listenSock = None
+		self._sel.close()
+		if self._family == socket.AF_UNIX and os.path.exists(self._address):
+			os.remove(self._address)
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _remove_stale_socket(self):
+		""" Remove the socket file of a previous run - anything else at
+		the path (e.g. a data file) and sockets of a running server are kept
+
+		Raises:
+			FileExistsError
+		"""
+		try:
+			tmpMode = os.lstat(self._address).st_mode
+		except FileNotFoundError:
+			return
+		if not stat.S_ISSOCK(tmpMode):
+			raise FileExistsError(f"'{self._address}' exists and is not a socket")
+		tmpSock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			tmpSock.connect(self._address)
+		except (ConnectionRefusedError, FileNotFoundError):
+			# nobody is listening
+			os.remove(self._address)
+			return
+		finally:
+			tmpSock.close()
+		raise FileExistsError(f"another server is listening on '{self._address}'")
+
+	def _accept(self):
+		try:
+			sock, peerAddr = self._listenSock.accept()
+		except BlockingIOError:
+			return
+		sock.setblocking(False)
+		client = _Client(sock, str(peerAddr))
+		self._clients[sock] = client
+		self._sel.register(sock, selectors.EVENT_READ)
+		client.outBuf += self._helloMsg
+		self._flush(client)
+
+	def _read_from_client(self, client: Optional[_Client]):
+		if client is None:
+			return
+		try:
+			# subscribers are not supposed to send anything
+			data = client.sock.recv(4096)
+		except BlockingIOError:
+			return
+		except OSError:
+			data = b""
+		if not data:
+			self._remove_client(client)
+
+	def _broadcast(self, msg: bytes):
+		self.poll()
+		for client in list(self._clients.values()):
+			client.outBuf += msg
+			self._flush(client)
+
+	def _flush(self, client: _Client):
+		if client.outBuf:
+			try:
+				sentCnt = client.sock.send(client.outBuf)
+				del client.outBuf[:sentCnt]
+			except BlockingIOError:
+				pass
+			except OSError:
+				self._remove_client(client)
+				return
+		if len(client.outBuf) > self._maxClientBuffer:
+			self._droppedCount += 1
+			self._remove_client(client)
+
+	def _remove_client(self, client: _Client):
+		if client.sock not in self._clients:
+			return
+		del self._clients[client.sock]
+		self._sel.unregister(client.sock)
+		client.sock.close()
+
+	def __del__(self):
+		if hasattr(self, "_listenSock"):
+			self.close()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SocketClient(object):
+	def __init__(self, address: str, timeout: Optional[float] = None):
+		""" Initialize object and connect to the server
+
+		Parameters:
+			address (str): see parse_address()
+			timeout (float): socket timeout in seconds, None means blocking
+		Raises:
+			Exception: if the server is not a compatible DE-5000 server
+		"""
+		family, sockAddr = parse_address(address)
+		self._sock = socket.socket(family, socket.SOCK_STREAM)
+		self._sock.settimeout(timeout)
+		self._sock.connect(sockAddr)
+		self._inBuf = bytearray()
+		#
+		msgType, payload = self.read_message()
+		if msgType != MSG_TYPE_HELLO:
+			raise Exception("unexpected first message")
+		magic, version, recordSize = _HELLO_STRUCT.unpack(payload)
+		if magic != _MAGIC or version != _PROTOCOL_VERSION or recordSize != RECORD_SIZE:
+			raise Exception("incompatible DE-5000 server")
+
+	def read_message(self) -> tuple:
+		""" Read the next message
+
+		Returns:
+			tuple: (message type, payload)
+		Raises:
+			ConnectionError: if the server has closed the connection
+		"""
+		while True:
+			if len(self._inBuf) >= _MSG_HEADER_STRUCT.size:
+				msgType, msgLen = _MSG_HEADER_STRUCT.unpack_from(self._inBuf, 0)
+				msgEnd = _MSG_HEADER_STRUCT.size + msgLen
+				if len(self._inBuf) >= msgEnd:
+					payload = bytes(self._inBuf[_MSG_HEADER_STRUCT.size:msgEnd])
+					del self._inBuf[:msgEnd]
+					return (msgType, payload)
+			data = self._sock.recv(4096)
+			if not data:
+				raise ConnectionError("connection closed by server")
+			self._inBuf += data
+
+	def read_packet(self) -> De5000StcPacket:
+		""" Read the next decoded packet - raw frames are skipped
+
+		Returns:
+			De5000StcPacket
+		"""
+		while True:
+			msgType, payload = self.read_message()
+			if msgType == MSG_TYPE_RECORD:
+				return unpack_packet(payload)
+
+	def close(self):
+		self._sock.close()
@@ -3,22 +3,90 @@
 #
 
 from datetime import datetime
+import time
 from typing import Optional
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
+# Powers of ten used for the fixed-point conversions
+_POW10 = [10**x for x in range(32)]
+
+def fixed_point_to_float(mantissa: int, exponent: int) -> float:
+	""" Convert fixed-point value (mantissa * 10^exponent) to float
+
+	Parameters:
+		mantissa (int)
+		exponent (int)
+	Returns:
+		float
+	"""
+	if exponent < 0:
+		# int / int is correctly rounded, unlike mantissa * 10**exponent
+		return mantissa / _POW10[-exponent]
+	return float(mantissa * _POW10[exponent])
+
+def format_fixed_point(mantissa: int, exponent: int, decimals: Optional[int] = None) -> str:
+	""" Format fixed-point value (mantissa * 10^exponent) as decimal string
+	using integer arithmetic only
+
+	Parameters:
+		mantissa (int)
+		exponent (int)
+		decimals (int): amount of decimal places (rounded half up),
+		                None means exact with at least one decimal place
+	Returns:
+		str
+	"""
+	isNeg = (mantissa < 0)
+	mag = -mantissa if isNeg else mantissa
+	stripZeros = (decimals is None)
+	if stripZeros:
+		decimals = -exponent if exponent < 0 else 0
+	shift = exponent + decimals
+	if shift >= 0:
+		scaled = mag * _POW10[shift]
+	else:
+		div = _POW10[-shift]
+		scaled, rem = divmod(mag, div)
+		if rem * 2 >= div:
+			scaled += 1
+	res = str(scaled)
+	if decimals > 0:
+		if len(res) <= decimals:
+			res = "0" * (decimals + 1 - len(res)) + res
+		intPart = res[:-decimals]
+		fracPart = res[-decimals:]
+		if stripZeros:
+			fracPart = fracPart.rstrip("0") or "0"
+		res = intPart + "." + fracPart
+	elif stripZeros:
+		res += ".0"
+	if isNeg and scaled != 0:
+		res = "-" + res
+	return res
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
 class De5000StcPacketMainSecondary(object):
+	""" Values are stored as integer mantissa plus decimal exponent
+	(value = mantissa * 10^exponent), exactly as transmitted by the meter.
+	Floats are only computed when the properties val/normVal are accessed.
+	"""
+
 	def __init__(self):
 		self.__quantity = None
-		self.__val = None
+		self.__mantissa = None
+		self.__exponent = None
 		self.__units = None
+		self.__unitsCode = None
 		self.__status = None
-		self.__normVal = None
+		self.__normExponent = None
 		self.__normUnits = None
 
 	def __str__(self) -> str:
-		return f"QU:{self.quantity}, VA:{self.val}, UN:{self.units}, ST:{self.status}"
+		return f"QU:{self.quantity}, VA:{self.format_val()}, UN:{self.units}, ST:{self.status}"
 
 	@property
 	def quantity(self) -> Optional[str]:
@@ -30,13 +98,28 @@ class De5000StcPacketMainSecondary(object):
 		self.__quantity = value
 
 	@property
-	def val(self) -> Optional[float]:
-		return self.__val
-	@val.setter
-	def val(self, value: Optional[float]):
-		assert value is None or isinstance(value, float), "value needs to be None or float"
+	def mantissa(self) -> Optional[int]:
+		return self.__mantissa
+	@mantissa.setter
+	def mantissa(self, value: Optional[int]):
+		assert value is None or isinstance(value, int), "value needs to be None or integer"
+		#
+		self.__mantissa = value
+
+	@property
+	def exponent(self) -> Optional[int]:
+		return self.__exponent
+	@exponent.setter
+	def exponent(self, value: Optional[int]):
+		assert value is None or isinstance(value, int), "value needs to be None or integer"
 		#
-		self.__val = value
+		self.__exponent = value
+
+	@property
+	def val(self) -> Optional[float]:
+		if self.__mantissa is None or self.__exponent is None:
+			return None
+		return fixed_point_to_float(self.__mantissa, self.__exponent)
 
 	@property
 	def units(self) -> Optional[str]:
@@ -47,6 +130,15 @@ class De5000StcPacketMainSecondary(object):
 		#
 		self.__units = value
 
+	@property
+	def unitsCode(self) -> Optional[int]:
+		return self.__unitsCode
+	@unitsCode.setter
+	def unitsCode(self, value: Optional[int]):
+		assert value is None or isinstance(value, int), "value needs to be None or integer"
+		#
+		self.__unitsCode = value
+
 	@property
 	def status(self) -> Optional[str]:
 		return self.__status
@@ -57,13 +149,19 @@ class De5000StcPacketMainSecondary(object):
 		self.__status = value
 
 	@property
-	def normVal(self) -> Optional[float]:
-		return self.__normVal
-	@normVal.setter
-	def normVal(self, value: Optional[float]):
-		assert value is None or isinstance(value, float), "value needs to be None or float"
+	def normExponent(self) -> Optional[int]:
+		return self.__normExponent
+	@normExponent.setter
+	def normExponent(self, value: Optional[int]):
+		assert value is None or isinstance(value, int), "value needs to be None or integer"
 		#
-		self.__normVal = value
+		self.__normExponent = value
+
+	@property
+	def normVal(self) -> Optional[float]:
+		if self.__mantissa is None or self.__normExponent is None:
+			return None
+		return fixed_point_to_float(self.__mantissa, self.__normExponent)
 
 	@property
 	def normUnits(self) -> Optional[str]:
@@ -74,14 +172,46 @@ class De5000StcPacketMainSecondary(object):
 		#
 		self.__normUnits = value
 
+	def format_val(self, decimals: Optional[int] = None) -> str:
+		""" Format value as decimal string
+
+		Parameters:
+			decimals (int): amount of decimal places, None means exact
+		Returns:
+			str
+		"""
+		if self.__mantissa is None or self.__exponent is None:
+			return ""
+		return format_fixed_point(self.__mantissa, self.__exponent, decimals)
+
+	def format_norm_val(self, decimals: Optional[int] = None) -> str:
+		""" Format normalized value as decimal string
+
+		Parameters:
+			decimals (int): amount of decimal places, None means exact
+		Returns:
+			str
+		"""
+		if self.__mantissa is None or self.__normExponent is None:
+			return ""
+		return format_fixed_point(self.__mantissa, self.__normExponent, decimals)
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
 class De5000StcPacket(object):
-	def __init__(self, timestamp=None):
-		assert timestamp is None or isinstance(timestamp, datetime), "timestamp needs to be None or instance of datetime"
+	def __init__(self, timestampNs=None, monotonicNs=None):
+		""" Initialize object
+
+		Parameters:
+			timestampNs (int): wall-clock time of reception in nanoseconds since the epoch, None means now
+			monotonicNs (int): time.monotonic_ns() at reception, None means now
+		"""
+		assert timestampNs is None or isinstance(timestampNs, int), "timestampNs needs to be None or integer"
+		assert monotonicNs is None or isinstance(monotonicNs, int), "monotonicNs needs to be None or integer"
 		#
-		self.__timestamp = timestamp if timestamp is not None else datetime.now()
+		self.__timestampNs = timestampNs if timestampNs is not None else time.time_ns()
+		self.__monotonicNs = monotonicNs if monotonicNs is not None else time.monotonic_ns()
 		#
 		self.__dispMain = De5000StcPacketMainSecondary()
 		self.__dispSec = De5000StcPacketMainSecondary()
@@ -95,15 +225,31 @@ class De5000StcPacket(object):
 		self.__lcrAuto = False
 		self.__autoRange = False
 		self.__parallel = False
+		# derived state - set by De5000RefTracker (see de5000_ref_tracker.py)
+		self.__sortSetup = False
+		self.__sortRef = None
+		self.__deltaRefSetup = False
+		self.__deltaRef = None
 		#
 		self.__dataValid = False
+		self.__rawData = None
 		self.__packetCountOk = 0
 		self.__packetCountErr = 0
 		self.__dbgMsg = ""
 
 	@property
 	def timestamp(self) -> datetime:
-		return self.__timestamp
+		""" Local date/time of reception - computed on demand """
+		return datetime.fromtimestamp(self.__timestampNs // 1000000000).replace(
+				microsecond=(self.__timestampNs // 1000) % 1000000)
+
+	@property
+	def timestampNs(self) -> int:
+		return self.__timestampNs
+
+	@property
+	def monotonicNs(self) -> int:
+		return self.__monotonicNs
 
 	@property
 	def dispMain(self) -> De5000StcPacketMainSecondary:
@@ -194,6 +340,46 @@ class De5000StcPacket(object):
 		#
 		self.__parallel = value
 
+	@property
+	def sortSetup(self) -> bool:
+		""" True if the setup for Component Sorting is being entered into the meter """
+		return self.__sortSetup
+	@sortSetup.setter
+	def sortSetup(self, value: bool):
+		assert isinstance(value, int), "value needs to be bool"
+		#
+		self.__sortSetup = value
+
+	@property
+	def sortRef(self) -> Optional[str]:
+		""" Reference value of the Component Sorting incl. unit, None if unknown """
+		return self.__sortRef
+	@sortRef.setter
+	def sortRef(self, value: Optional[str]):
+		assert value is None or isinstance(value, str), "value needs to be None or string"
+		#
+		self.__sortRef = value
+
+	@property
+	def deltaRefSetup(self) -> bool:
+		""" True if the reference value of the Delta Mode is being displayed on the meter """
+		return self.__deltaRefSetup
+	@deltaRefSetup.setter
+	def deltaRefSetup(self, value: bool):
+		assert isinstance(value, int), "value needs to be bool"
+		#
+		self.__deltaRefSetup = value
+
+	@property
+	def deltaRef(self) -> Optional[str]:
+		""" Reference value of the Delta Mode incl. unit, None if unknown """
+		return self.__deltaRef
+	@deltaRef.setter
+	def deltaRef(self, value: Optional[str]):
+		assert value is None or isinstance(value, str), "value needs to be None or string"
+		#
+		self.__deltaRef = value
+
 	@property
 	def dataValid(self) -> bool:
 		return self.__dataValid
@@ -203,6 +389,16 @@ class De5000StcPacket(object):
 		#
 		self.__dataValid = value
 
+	@property
+	def rawData(self) -> Optional[bytes]:
+		""" The received frame (only set for valid packets) """
+		return self.__rawData
+	@rawData.setter
+	def rawData(self, value: Optional[bytes]):
+		assert value is None or isinstance(value, bytes), "value needs to be None or bytes"
+		#
+		self.__rawData = value
+
 	@property
 	def packetCountOk(self) -> int:
 		return self.__packetCountOk
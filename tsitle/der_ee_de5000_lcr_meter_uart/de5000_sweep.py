@@ -0,0 +1,168 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Segmentation of frequency sweeps
+
+While a part is on the fixture the operator steps the meter through the
+test frequencies (100 Hz ... 100 kHz). The segmenter detects the
+frequency changes, aggregates the settled readings of every frequency
+(median, min, max, spread - see de5000_session.py) and returns one
+sweep per part.
+
+A sweep ends when the part has been removed, the measured quantities
+change or the test frequency decreases (next part or next sweep).
+"""
+
+from typing import Optional
+
+from .de5000_uart import STATUS_NORMAL
+from .de5000_stc_packet import De5000StcPacket, De5000StcPacketMainSecondary
+from .de5000_session import De5000SessionDisplay
+from .de5000_record import FREQ_CODES
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# ascending, DC (DCR) is not part of a sweep
+SWEEP_FREQS = [x for x in FREQ_CODES if x != "DC"]
+
+_FREQ_ORDER = {x: ix for ix, x in enumerate(SWEEP_FREQS)}
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SweepStep(object):
+	""" Aggregated readings of one test frequency """
+
+	def __init__(self, freq: str, count: int, dispMain: De5000SessionDisplay, dispSec: De5000SessionDisplay):
+		self.freq = freq
+		# all readings, including the ones before the value had settled
+		self.count = count
+		self.dispMain = dispMain
+		self.dispSec = dispSec
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000Sweep(object):
+	""" One frequency sweep, i.e. the readings of one part """
+
+	def __init__(self, sweepNr: int, firstPacket: De5000StcPacket, lastPacket: De5000StcPacket, stepsD: dict):
+		self.sweepNr = sweepNr
+		self.firstTimestampNs = firstPacket.timestampNs
+		self.lastTimestampNs = lastPacket.timestampNs
+		self.durationNs = lastPacket.monotonicNs - firstPacket.monotonicNs
+		self.parallel = firstPacket.parallel
+		self.mainQuantity = firstPacket.dispMain.quantity
+		self.mainNormUnits = firstPacket.dispMain.normUnits
+		self.secQuantity = firstPacket.dispSec.quantity
+		self.secNormUnits = firstPacket.dispSec.normUnits
+		# freq -> De5000SweepStep
+		self.steps = stepsD
+
+	@property
+	def duration(self) -> float:
+		return self.durationNs / 1E9
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SweepSegmenter(object):
+	def __init__(self, settleReadings: int = 1):
+		""" Initialize object
+
+		Parameters:
+			settleReadings (int): amount of readings after a frequency change that are ignored
+			                      (unless there are no other readings of that frequency)
+		"""
+		assert settleReadings >= 0, "settleReadings needs to be >= 0"
+		#
+		self._settleReadings = settleReadings
+		self._sweepCount = 0
+		self._reset_sweep()
+
+	@property
+	def sweepCount(self) -> int:
+		return self._sweepCount
+
+	def process_packet(self, packet: De5000StcPacket) -> Optional[De5000Sweep]:
+		""" Feed a decoded packet into the segmenter
+
+		Parameters:
+			packet (De5000StcPacket)
+		Returns:
+			De5000Sweep: the sweep that has just ended, otherwise None
+		"""
+		if not packet.dataValid or packet.calMode:
+			return None
+		if (packet.sortingMode or packet.deltaMode or packet.dispMain.status != STATUS_NORMAL or
+				packet.freq not in _FREQ_ORDER):
+			# the part has been removed or the meter is not displaying a plain reading
+			return self.flush()
+		#
+		res = None
+		setupKey = (packet.dispMain.quantity, packet.dispMain.normUnits, packet.parallel,
+				packet.dispSec.quantity, packet.dispSec.normUnits)
+		if self._firstPacket is not None and (setupKey != self._setupKey or
+				_FREQ_ORDER[packet.freq] < _FREQ_ORDER[self._stepFreq]):
+			res = self.flush()
+		if self._firstPacket is None:
+			self._firstPacket = packet
+			self._setupKey = setupKey
+		if packet.freq != self._stepFreq:
+			self._end_step()
+			self._stepFreq = packet.freq
+		self._lastPacket = packet
+		self._stepValsMain.append(self._get_fixed_point(packet.dispMain))
+		self._stepValsSec.append(
+				self._get_fixed_point(packet.dispSec)
+				if packet.dispSec.status == STATUS_NORMAL and packet.dispSec.mantissa is not None else None)
+		return res
+
+	def flush(self) -> Optional[De5000Sweep]:
+		""" End the current sweep
+
+		Returns:
+			De5000Sweep: None if there was no sweep
+		"""
+		if self._firstPacket is None:
+			return None
+		self._end_step()
+		self._sweepCount += 1
+		res = De5000Sweep(self._sweepCount, self._firstPacket, self._lastPacket, self._steps)
+		self._reset_sweep()
+		return res
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _reset_sweep(self):
+		self._firstPacket = None
+		self._lastPacket = None
+		self._setupKey = None
+		self._steps = {}
+		self._stepFreq = None
+		self._stepValsMain = []
+		self._stepValsSec = []
+
+	def _end_step(self):
+		if self._stepFreq is None:
+			return
+		tmpCnt = len(self._stepValsMain)
+		tmpStart = self._settleReadings if tmpCnt > self._settleReadings else tmpCnt - 1
+		tmpSec = [x for x in self._stepValsSec[tmpStart:] if x is not None]
+		self._steps[self._stepFreq] = De5000SweepStep(
+				self._stepFreq,
+				tmpCnt,
+				De5000SessionDisplay(self._firstPacket.dispMain.quantity, self._firstPacket.dispMain.normUnits,
+						self._stepValsMain[tmpStart:]),
+				De5000SessionDisplay(self._firstPacket.dispSec.quantity, self._firstPacket.dispSec.normUnits, tmpSec)
+			)
+		self._stepFreq = None
+		self._stepValsMain = []
+		self._stepValsSec = []
+
+	def _get_fixed_point(self, packetDisp: De5000StcPacketMainSecondary) -> tuple:
+		return (packetDisp.mantissa, packetDisp.normExponent)
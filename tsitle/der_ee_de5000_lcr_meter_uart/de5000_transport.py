@@ -0,0 +1,187 @@
+#
+# by TS, Mai 2022
+#
+
+"""
+Byte sources for De5000Uart
+
+	De5000SerialTransport   serial port or pyserial URL ('loop://', 'socket://host:port', ...)
+	De5000StreamTransport   any binary file-like object: capture files, pipes, io.BytesIO
+
+A capture file simply contains the bytes as received from the meter
+(e.g. the raw frames of cli_de5000.py --serve-mode raw).
+"""
+
+import abc
+from typing import Optional
+
+import serial
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+# Serial port settings: 9600 8N1 DTR=1 RTS=0
+_BAUD_RATE = 9600
+_BITS = serial.EIGHTBITS
+_PARITY = serial.PARITY_NONE
+_STOP_BITS = serial.STOPBITS_ONE
+_TIMEOUT = 1
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000Transport(abc.ABC):
+	""" Interface of all transports """
+
+	@property
+	@abc.abstractmethod
+	def name(self) -> str:
+		raise NotImplementedError()
+
+	@property
+	@abc.abstractmethod
+	def isOpen(self) -> bool:
+		raise NotImplementedError()
+
+	@property
+	def isEndOfData(self) -> bool:
+		""" True if the source can't deliver any more data (e.g. end of a capture file) """
+		return False
+
+	@abc.abstractmethod
+	def reset_input_buffer(self) -> bool:
+		""" Discard buffered data in order to get the latest frame
+
+		Returns:
+			bool: False if the transport doesn't discard anything (e.g. streams)
+		"""
+		raise NotImplementedError()
+
+	def set_read_timeout(self, timeout: Optional[float]):
+		""" Change the timeout of read_until()
+
+		Parameters:
+			timeout (float): in seconds, None restores the default
+		"""
+		pass
+
+	@abc.abstractmethod
+	def read_until(self, expected: bytes, size: int) -> bytes:
+		""" Read until expected has been received, size bytes have been
+		read or a timeout occurred
+
+		Returns:
+			bytes
+		"""
+		raise NotImplementedError()
+
+	@abc.abstractmethod
+	def close(self):
+		raise NotImplementedError()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000SerialTransport(De5000Transport):
+	def __init__(self, url: str):
+		""" Initialize object and open the port
+
+		Parameters:
+			url (str): e.g. '/dev/ttyUSB0', 'COM1', 'loop://' or 'socket://localhost:7000'
+		"""
+		self._url = url
+		self._ser = serial.serial_for_url(self._url, _BAUD_RATE, _BITS, _PARITY, _STOP_BITS, timeout=_TIMEOUT, do_not_open=True)
+		# the IR receiver is powered by DTR - applied when the port gets opened
+		self._ser.setDTR(True)
+		self._ser.setRTS(False)
+		self._ser.open()
+
+	@property
+	def name(self) -> str:
+		return self._url
+
+	@property
+	def isOpen(self) -> bool:
+		return self._ser.isOpen()
+
+	@property
+	def serial(self) -> serial.SerialBase:
+		""" The underlying pyserial object """
+		return self._ser
+
+	def reset_input_buffer(self) -> bool:
+		self._ser.reset_input_buffer()
+		return True
+
+	def set_read_timeout(self, timeout: Optional[float]):
+		self._ser.timeout = timeout if timeout is not None else _TIMEOUT
+
+	def read_until(self, expected: bytes, size: int) -> bytes:
+		return self._ser.read_until(expected, size)
+
+	def close(self):
+		self._ser.close()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000StreamTransport(De5000Transport):
+	_CHUNK_SIZE = 65536
+
+	def __init__(self, stream, name: Optional[str] = None):
+		""" Initialize object
+
+		The input buffer is never discarded, so that every frame of the
+		stream gets decoded.
+
+		Parameters:
+			stream: binary file-like object, e.g. open(fn, "rb"), sys.stdin.buffer or io.BytesIO
+			name (str): name used in messages, defaults to the name of the stream
+		"""
+		self._stream = stream
+		self._name = name if name is not None else str(getattr(stream, "name", "stream"))
+		# read1() returns what is available instead of waiting for a full chunk (pipes)
+		self._readFnc = getattr(stream, "read1", stream.read)
+		self._buf = bytearray()
+		self._isEof = False
+
+	@property
+	def name(self) -> str:
+		return self._name
+
+	@property
+	def isOpen(self) -> bool:
+		return not self._stream.closed
+
+	@property
+	def isEndOfData(self) -> bool:
+		return self._isEof and not self._buf
+
+	def reset_input_buffer(self) -> bool:
+		return False
+
+	def read_until(self, expected: bytes, size: int) -> bytes:
+		searchStart = 0
+		while True:
+			endIx = self._buf.find(expected, searchStart, size)
+			if endIx >= 0:
+				resLen = endIx + len(expected)
+				break
+			if len(self._buf) >= size:
+				resLen = size
+				break
+			if self._isEof:
+				resLen = len(self._buf)
+				break
+			searchStart = max(0, len(self._buf) - len(expected) + 1)
+			data = self._readFnc(self._CHUNK_SIZE)
+			if not data:
+				self._isEof = True
+			else:
+				self._buf += data
+		res = bytes(self._buf[:resLen])
+		del self._buf[:resLen]
+		return res
+
+	def close(self):
+		self._stream.close()
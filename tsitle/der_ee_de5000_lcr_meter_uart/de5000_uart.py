@@ -8,9 +8,22 @@ by TS, Apr 2022
 based on https://github.com/4x1md/de5000_lcr_py by '4x1md'
 """
 
+import array
+import math
+import time
+from typing import Optional, Union
+
 import serial
+import serial.tools.list_ports
+try:
+	import termios
+except ImportError:
+	termios = None
 
 from .de5000_stc_packet import De5000StcPacket
+from .de5000_transport import De5000Transport, De5000SerialTransport
+from .de5000_link_stats import De5000LinkStats, \
+		KIND_OK, KIND_FLUSH_CUT, KIND_TIMEOUT, KIND_SHORT_FRAME, KIND_BAD_HEADER, KIND_BAD_FOOTER, KIND_BAD_CODE
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
@@ -41,12 +54,7 @@ UNIT_NORMALIZED_R = "Ohm"
 
 # ------------------------------------------------------------------------------
 
-# Settings constants (Serial port settings: 9600 8N1 DTR=1 RTS=0)
-_BAUD_RATE = 9600
-_BITS = serial.EIGHTBITS
-_PARITY = serial.PARITY_NONE
-_STOP_BITS = serial.STOPBITS_ONE
-_TIMEOUT = 1
+# Settings constants (serial port settings: see de5000_transport.py)
 # Data packet ends with CR LF (\r \n) characters
 _DATA_EOL = b"\x0D\x0A"
 _RAW_DATA_LENGTH = 17
@@ -145,43 +153,137 @@ _SEC_QUANTITY_ARR = [
 	]
 
 # Normalization constants
-# Each value contains multiplier and target value
+# Each value contains the decimal exponent shift and target value
 _NORMALIZE_RULES = {
-		"":     (1, ""),
-		"Ohm":  (1, UNIT_NORMALIZED_R),
-		"kOhm": (1E3, UNIT_NORMALIZED_R),
-		"MOhm": (1E6, UNIT_NORMALIZED_R),
-		"uH":   (1, UNIT_NORMALIZED_L),
-		"mH":   (1E3, UNIT_NORMALIZED_L),
-		"H":    (1E6, UNIT_NORMALIZED_L),
-		"kH":   (1E9, UNIT_NORMALIZED_L),
-		"pF":   (1E-6, UNIT_NORMALIZED_C),
-		"nF":   (1E-3, UNIT_NORMALIZED_C),
-		"uF":   (1, UNIT_NORMALIZED_C),
-		"mF":   (1E3, UNIT_NORMALIZED_C),
-		"%":    (1, "%"),
-		"deg":  (1, "deg")
+		"":     (0, ""),
+		"Ohm":  (0, UNIT_NORMALIZED_R),
+		"kOhm": (3, UNIT_NORMALIZED_R),
+		"MOhm": (6, UNIT_NORMALIZED_R),
+		"uH":   (0, UNIT_NORMALIZED_L),
+		"mH":   (3, UNIT_NORMALIZED_L),
+		"H":    (6, UNIT_NORMALIZED_L),
+		"kH":   (9, UNIT_NORMALIZED_L),
+		"pF":   (-6, UNIT_NORMALIZED_C),
+		"nF":   (-3, UNIT_NORMALIZED_C),
+		"uF":   (0, UNIT_NORMALIZED_C),
+		"mF":   (3, UNIT_NORMALIZED_C),
+		"%":    (0, "%"),
+		"deg":  (0, "deg")
 	}
 
+# Exceptions raised when the port gets lost
+_PORT_ERRORS = (serial.SerialException, OSError) + ((termios.error,) if termios is not None else ())
+
+class _CodeError(Exception):
+	""" Raised when a byte of a frame is not a valid index of one of the code tables """
+	pass
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+def find_raw_frame(data: bytes, start: int = 0) -> int:
+	""" Find a frame with valid header and footer bytes in received data
+
+	Parameters:
+		data (bytes)
+		start (int): index to start searching at
+	Returns:
+		int: index of the first byte of the frame, -1 if there is none
+	"""
+	ix = data.find(b"\x00\x0D", start)
+	while 0 <= ix <= len(data) - _RAW_DATA_LENGTH:
+		if data[ix + _RAW_DATA_LENGTH - 2:ix + _RAW_DATA_LENGTH] == _DATA_EOL:
+			return ix
+		ix = data.find(b"\x00\x0D", ix + 1)
+	return -1
+
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
 class De5000Uart(object):
-	def __init__(self, port):
+	# delay before the first reconnect attempt, doubled after every failed attempt
+	_RECONNECT_DELAY_MIN = 0.5
+
+	def __init__(self, port: Union[str, De5000Transport], reconnect: bool = False, reconnectDelayMax: float = 30.0,
+			linkStats: Optional[De5000LinkStats] = None):
 		""" Initialize object
 
 		Parameters:
-			port (str): E.g. '/dev/ttyUSB0'
+			port (str|De5000Transport): E.g. '/dev/ttyUSB0', a pyserial URL like 'socket://localhost:7000'
+			                            or a transport (see de5000_transport.py)
+			reconnect (bool): re-open the port if it gets lost (e.g. USB adapter unplugged)
+			                  instead of raising an exception - only for serial ports
+			reconnectDelayMax (float): maximum delay in seconds between two reconnect attempts
+			linkStats (De5000LinkStats): classify every read attempt (see de5000_link_stats.py)
 		"""
-		self._port = port
-		self._ser = serial.Serial(self._port, _BAUD_RATE, _BITS, _PARITY, _STOP_BITS, timeout=_TIMEOUT)
-		self._ser.setDTR(True)
-		self._ser.setRTS(False)
-		self._ser.close()
-		self._ser.open()
+		assert reconnectDelayMax >= self._RECONNECT_DELAY_MIN, f"reconnectDelayMax needs to be >= {self._RECONNECT_DELAY_MIN}"
+		assert isinstance(port, str) or not reconnect, "reconnect is only supported for serial ports"
+		#
+		self._reconnect = reconnect
+		self._reconnectDelayMax = reconnectDelayMax
+		self._transport = None
+		self._serialNumber = None
+		if isinstance(port, str):
+			self._port = port
+			self._open_port()
+			# used to find the adapter again if it gets a different device name
+			self._serialNumber = self._get_serial_number(self._port)
+		else:
+			self._port = port.name
+			self._transport = port
 		self._packCountOk = 0
 		self._packCountErr = 0
 		self._lastDbgMsg = ""
+		self._lastErrKind = None
+		self._linkStats = linkStats
+		self._lastRxTimestampNs = None
+		self._lastRxMonotonicNs = None
+		#
+		self._lostMonotonicNs = None
+		self._nextReconnectMonotonicNs = None
+		self._reconnectDelay = self._RECONNECT_DELAY_MIN
+		self._reconnectCount = 0
+		self._downtimeNs = 0
+		self._lastOutageNs = 0
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	@property
+	def port(self) -> str:
+		""" Current device name - may change after a reconnect """
+		return self._port
+
+	@property
+	def isEndOfData(self) -> bool:
+		""" True if the transport can't deliver any more data (e.g. end of a capture file) """
+		return self._transport is not None and self._transport.isEndOfData
+
+	@property
+	def linkStats(self) -> Optional[De5000LinkStats]:
+		return self._linkStats
+
+	@property
+	def isConnected(self) -> bool:
+		return self._lostMonotonicNs is None
+
+	@property
+	def reconnectCount(self) -> int:
+		""" Amount of successful reconnects """
+		return self._reconnectCount
+
+	@property
+	def downtimeNs(self) -> int:
+		""" Total time the port was lost, including a current outage """
+		res = self._downtimeNs
+		if self._lostMonotonicNs is not None:
+			res += time.monotonic_ns() - self._lostMonotonicNs
+		return res
+
+	@property
+	def lastOutageNs(self) -> int:
+		""" Duration of the last finished outage """
+		return self._lastOutageNs
 
 	# --------------------------------------------------------------------------
 	# --------------------------------------------------------------------------
@@ -192,16 +294,85 @@ class De5000Uart(object):
 		Returns:
 			De5000StcPacket
 		"""
-		if self._ser.isOpen():
-			raw_data = self._read_raw_data()
-		else:
-			raw_data = []
+		return self._get_meas(True, _READ_RETRIES)
+
+	def acquire(self, count: int, timeout: float, quantity: Optional[str] = None) -> "De5000Acquisition":
+		""" Collect consecutive valid readings, e.g. for averaging
+
+		Unlike get_meas() the input buffer is only discarded once at the
+		start, so that the readings come in at the output rate of the meter.
+		Invalid packets and readings that don't match the main quantity
+		and the test frequency of the first accepted reading are rejected.
+		If the port gets lost (reconnect enabled) the collection continues
+		after the reconnect, as long as the timeout allows.
 
+		Parameters:
+			count (int): amount of readings to collect
+			timeout (float): in seconds, returns early with less readings when exceeded
+			quantity (str): main quantity to accept (e.g. MAIN_QUANTITY_CS), None means the quantity of the first reading
+		Returns:
+			De5000Acquisition
+		"""
+		assert count > 0, "count needs to be > 0"
 		#
-		res = De5000StcPacket()
-		res.packetCountOk = self._packCountOk
-		res.packetCountErr = self._packCountErr
-		res.dbgMsg = self._lastDbgMsg
+		res = De5000Acquisition()
+		deadlineNs = time.monotonic_ns() + int(timeout * 1E9)
+		isFirst = True
+		try:
+			while len(res.values) < count:
+				remainingNs = deadlineNs - time.monotonic_ns()
+				if remainingNs <= 0 or self.isEndOfData:
+					break
+				if not self.isConnected:
+					# wait for the next reconnect attempt instead of spinning
+					waitNs = min(remainingNs, self._nextReconnectMonotonicNs - time.monotonic_ns())
+					if waitNs > 0:
+						time.sleep(waitNs / 1E9)
+						continue
+				if self._transport is not None:
+					self._transport.set_read_timeout(remainingNs / 1E9)
+				# a frame cut by the flush simply gets rejected - no retries that would exceed the timeout
+				packet = self._get_meas(isFirst, 1)
+				isFirst = False
+				if not res._append(packet, quantity):
+					res.rejectedCount += 1
+		finally:
+			if self._transport is not None:
+				self._transport.set_read_timeout(None)
+		res._finish()
+		return res
+
+	# --------------------------------------------------------------------------
+	# --------------------------------------------------------------------------
+
+	def _get_meas(self, flushInput: bool, maxRetries: int) -> De5000StcPacket:
+		raw_data = []
+		if self._lostMonotonicNs is not None:
+			self._try_reconnect()
+		if self._transport is not None and self._transport.isOpen:
+			try:
+				raw_data = self._read_raw_data(flushInput, maxRetries)
+			except _PORT_ERRORS as err:
+				if not self._reconnect:
+					raise
+				self._port_lost(err)
+		if not raw_data and self._lostMonotonicNs is not None:
+			self._lastRxTimestampNs = None
+			self._lastRxMonotonicNs = None
+
+		#
+		res = self._create_packet()
+		# an unknown code in one of the tables makes the frame invalid
+		if len(raw_data) != 0:
+			try:
+				self._decode_raw_data(raw_data, res)
+			except _CodeError as err:
+				self._lastDbgMsg = str(err)
+				self._add_link_stats(KIND_BAD_CODE, len(raw_data))
+				raw_data = []
+				res = self._create_packet()
+			else:
+				self._add_link_stats(KIND_OK, len(raw_data))
 
 		# If raw data is empty, return
 		if len(raw_data) == 0:
@@ -210,12 +381,32 @@ class De5000Uart(object):
 			return res
 		self._packCountOk += 1
 		res.packetCountOk += 1
+		res.rawData = bytes(raw_data)
+		res.dataValid = True
 
+		return res
+
+	def _create_packet(self) -> De5000StcPacket:
+		res = De5000StcPacket(timestampNs=self._lastRxTimestampNs, monotonicNs=self._lastRxMonotonicNs)
+		res.packetCountOk = self._packCountOk
+		res.packetCountErr = self._packCountErr
+		res.dbgMsg = self._lastDbgMsg
+		return res
+
+	def _decode_raw_data(self, raw_data: list, res: De5000StcPacket):
+		""" Decode a valid frame into res
+
+		Parameters:
+			raw_data (list): List of bytes
+			res (De5000StcPacket)
+		Raises:
+			_CodeError
+		"""
 		# Frequency
 		val = raw_data[0x03]
 		val &= 0b11100000
 		val = val >> 5
-		res.freq = _FREQ_ARR[val].replace("KHz", "kHz")
+		res.freq = self._lookup_code(_FREQ_ARR, val, "frequency").replace("KHz", "kHz")
 
 		# Reference shown
 		val = raw_data[0x02]
@@ -256,38 +447,36 @@ class De5000Uart(object):
 		## Status
 		val = raw_data[0x09]
 		val &= 0b00001111
-		res.dispMain.status = _STATUS_ARR[val]
+		res.dispMain.status = self._lookup_code(_STATUS_ARR, val, "main status")
 
 		## Quantity
 		val = raw_data[0x05]
 		if res.parallel:
-			res.dispMain.quantity = _MAIN_QUANTITY_PAR_ARR[val]
+			res.dispMain.quantity = self._lookup_code(_MAIN_QUANTITY_PAR_ARR, val, "main quantity")
 		else:
-			res.dispMain.quantity = _MAIN_QUANTITY_SER_ARR[val]
+			res.dispMain.quantity = self._lookup_code(_MAIN_QUANTITY_SER_ARR, val, "main quantity")
 
 		## Value
-		val = raw_data[0x06] * 0x100 + raw_data[0x07]
+		res.dispMain.mantissa = raw_data[0x06] * 0x100 + raw_data[0x07]
 		mul = raw_data[0x08]
 		mul &= 0b00000111
-		val = val * 10**-mul
-		res.dispMain.val = float(val)
+		res.dispMain.exponent = -mul
 
 		## Units
 		val = raw_data[0x08]
 		val &= 0b11111000
 		val = val >> 3
-		res.dispMain.units = _MAIN_UNITS_ARR[val]
+		res.dispMain.unitsCode = val
+		res.dispMain.units = self._lookup_code(_MAIN_UNITS_ARR, val, "main units", False)
 
 		## Normalize value
-		nval = self._normalize_val(res.dispMain.val, res.dispMain.units)
-		res.dispMain.normVal = nval[0]
-		res.dispMain.normUnits = nval[1]
+		self._normalize_val(res.dispMain)
 
 		# Secondary measurement
 		## Status
 		val = raw_data[0x0E]
 		val &= 0b00000111
-		res.dispSec.status = _STATUS_ARR[val]
+		res.dispSec.status = self._lookup_code(_STATUS_ARR, val, "secondary status")
 
 		## Quantity
 		if res.sortingMode:
@@ -299,13 +488,14 @@ class De5000Uart(object):
 			if res.parallel and val == 0x03:
 				res.dispSec.quantity = SEC_QUANTITY_RP
 			else:
-				res.dispSec.quantity = _SEC_QUANTITY_ARR[val]
+				res.dispSec.quantity = self._lookup_code(_SEC_QUANTITY_ARR, val, "secondary quantity")
 
 		## Units
 		val = raw_data[0x0D]
 		val &= 0b11111000
 		val = val >> 3
-		res.dispSec.units = _MAIN_UNITS_ARR[val]
+		res.dispSec.unitsCode = val
+		res.dispSec.units = self._lookup_code(_MAIN_UNITS_ARR, val, "secondary units", False)
 
 		## Value
 		val = raw_data[0x0B] * 0x100 + raw_data[0x0C]
@@ -315,55 +505,118 @@ class De5000Uart(object):
 		to negative bu substracting it from 0x10000. """
 		if res.dispSec.units in ["%", "deg"] and val & 0x1000:
 			val = val - 0x10000
+		res.dispSec.mantissa = val
 		mul = raw_data[0x0D]
 		mul &= 0b00000111
-		val = val * 10**-mul
-		res.dispSec.val = float(val)
+		res.dispSec.exponent = -mul
 
 		## Normalize value
-		nval = self._normalize_val(res.dispSec.val, res.dispSec.units)
-		res.dispSec.normVal = nval[0]
-		res.dispSec.normUnits = nval[1]
+		self._normalize_val(res.dispSec)
 
 		# Tolerance
 		val = raw_data[0x04]
-		res.tolerance = _TOLERANCE_ARR[val]
-
-		res.dataValid = True
-
-		return res
+		res.tolerance = self._lookup_code(_TOLERANCE_ARR, val, "tolerance")
 
 	# --------------------------------------------------------------------------
 	# --------------------------------------------------------------------------
 
-	def _read_raw_data(self):
+	def _open_port(self):
+		self._transport = De5000SerialTransport(self._port)
+
+	def _close_port(self):
+		if self._transport is None:
+			return
+		try:
+			self._transport.close()
+		except _PORT_ERRORS:
+			pass
+		self._transport = None
+
+	def _get_serial_number(self, port: str) -> Optional[str]:
+		for portInfo in serial.tools.list_ports.comports():
+			if portInfo.device == port:
+				return portInfo.serial_number
+		return None
+
+	def _find_port(self) -> str:
+		""" Get the current device name of the adapter """
+		if self._serialNumber is not None:
+			for portInfo in serial.tools.list_ports.comports():
+				if portInfo.serial_number == self._serialNumber:
+					return portInfo.device
+		return self._port
+
+	def _port_lost(self, err: Exception):
+		self._close_port()
+		self._lostMonotonicNs = time.monotonic_ns()
+		self._reconnectDelay = self._RECONNECT_DELAY_MIN
+		self._nextReconnectMonotonicNs = self._lostMonotonicNs + int(self._reconnectDelay * 1E9)
+		self._lastDbgMsg = f"port lost: {str(err)}"
+
+	def _try_reconnect(self):
+		""" Re-open the port if the backoff delay has passed """
+		nowNs = time.monotonic_ns()
+		if nowNs < self._nextReconnectMonotonicNs:
+			self._lastDbgMsg = f"port lost, reconnecting in {(self._nextReconnectMonotonicNs - nowNs) / 1E9:.1f}s"
+			return
+		self._port = self._find_port()
+		try:
+			self._open_port()
+		except _PORT_ERRORS as err:
+			self._close_port()
+			self._reconnectDelay = min(self._reconnectDelay * 2.0, self._reconnectDelayMax)
+			self._nextReconnectMonotonicNs = time.monotonic_ns() + int(self._reconnectDelay * 1E9)
+			self._lastDbgMsg = f"reconnect to '{self._port}' failed: {str(err)}"
+			return
+		nowNs = time.monotonic_ns()
+		self._lastOutageNs = nowNs - self._lostMonotonicNs
+		self._downtimeNs += self._lastOutageNs
+		self._lostMonotonicNs = None
+		self._reconnectCount += 1
+
+	def _read_raw_data(self, flushInput: bool = True, maxRetries: int = _READ_RETRIES):
 		""" Reads a new data packet from serial port.
 		If the packet was valid returns array of integers.
 		if the packet was not valid returns empty array.
 
 		In order to get the last reading the input buffer is flushed
-		before reading any data.
+		before reading any data (not for streams, see de5000_transport.py).
 
 		If the first received packet contains less than 17 bytes, it is
 		not complete and the reading is done again. Maximum number of
-		retries is defined by _READ_RETRIES value.
+		retries is defined by maxRetries (default: _READ_RETRIES).
 
+		Parameters:
+			flushInput (bool): False to continue with the next frame in the buffer
+			maxRetries (int)
 		Returns:
 			list: List of bytes
 		"""
-		self._ser.reset_input_buffer()
+		isFlushed = False
+		if flushInput:
+			isFlushed = self._transport.reset_input_buffer()
 
 		retries = 0
-		while retries < _READ_RETRIES:
+		while retries < maxRetries:
 			# @var raw_data: bytes
-			raw_data = self._ser.read_until(_DATA_EOL, _RAW_DATA_LENGTH)
+			raw_data = self._transport.read_until(_DATA_EOL, _RAW_DATA_LENGTH)
+			# the frame's last byte has just been received
+			self._lastRxMonotonicNs = time.monotonic_ns()
+			self._lastRxTimestampNs = time.time_ns()
+			# Check data validity
+			isValid = self._is_data_valid(raw_data)
+			if not isValid and (len(raw_data) != 0 or not self._transport.isEndOfData):
+				errKind = self._lastErrKind
+				# the rest of a frame cut by the flush is expected
+				if errKind == KIND_SHORT_FRAME and isFlushed and retries == 0 and raw_data.endswith(_DATA_EOL):
+					errKind = KIND_FLUSH_CUT
+				self._add_link_stats(errKind, len(raw_data))
 			# If 17 bytes were read, the packet is valid and the loop ends.
 			if len(raw_data) == _RAW_DATA_LENGTH:
 				break
 			retries += 1
 		res = []
-		# Check data validity
-		if self._is_data_valid(raw_data):
+		if isValid:
 			res = [c for c in raw_data]
 		return res
 
@@ -379,13 +632,16 @@ class De5000Uart(object):
 			bool
 		"""
 		self._lastDbgMsg = ""
+		self._lastErrKind = None
 		# Data length
 		tmpSz = len(raw_data)
 		if tmpSz != _RAW_DATA_LENGTH:
 			if tmpSz == 0:
 				self._lastDbgMsg = "no data received"
+				self._lastErrKind = KIND_TIMEOUT
 			else:
 				self._lastDbgMsg = f"len invalid: {tmpSz} != {_RAW_DATA_LENGTH}"
+				self._lastErrKind = KIND_SHORT_FRAME
 			return False
 
 		# Start bits
@@ -393,6 +649,7 @@ class De5000Uart(object):
 		tmpB2 = 0x0D
 		if raw_data[0] != tmpB1 or raw_data[1] != tmpB2:
 			self._lastDbgMsg = f"start bits invalid: {raw_data[0]:02X} != {tmpB1:02X} or {raw_data[1]:02X} != {tmpB2:02X}"
+			self._lastErrKind = KIND_BAD_HEADER
 			return False
 
 		# End bits
@@ -400,28 +657,117 @@ class De5000Uart(object):
 		tmpB2 = 0x0A
 		if raw_data[15] != tmpB1 or raw_data[16] != tmpB2:
 			self._lastDbgMsg = f"end bits invalid: {raw_data[15]:02X} != {tmpB1:02X} or {raw_data[16]:02X} != {tmpB2:02X}"
+			self._lastErrKind = KIND_BAD_FOOTER
 			return False
 
 		return True
 
-	def _normalize_val(self, val, units):
-		""" Normalizes measured value to standard units. Resistance
-		is normalized to Ohm, capacitance to Farad and inductance
-		to Henry. Other units are not changed.
+	def _lookup_code(self, table: list, val: int, name: str, allowNone: bool = True):
+		""" Get an entry of one of the code tables
 
 		Parameters:
-			val (float)
-			units (str)
+			table (list): e.g. _STATUS_ARR
+			val (int): index
+			name (str): name of the field for the error message
+			allowNone (bool): False if None entries are unknown codes
 		Returns:
-			tuple
+			The entry
+		Raises:
+			_CodeError
 		"""
-		val = val * _NORMALIZE_RULES[units][0]
-		units = _NORMALIZE_RULES[units][1]
-		return (val, units)
+		if val >= len(table) or (table[val] is None and not allowNone):
+			raise _CodeError(f"{name} code invalid: {val}")
+		return table[val]
+
+	def _add_link_stats(self, kind: str, byteCount: int):
+		if self._linkStats is not None:
+			self._linkStats.add(kind, byteCount, self._lastRxMonotonicNs)
+
+	def _normalize_val(self, packetDisp):
+		""" Normalizes measured value to standard units. Resistance
+		is normalized to Ohm, capacitance to Microfarad and inductance
+		to Microhenry. Other units are not changed.
+
+		Only the decimal exponent is adjusted, the mantissa stays untouched.
+
+		Parameters:
+			packetDisp (De5000StcPacketMainSecondary)
+		"""
+		rule = _NORMALIZE_RULES[packetDisp.units]
+		packetDisp.normExponent = packetDisp.exponent + rule[0]
+		packetDisp.normUnits = rule[1]
 
 	def __del__(self):
-		if hasattr(self, "_ser"):
-			self._ser.close()
+		if hasattr(self, "_transport"):
+			self._close_port()
+
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+class De5000Acquisition(object):
+	""" Result of De5000Uart.acquire()
+
+	Values are in normalized units, secondary values are NaN if the
+	secondary display doesn't show a normal reading.
+	"""
+
+	def __init__(self):
+		self.timestampsNs = array.array("q")
+		self.values = array.array("d")
+		self.secValues = array.array("d")
+		self.quantity = None
+		self.secQuantity = None
+		self.freq = None
+		self.normUnits = None
+		self.secNormUnits = None
+		self.rejectedCount = 0
+		self.mean = math.nan
+		self.std = math.nan
+		self.secMean = math.nan
+		self.secStd = math.nan
+
+	def __len__(self) -> int:
+		return len(self.values)
+
+	def _append(self, packet: De5000StcPacket, quantity: Optional[str]) -> bool:
+		""" Add a reading
+
+		Returns:
+			bool: False if the packet got rejected
+		"""
+		if not packet.dataValid or packet.calMode or packet.dispMain.status != STATUS_NORMAL:
+			return False
+		if self.quantity is None:
+			if quantity is not None and packet.dispMain.quantity != quantity:
+				return False
+			self.quantity = packet.dispMain.quantity
+			self.secQuantity = packet.dispSec.quantity
+			self.freq = packet.freq
+			self.normUnits = packet.dispMain.normUnits
+			self.secNormUnits = packet.dispSec.normUnits
+		elif packet.dispMain.quantity != self.quantity or packet.freq != self.freq:
+			return False
+		self.timestampsNs.append(packet.timestampNs)
+		self.values.append(packet.dispMain.normVal)
+		if packet.dispSec.status == STATUS_NORMAL and packet.dispSec.quantity == self.secQuantity:
+			self.secValues.append(packet.dispSec.normVal)
+		else:
+			self.secValues.append(math.nan)
+		return True
+
+	def _finish(self):
+		self.mean, self.std = self._get_mean_std(self.values)
+		self.secMean, self.secStd = self._get_mean_std([x for x in self.secValues if not math.isnan(x)])
+
+	def _get_mean_std(self, valuesA) -> tuple:
+		""" Get mean and sample standard deviation (NaN if not enough values) """
+		cnt = len(valuesA)
+		if cnt == 0:
+			return (math.nan, math.nan)
+		mean = math.fsum(valuesA) / cnt
+		if cnt == 1:
+			return (mean, math.nan)
+		return (mean, math.sqrt(math.fsum((x - mean) ** 2 for x in valuesA) / (cnt - 1)))
 
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------